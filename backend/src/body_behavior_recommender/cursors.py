@@ -0,0 +1,60 @@
+"""Bounded in-memory store behind opaque pagination cursors."""
+
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+CURSOR_TTL = float(os.getenv("BBR_CURSOR_TTL", "300"))
+CURSOR_MAX_ENTRIES = int(os.getenv("BBR_CURSOR_MAX_ENTRIES", "10000"))
+
+
+class CursorStore:
+    """Maps random tokens to server-side paging state.
+
+    Entries expire after `ttl` seconds and the oldest are evicted beyond
+    `max_size`, so abandoned carousels cannot grow the process without bound.
+    Tokens carry no data themselves; an unknown or expired token simply
+    misses.
+    """
+
+    def __init__(self, max_size: int = CURSOR_MAX_ENTRIES, ttl: float = CURSOR_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, value: Any) -> str:
+        """Store `value` and return a new cursor for it."""
+        token = secrets.token_urlsafe(16)
+        now = time.monotonic()
+        with self._lock:
+            self._entries[token] = (now, value)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            # Entries are in insertion order, so expired ones are at the front
+            while self._entries:
+                created, _ = next(iter(self._entries.values()))
+                if now - created <= self.ttl:
+                    break
+                self._entries.popitem(last=False)
+        return token
+
+    def get(self, token: str) -> Optional[Any]:
+        """Return the value behind `token`, or None if unknown or expired."""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > self.ttl:
+                del self._entries[token]
+                return None
+            return entry[1]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+CURSORS = CursorStore()
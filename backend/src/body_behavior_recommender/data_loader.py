@@ -406,6 +406,16 @@ class EnhancedDataLoader:
         for user_id in self.activity:
             self.activity[user_id].sort(key=lambda x: x.date)
 
+    def clear(self):
+        """Drop all loaded data (once it has been ingested elsewhere)."""
+        self.users = {}
+        self.sleep = defaultdict(list)
+        self.nutrition = defaultdict(list)
+        self.activity = defaultdict(list)
+        self.heart_rate = defaultdict(list)
+        self.measurements = defaultdict(list)
+        self.detailed_activities = defaultdict(list)
+
     def get_user_summary(self, user_id: str) -> Dict:
         """Get a summary of data available for a specific user."""
         if user_id not in self.users:
@@ -1,7 +1,8 @@
 """MongoDB integration layer."""
 
 import os
-from typing import Any, Dict, List, Optional
+import threading
+from typing import Any, Dict, Iterable, List, Optional
 
 from .models import (
     ActivityEntry,
@@ -35,6 +36,24 @@ COLLECTION_MODELS = {
 }
 
 
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_database():
+    """Database handle on a process-wide client (connection pooled, no per-call ping)."""
+    global _shared_client
+    if _shared_client is None:
+        from pymongo import MongoClient
+
+        with _shared_client_lock:
+            if _shared_client is None:
+                _shared_client = MongoClient(
+                    MONGODB_URI, appname="body_behavior_recommender"
+                )
+    return _shared_client[MONGO_DB_NAME]
+
+
 # ---------- Access Helpers ----------
 def get_user(user_id: str) -> Optional[Dict[str, Any]]:
     """Get a user by ID from MongoDB."""
@@ -73,6 +92,45 @@ def get_recent_entries(
         return [d.model_dump() for d in reversed(docs)]
 
 
+def get_users_by_ids(user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Get many users from MongoDB with a single `$in` query, keyed by user_id."""
+    cursor = get_database()[COLLECTIONS["users"]].find(
+        {"user_id": {"$in": list(user_ids)}}, {"_id": 0}
+    )
+    users = (UserProfile.model_validate(doc) for doc in cursor)
+    return {u.user_id: u.model_dump() for u in users}
+
+
+def get_recent_entries_batch(
+    collection: str, user_ids: List[str], limit: int = 7
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Get recent entries for many users with one aggregation.
+
+    Returns user_id -> that user's latest `limit` entries in chronological order
+    (users without entries map to an empty list).
+    """
+    model = COLLECTION_MODELS.get(collection)
+    entries: Dict[str, List[Dict[str, Any]]] = {user_id: [] for user_id in user_ids}
+    if not model or not user_ids:
+        return entries
+
+    pipeline = [
+        {"$match": {"user_id": {"$in": list(user_ids)}}},
+        {
+            "$group": {
+                "_id": "$user_id",
+                "docs": {"$topN": {"n": limit, "sortBy": {"date": -1}, "output": "$$ROOT"}},
+            }
+        },
+    ]
+    for group in get_database()[COLLECTIONS[collection]].aggregate(pipeline):
+        # $topN yields newest first; callers expect chronological order
+        entries[group["_id"]] = [
+            model.model_validate(doc).model_dump() for doc in reversed(group["docs"])
+        ]
+    return entries
+
+
 def get_user_measurements(user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
     """Get recent measurements for a user from MongoDB."""
     with MongoClientWrapper(
@@ -113,3 +171,124 @@ def collection_count(collection: str) -> int:
         model, COLLECTIONS[collection], MONGO_DB_NAME, MONGODB_URI
     ) as client:
         return client.get_collection_count()
+
+
+# Per-user history collections, all queried by user_id and date
+HISTORY_COLLECTIONS = ("sleep", "nutrition", "activity", "measurements")
+
+
+def ensure_indexes():
+    """Create the indexes the per-user queries rely on (idempotent)."""
+    database = get_database()
+    database[COLLECTIONS["users"]].create_index("user_id")
+    for collection in HISTORY_COLLECTIONS:
+        database[COLLECTIONS[collection]].create_index([("user_id", 1), ("date", -1)])
+
+
+def get_user_data_summary(user_id: str) -> Optional[Dict[str, Any]]:
+    """Profile plus per-collection counts and date ranges for one user.
+
+    The history collections are combined with `$unionWith` and summarised in
+    a single `$facet` (counts/min/max per collection, and the latest
+    measurement), served by the (user_id, date) indexes.
+    """
+    database = get_database()
+    profile = database[COLLECTIONS["users"]].find_one({"user_id": user_id}, {"_id": 0})
+    if profile is None:
+        return None
+
+    def branch(collection):
+        return [
+            {"$match": {"user_id": user_id}},
+            {"$project": {"_id": 0}},
+            {"$set": {"_collection": collection}},
+        ]
+
+    first, *rest = HISTORY_COLLECTIONS
+    pipeline = branch(first)
+    for collection in rest:
+        pipeline.append(
+            {"$unionWith": {"coll": COLLECTIONS[collection], "pipeline": branch(collection)}}
+        )
+    pipeline.append(
+        {
+            "$facet": {
+                "ranges": [
+                    {
+                        "$group": {
+                            "_id": "$_collection",
+                            "count": {"$sum": 1},
+                            "start": {"$min": "$date"},
+                            "end": {"$max": "$date"},
+                        }
+                    }
+                ],
+                "latest_measurement": [
+                    {"$match": {"_collection": "measurements"}},
+                    {"$sort": {"date": -1}},
+                    {"$limit": 1},
+                    {"$unset": "_collection"},
+                ],
+            }
+        }
+    )
+    facets = next(database[COLLECTIONS[first]].aggregate(pipeline))
+    ranges = {r["_id"]: r for r in facets["ranges"]}
+
+    def count(collection):
+        return ranges.get(collection, {}).get("count", 0)
+
+    def date_range(collection):
+        r = ranges.get(collection, {})
+        return {"start": r.get("start"), "end": r.get("end")}
+
+    summary = {
+        "user_id": user_id,
+        "profile": profile,
+        "data_counts": {
+            "sleep_entries": count("sleep"),
+            "nutrition_entries": count("nutrition"),
+            "activity_entries": count("activity"),
+            "measurement_entries": count("measurements"),
+        },
+        "date_ranges": {
+            "sleep": date_range("sleep"),
+            "nutrition": date_range("nutrition"),
+            "activity": date_range("activity"),
+            "measurements": date_range("measurements"),
+        },
+    }
+    if facets["latest_measurement"]:
+        summary["latest_measurement"] = facets["latest_measurement"][0]
+    return summary
+
+
+def get_user_entries_since(
+    collection: str, user_id: str, since: str
+) -> List[Dict[str, Any]]:
+    """A user's entries dated on or after `since`, oldest first (indexed range query)."""
+    cursor = (
+        get_database()[COLLECTIONS[collection]]
+        .find({"user_id": user_id, "date": {"$gte": since}}, {"_id": 0})
+        .sort("date", 1)
+    )
+    return list(cursor)
+
+
+def collection_counts(
+    collections: Iterable[str], precise: bool = False
+) -> Dict[str, int]:
+    """Count documents in each collection once, on the shared client.
+
+    By default counts come from collection metadata (`estimated_document_count`),
+    which does not scan; `precise` runs `count_documents({})` instead.
+    """
+    database = get_database()
+    counts = {}
+    for collection in dict.fromkeys(collections):
+        handle = database[COLLECTIONS[collection]]
+        counts[collection] = (
+            handle.count_documents({}) if precise else handle.estimated_document_count()
+        )
+    return counts
+
@@ -1,22 +1,42 @@
 """API endpoints for the Body-to-Behavior Recommender."""
 
-from fastapi import HTTPException
-
-from .app import MEALS, MUSIC, WORKOUTS, app
-from .data_loader import data_loader
-from .db import get_recent_entries
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
+from bbr_core.arms import DOMAINS
+from bbr_core.state import compute_state_entries
+from fastapi import Header, HTTPException
+
+from .app import MEALS, MUSIC, WORKOUTS, app, catalog_version
+from .cursors import CURSORS
+from .db import (
+    get_recent_entries,
+    get_recent_entries_batch,
+    get_user_data_summary,
+    get_user_entries_since,
+    get_users_by_ids,
+)
 from .db import get_user as db_get_user
 from .models import (
     ActivityEntry,
+    BatchRecommendRequest,
+    BatchRecommendResponse,
+    BatchRecommendResult,
+    BundleItem,
+    BundleRequest,
+    BundleResponse,
     Feedback,
     NutritionEntry,
     RecommendRequest,
+    RankedItem,
     RecommendResponse,
     SleepEntry,
+    UserProfile,
 )
 from .services import (
     choose_domain,
-    compute_state_entries,
     filter_meal_candidates,
     filter_music_candidates,
     filter_workout_candidates,
@@ -24,14 +44,21 @@ from .services import (
     rank_meals,
     rank_music,
     rank_workouts,
-    reward_from_feedback,
+    score_meals,
+    score_music,
+    score_workouts,
     thompson_sample_contextual,
+    thompson_sample_contextual_batch,
+    top_k,
     update_bandit,
-    update_preferences,
 )
 from .kafka_producer import send_feedback_async
+from .serialization import CATALOG_PAYLOADS
+from .summary import DATA_SUMMARY
 from .utils import get_today_iso
 
+EXPLANATION_CONCURRENCY = int(os.getenv("BBR_EXPLANATION_CONCURRENCY", "8"))
+
 
 @app.get("/")
 def read_root():
@@ -79,20 +106,11 @@ def get_state(user_id: str):
     return {"user_id": user_id, "date": today, "state": state}
 
 
-@app.post("/recommend", response_model=RecommendResponse)
-def recommend(req: RecommendRequest):
-    """Get personalized recommendations for music, meals, or workouts."""
-    doc = db_get_user(req.user_id)
-    if not doc:
-        raise HTTPException(404, "user not found")
-    from .models import UserProfile
-
-    user = UserProfile(**doc)
+def _build_state(user, today, sleep_docs, nut_docs, act_docs):
+    """Compute the state from a user's recent documents.
 
-    today = get_today_iso(req.now)
-    sleep_docs = get_recent_entries("sleep", req.user_id, limit=7)
-    nut_docs = get_recent_entries("nutrition", req.user_id, limit=3)
-    act_docs = get_recent_entries("activity", req.user_id, limit=7)
+    Returns (state, sleep_entries, todays_nutrition, activity_entries).
+    """
     sleep_entries = [SleepEntry(**d) for d in sleep_docs]
     todays_nutrition = None
     if nut_docs:
@@ -104,30 +122,124 @@ def recommend(req: RecommendRequest):
     state = compute_state_entries(
         user, sleep_entries, todays_nutrition, activity_entries
     )
-    domain = choose_domain(req.intent, state, req.hours_since_last_meal)
-    arm = thompson_sample_contextual(req.user_id, domain, state)
+    return state, sleep_entries, todays_nutrition, activity_entries
+
 
+def _candidates(domain, user, state, arm):
+    """Filter the domain's catalog for the sampled arm."""
     if domain == "music":
-        candidates = filter_music_candidates(user, state, arm)
-        ranked = rank_music(candidates, user, state)
-        if not ranked:
-            raise HTTPException(400, "no music candidates")
-        item = ranked[0][0]
-        payload = item.model_dump()
+        return filter_music_candidates(user, state, arm)
+    if domain == "meal":
+        return filter_meal_candidates(user, state, arm)
+    return filter_workout_candidates(user, state, arm)
+
+
+def _rank_domain(domain, user, state, arm, todays_nutrition=None, k=None):
+    """Filter and rank the domain's catalog for `arm` as (item, score) pairs, best first.
+
+    With `k` only the k best are selected.
+    """
+    candidates = _candidates(domain, user, state, arm)
+    if domain == "music":
+        ranked = rank_music(candidates, user, state, k=k)
+    elif domain == "meal":
+        ranked = rank_meals(candidates, user, state, todays_nutrition, k=k)
+    else:  # workout
+        ranked = rank_workouts(candidates, user, state, k=k)
+    if not ranked:
+        raise HTTPException(400, f"no {domain} candidates")
+    return ranked
+
+
+def _score_domain(domain, user, state, arm, todays_nutrition=None):
+    """Filter and score the domain's catalog for `arm` without sorting."""
+    candidates = _candidates(domain, user, state, arm)
+    if domain == "music":
+        scored = score_music(candidates, user, state)
     elif domain == "meal":
-        candidates = filter_meal_candidates(user, state, arm)
-        ranked = rank_meals(candidates, user, state)
-        if not ranked:
-            raise HTTPException(400, "no meal candidates")
-        item = ranked[0][0]
-        payload = item.model_dump()
+        scored = score_meals(candidates, user, state, todays_nutrition)
     else:  # workout
-        candidates = filter_workout_candidates(user, state, arm)
-        ranked = rank_workouts(candidates, user, state)
-        if not ranked:
-            raise HTTPException(400, "no workout candidates")
-        item = ranked[0][0]
-        payload = item.model_dump()
+        scored = score_workouts(candidates, user, state)
+    if not scored:
+        raise HTTPException(400, f"no {domain} candidates")
+    return scored
+
+
+def _pick_item(domain, user, state, arm, todays_nutrition=None):
+    """Return the top-ranked item of the domain for `arm` as a dict."""
+    return _rank_domain(domain, user, state, arm, todays_nutrition, k=1)[0][0].model_dump()
+
+
+def _page(context, offset, k):
+    """Select the page at `offset` from a scored context and a cursor for the next page.
+
+    Scores are kept from the first request, so later pages neither recompute
+    state nor reshuffle the random novelty bonus.
+    """
+    scored = context["scored"]
+    page = top_k(scored, offset + k)[offset:]
+    next_cursor = None
+    if offset + k < len(scored):
+        next_cursor = CURSORS.put((context, offset + k, k))
+    items = [RankedItem(item=item.model_dump(), score=score) for item, score in page]
+    return items, next_cursor
+
+
+def _next_page(req: RecommendRequest) -> RecommendResponse:
+    entry = CURSORS.get(req.cursor)
+    if entry is None or entry[0]["user_id"] != req.user_id:
+        raise HTTPException(410, "cursor expired or invalid")
+    context, offset, k = entry
+    items, next_cursor = _page(context, offset, req.k or k)
+    return RecommendResponse(
+        domain=context["domain"],
+        state=context["state"],
+        item=items[0].item,
+        bandit_arm=context["arm"],
+        top_k=items,
+        next_cursor=next_cursor,
+    )
+
+
+@app.post("/recommend", response_model=RecommendResponse)
+def recommend(req: RecommendRequest):
+    """Get personalized recommendations for music, meals, or workouts.
+
+    With `k`, the k best items are returned in `top_k` along with a
+    `next_cursor`; passing that cursor back (with the same user_id) fetches
+    the following page from the same ranking.
+    """
+    if req.cursor is not None:
+        return _next_page(req)
+
+    doc = db_get_user(req.user_id)
+    if not doc:
+        raise HTTPException(404, "user not found")
+    user = UserProfile(**doc)
+
+    today = get_today_iso(req.now)
+    sleep_docs = get_recent_entries("sleep", req.user_id, limit=7)
+    nut_docs = get_recent_entries("nutrition", req.user_id, limit=3)
+    act_docs = get_recent_entries("activity", req.user_id, limit=7)
+    state, sleep_entries, todays_nutrition, activity_entries = _build_state(
+        user, today, sleep_docs, nut_docs, act_docs
+    )
+    domain = choose_domain(req.intent, state, req.hours_since_last_meal)
+    arm = thompson_sample_contextual(req.user_id, domain, state)
+
+    items, next_cursor = None, None
+    if req.k is None:
+        payload = _pick_item(domain, user, state, arm, todays_nutrition)
+    else:
+        context = {
+            "user_id": req.user_id,
+            "domain": domain,
+            "state": state,
+            "arm": arm,
+            "scored": _score_domain(domain, user, state, arm, todays_nutrition),
+        }
+        items, next_cursor = _page(context, 0, req.k)
+        payload = items[0].item
 
     # Generate personalized explanation
     explanation = generate_recommendation_explanation(
@@ -146,9 +258,147 @@ def recommend(req: RecommendRequest):
         item=payload,
         bandit_arm=arm,
         explanation=explanation,
+        top_k=items,
+        next_cursor=next_cursor,
     )
 
 
+@app.post("/recommend/batch", response_model=BatchRecommendResponse)
+def recommend_batch(batch: BatchRecommendRequest):
+    """Get recommendations for many requests at once.
+
+    Users and their recent entries are fetched with one `$in` query per
+    collection, each (user, day) state is computed once, and bandit draws for
+    the same user and domain are sampled together. Results are returned in
+    input order; a request that fails carries an `error` instead of a
+    recommendation. Items are ranked with the same per-domain scorers as
+    /recommend: the catalogs hold a handful of items each, too few for
+    catalog matrices to beat the per-item loop.
+    """
+    requests = batch.requests
+    user_ids = list(dict.fromkeys(req.user_id for req in requests))
+    docs = get_users_by_ids(user_ids)
+    sleep_by_user = get_recent_entries_batch("sleep", user_ids, limit=7)
+    nut_by_user = get_recent_entries_batch("nutrition", user_ids, limit=3)
+    act_by_user = get_recent_entries_batch("activity", user_ids, limit=7)
+
+    users = {user_id: UserProfile(**doc) for user_id, doc in docs.items()}
+    results = [BatchRecommendResult(user_id=req.user_id) for req in requests]
+    contexts = {}  # (user_id, today) -> _build_state(...)
+    groups = {}  # (user_id, today, domain) -> request indices
+
+    for i, req in enumerate(requests):
+        user = users.get(req.user_id)
+        if user is None:
+            results[i].error = "user not found"
+            continue
+        today = get_today_iso(req.now)
+        key = (req.user_id, today)
+        if key not in contexts:
+            contexts[key] = _build_state(
+                user,
+                today,
+                sleep_by_user[req.user_id],
+                nut_by_user[req.user_id],
+                act_by_user[req.user_id],
+            )
+        state = contexts[key][0]
+        domain = choose_domain(req.intent, state, req.hours_since_last_meal)
+        groups.setdefault((req.user_id, today, domain), []).append(i)
+
+    picked = []  # (index, user, domain, context, payload, arm)
+    for (user_id, today, domain), indices in groups.items():
+        user = users[user_id]
+        context = contexts[(user_id, today)]
+        state = context[0]
+        arms = thompson_sample_contextual_batch(user_id, domain, state, len(indices))
+        for i, arm in zip(indices, arms):
+            try:
+                payload = _pick_item(domain, user, state, arm, context[2])
+            except HTTPException as e:
+                results[i].error = str(e.detail)
+                continue
+            picked.append((i, user, domain, context, payload, arm))
+
+    explanations = [None] * len(picked)
+    if batch.explain and picked:
+
+        def explain(entry):
+            _, user, domain, context, payload, _ = entry
+            state, sleep_entries, todays_nutrition, activity_entries = context
+            return generate_recommendation_explanation(
+                user=user,
+                domain=domain,
+                recommendation_item=payload,
+                state=state,
+                sleep_entries=sleep_entries,
+                todays_nutrition=todays_nutrition,
+                activity_entries=activity_entries,
+            )
+
+        # Explanations are network-bound LLM calls; issue them concurrently
+        with ThreadPoolExecutor(max_workers=min(EXPLANATION_CONCURRENCY, len(picked))) as pool:
+            explanations = list(pool.map(explain, picked))
+
+    for (i, _, domain, context, payload, arm), explanation in zip(picked, explanations):
+        results[i].recommendation = RecommendResponse(
+            domain=domain,
+            state=context[0],
+            item=payload,
+            bandit_arm=arm,
+            explanation=explanation,
+        )
+    return BatchRecommendResponse(results=results)
+
+
+@app.post("/recommend/bundle", response_model=BundleResponse)
+def recommend_bundle(req: BundleRequest):
+    """Get a music, meal and workout recommendation in one round trip.
+
+    The user's history is fetched and the state computed once; the three
+    domains are then sampled and ranked concurrently. A domain without
+    candidates reports an `error` while the others are still returned.
+    """
+    doc = db_get_user(req.user_id)
+    if not doc:
+        raise HTTPException(404, "user not found")
+    user = UserProfile(**doc)
+
+    today = get_today_iso(req.now)
+    sleep_docs = get_recent_entries("sleep", req.user_id, limit=7)
+    nut_docs = get_recent_entries("nutrition", req.user_id, limit=3)
+    act_docs = get_recent_entries("activity", req.user_id, limit=7)
+    state, sleep_entries, todays_nutrition, activity_entries = _build_state(
+        user, today, sleep_docs, nut_docs, act_docs
+    )
+
+    def recommend_domain(domain):
+        arm = thompson_sample_contextual(req.user_id, domain, state)
+        try:
+            ranked = _rank_domain(domain, user, state, arm, todays_nutrition, k=req.k)
+        except HTTPException as e:
+            return BundleItem(bandit_arm=arm, error=str(e.detail))
+        ranked_items = [RankedItem(item=item.model_dump(), score=score) for item, score in ranked]
+        explanation = None
+        if req.explain:
+            explanation = generate_recommendation_explanation(
+                user=user,
+                domain=domain,
+                recommendation_item=ranked_items[0].item,
+                state=state,
+                sleep_entries=sleep_entries,
+                todays_nutrition=todays_nutrition,
+                activity_entries=activity_entries,
+            )
+        return BundleItem(
+            item=ranked_items[0].item, bandit_arm=arm, top_k=ranked_items, explanation=explanation
+        )
+
+    with ThreadPoolExecutor(max_workers=len(DOMAINS)) as pool:
+        items = list(pool.map(recommend_domain, DOMAINS))
+    return BundleResponse(state=state, recommendations=dict(zip(DOMAINS, items)))
+
+
 @app.post("/feedback")
 def submit_feedback(fb: Feedback):
     """Submit feedback on a recommendation for async processing."""
@@ -201,39 +451,65 @@ def get_user(user_id: str):
     return doc
 
 
+def _catalogs():
+    return {
+        "music": ("tracks", MUSIC),
+        "meals": ("meals", MEALS),
+        "workouts": ("workouts", WORKOUTS),
+    }
+
+
 @app.get("/catalog/music")
-def get_music_catalog():
+def get_music_catalog(if_none_match: Optional[str] = Header(default=None)):
     """Get the music catalog."""
-    return {"tracks": MUSIC}
+    return CATALOG_PAYLOADS.response("tracks", MUSIC, catalog_version(), if_none_match)
 
 
 @app.get("/catalog/meals")
-def get_meal_catalog():
+def get_meal_catalog(if_none_match: Optional[str] = Header(default=None)):
     """Get the meal catalog."""
-    return {"meals": MEALS}
+    return CATALOG_PAYLOADS.response("meals", MEALS, catalog_version(), if_none_match)
 
 
 @app.get("/catalog/workouts")
-def get_workout_catalog():
+def get_workout_catalog(if_none_match: Optional[str] = Header(default=None)):
     """Get the workout catalog."""
-    return {"workouts": WORKOUTS}
+    return CATALOG_PAYLOADS.response(
+        "workouts", WORKOUTS, catalog_version(), if_none_match
+    )
+
+
+@app.get("/catalog/{catalog}/changes")
+def get_catalog_changes(catalog: str, since: int):
+    """Get the items of a catalog that changed since version `since`."""
+    catalogs = _catalogs()
+    if catalog not in catalogs:
+        raise HTTPException(404, f"unknown catalog '{catalog}'")
+    key, items = catalogs[catalog]
+    return CATALOG_PAYLOADS.changes(key, items, catalog_version(), since)
 
 
 @app.get("/data-summary")
-def get_data_summary():
-    """Get a summary of loaded data."""
-    from .db import collection_count
+def get_data_summary(precise: bool = False):
+    """Get a summary of loaded data.
+
+    Counts are estimated from collection metadata and cached briefly;
+    `precise=true` counts every collection exactly (slow on large collections).
+    """
+    counts, age = DATA_SUMMARY.counts(precise=precise)
 
     return {
-        "users": collection_count("users"),
-        "sleep_datasets": collection_count("sleep"),
-        "nutrition_datasets": collection_count("nutrition"),
-        "activity_datasets": collection_count("activity"),
-        "measurement_datasets": collection_count("measurements"),
-        "total_sleep_entries": collection_count("sleep"),
-        "total_nutrition_entries": collection_count("nutrition"),
-        "total_activity_entries": collection_count("activity"),
-        "total_measurement_entries": collection_count("measurements"),
+        "users": counts["users"],
+        "sleep_datasets": counts["sleep"],
+        "nutrition_datasets": counts["nutrition"],
+        "activity_datasets": counts["activity"],
+        "measurement_datasets": counts["measurements"],
+        "total_sleep_entries": counts["sleep"],
+        "total_nutrition_entries": counts["nutrition"],
+        "total_activity_entries": counts["activity"],
+        "total_measurement_entries": counts["measurements"],
+        "counts_precise": precise,
+        "counts_age_seconds": round(age, 1),
         "music_tracks": len(MUSIC),
         "meal_templates": len(MEALS),
         "workout_templates": len(WORKOUTS),
@@ -255,18 +531,30 @@ def get_data_summary():
 @app.get("/users/{user_id}/summary")
 def get_user_summary(user_id: str):
     """Get detailed summary for a specific user."""
-    summary = data_loader.get_user_summary(user_id)
-    if "error" in summary:
-        raise HTTPException(status_code=404, detail=summary["error"])
+    summary = get_user_data_summary(user_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="User not found")
     return summary
 
 
 @app.get("/users/{user_id}/recent")
 def get_user_recent_data(user_id: str, days: int = 7):
     """Get recent data for a user."""
-    recent_data = data_loader.get_recent_data(user_id, days)
-    if "error" in recent_data:
-        raise HTTPException(status_code=404, detail=recent_data["error"])
+    if not db_get_user(user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+
+    cutoff_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+    recent_data = {
+        "user_id": user_id,
+        "days": days,
+        "cutoff_date": cutoff_date,
+        "recent_sleep": get_user_entries_since("sleep", user_id, cutoff_date),
+        "recent_nutrition": get_user_entries_since("nutrition", user_id, cutoff_date),
+        "recent_activity": get_user_entries_since("activity", user_id, cutoff_date),
+    }
+    measurements = get_user_entries_since("measurements", user_id, cutoff_date)
+    if measurements:
+        recent_data["recent_measurements"] = measurements
     return recent_data
 
 
@@ -2,6 +2,7 @@
 
 import json
 import os
+import uuid
 from typing import Dict, Any
 from datetime import datetime
 import logging
@@ -52,7 +53,8 @@ class FeedbackKafkaProducer:
         try:
             # Create message with metadata
             message = {
-                "id": f"feedback_{int(datetime.now().timestamp()*1000)}",
+                # Unique per event: the worker deduplicates redelivered feedback by id
+                "id": f"feedback_{int(datetime.now().timestamp()*1000)}_{uuid.uuid4().hex[:12]}",
                 "timestamp": datetime.now().timestamp(),
                 "feedback": feedback_data
             }
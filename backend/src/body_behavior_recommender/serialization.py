@@ -0,0 +1,141 @@
+"""Fast JSON responses and pre-serialised payloads for static API responses."""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Sequence
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+CATALOG_MAX_AGE = int(os.getenv("BBR_CATALOG_MAX_AGE", "300"))
+CATALOG_HISTORY = int(os.getenv("BBR_CATALOG_HISTORY", "16"))
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson (numpy values and non-str keys allowed)."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+
+class CatalogSnapshot(NamedTuple):
+    """One encoded version of a catalog."""
+
+    version: int
+    items: Sequence[Any]
+    body: bytes
+    etag: str
+    item_hashes: Dict[str, str]  # item id -> content hash
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches `etag` (weak comparison)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag == "*" or tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class CatalogPayloads:
+    """Encodes each catalog once per catalog version and serves the bytes as-is.
+
+    A cached body is reused while the version is unchanged and the catalog is
+    still the same list object; anything else re-encodes it. Each encoded
+    version also gets a strong ETag and per-item content hashes, kept for the
+    last `history` versions so clients can ask for just what changed since the
+    version they hold.
+    """
+
+    def __init__(self, max_age: int = CATALOG_MAX_AGE, history: int = CATALOG_HISTORY):
+        self.max_age = max_age
+        self.history = history
+        self._current: Dict[str, CatalogSnapshot] = {}
+        self._history: Dict[str, "OrderedDict[int, Dict[str, str]]"] = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self, key: str, items: Sequence[Any], version: int) -> CatalogSnapshot:
+        """Return the encoded snapshot of `items` at `version`, building it once."""
+        cached = self._current.get(key)
+        if cached is not None and cached.version == version and cached.items is items:
+            return cached
+        with self._lock:
+            dumped = [item.model_dump() for item in items]
+            body = orjson.dumps({"count": len(items), key: dumped})
+            item_hashes = {
+                doc["id"]: _digest(orjson.dumps(doc, option=orjson.OPT_SORT_KEYS))
+                for doc in dumped
+            }
+            snapshot = CatalogSnapshot(
+                version, items, body, f'"{_digest(body)}"', item_hashes
+            )
+            self._current[key] = snapshot
+            versions = self._history.setdefault(key, OrderedDict())
+            versions[version] = item_hashes
+            while len(versions) > self.history:
+                versions.popitem(last=False)
+        return snapshot
+
+    def body(self, key: str, items: Sequence[Any], version: int) -> bytes:
+        """Return the encoded ``{key: [...], "count": n}`` payload for `items`."""
+        return self.snapshot(key, items, version).body
+
+    def headers(self, snapshot: CatalogSnapshot) -> Dict[str, str]:
+        return {
+            "ETag": snapshot.etag,
+            "Cache-Control": f"public, max-age={self.max_age}, must-revalidate",
+            "X-Catalog-Version": str(snapshot.version),
+        }
+
+    def response(
+        self,
+        key: str,
+        items: Sequence[Any],
+        version: int,
+        if_none_match: Optional[str] = None,
+    ) -> Response:
+        """Serve the cached payload, or an empty 304 if the client's ETag is current."""
+        snapshot = self.snapshot(key, items, version)
+        headers = self.headers(snapshot)
+        if etag_matches(if_none_match, snapshot.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(
+            content=snapshot.body, media_type="application/json", headers=headers
+        )
+
+    def changes(
+        self, key: str, items: Sequence[Any], version: int, since: int
+    ) -> Dict[str, Any]:
+        """Items added or changed and ids removed since catalog version `since`.
+
+        If `since` is unknown (too old, or never served) the whole catalog is
+        returned with ``full`` set.
+        """
+        snapshot = self.snapshot(key, items, version)
+        previous = self._history.get(key, {}).get(since)
+        if previous is None:
+            changed, removed = list(items), []
+        else:
+            changed = [
+                item
+                for item in items
+                if previous.get(item.id) != snapshot.item_hashes[item.id]
+            ]
+            removed = [item_id for item_id in previous if item_id not in snapshot.item_hashes]
+        return {
+            "version": snapshot.version,
+            "since": since,
+            "full": previous is None,
+            key: [item.model_dump() for item in changed],
+            "removed": removed,
+        }
+
+
+CATALOG_PAYLOADS = CatalogPayloads()
@@ -1,18 +1,22 @@
 """Business logic and services for the Body-to-Behavior Recommender."""
 
+import heapq
 import os
-import random
-from typing import Dict, List, Optional, Tuple
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple, TypeVar
 
 import numpy as np
-from mabwiser.mab import MAB, LearningPolicy, NeighborhoodPolicy
+from bbr_core.bandits import BanditPolicy
+from bbr_core.arms import ARMS
+from bbr_core.rewards import binarize_reward
+from bbr_core.state import state_context
+from mabwiser.mab import MAB
 from openai import OpenAI
 
 # Static catalogs for recommendations
-from .app import ARMS, MEALS, MUSIC, WORKOUTS
+from .app import MEALS, MUSIC, WORKOUTS
 from .models import (
     ActivityEntry,
-    Feedback,
     MealTemplate,
     MusicTrack,
     NutritionEntry,
@@ -25,7 +29,6 @@ from .utils import (
     clamp01,
     cosine_pref_fit,
     energy_cap_from_state,
-    get_today_iso,
     mean_std,
     novelty_bonus,
     risk_penalties_meal,
@@ -34,107 +37,7 @@ from .utils import (
     zone_from_state,
 )
 
-
-def compute_state_entries(
-    user: UserProfile,
-    sleep_entries: List[SleepEntry],
-    todays_nutrition: Optional[NutritionEntry],
-    activity_entries: List[ActivityEntry],
-) -> Dict[str, int]:
-    """Pure state computation from supplied entries (Mongo-friendly).
-
-    Falls back to default baselines when data slices are empty.
-    """
-    # Readiness
-    recent_sleep = sleep_entries[-2:]
-    if recent_sleep:
-        durations_h = [s.sleep_duration_minutes / 60 for s in recent_sleep]
-        avg_sleep = np.mean(durations_h)
-        sleep_debt = max(0.0, 8.0 - avg_sleep)
-        duration_score = clamp01(1 - sleep_debt / 2.0)
-        avg_efficiency = np.mean([s.sleep_efficiency for s in recent_sleep]) / 100.0
-        efficiency_score = clamp01(avg_efficiency)
-        # Bedtime consistency (use up to 7 entries)
-        bedtime_minutes = []
-        for s in sleep_entries[-7:]:
-            try:
-                hour, minute = map(int, s.bedtime.split(":"))
-                bedtime_minutes.append(hour * 60 + minute)
-            except Exception:
-                continue
-        if len(bedtime_minutes) >= 2:
-            bedtime_variance = np.std(bedtime_minutes)
-            bedtime_consistency = clamp01(1 - bedtime_variance / 120.0)
-        else:
-            bedtime_consistency = 0.5
-        # Recovery factor from last 7 activities
-        if len(activity_entries) >= 2:
-            today_steps = activity_entries[-1].steps
-            recent_steps = [a.steps for a in activity_entries[-7:]]
-            mean_s, std_s = mean_std(recent_steps)
-            if std_s > 0:
-                strain_z = (today_steps - mean_s) / std_s
-                recovery_factor = clamp01(1 - strain_z / 2.0)
-            else:
-                recovery_factor = 0.5
-        else:
-            recovery_factor = 0.5
-        sleep_component = 0.7 * duration_score + 0.3 * efficiency_score
-        readiness = round(
-            100
-            * (
-                0.50 * sleep_component
-                + 0.25 * bedtime_consistency
-                + 0.25 * recovery_factor
-            )
-        )
-    else:
-        readiness = 55
-
-    # Fuel
-    if todays_nutrition:
-        protein_target = (1.4 if user.goals == "endurance" else 1.2) * user.weight
-        fiber_target = 30.0
-        sugar_limit = 75.0
-        sodium_limit = 2300.0
-        protein_score = clamp01(todays_nutrition.protein_g / max(1.0, protein_target))
-        fiber_score = clamp01(todays_nutrition.fiber_g / fiber_target)
-        sugar_penalty = clamp01(todays_nutrition.sugar_g / sugar_limit)
-        sodium_penalty = clamp01(todays_nutrition.sodium_mg / sodium_limit)
-        fuel = round(
-            100
-            * (
-                0.45 * protein_score
-                + 0.25 * fiber_score
-                + 0.15 * (1 - sugar_penalty)
-                + 0.15 * (1 - sodium_penalty)
-            )
-        )
-    else:
-        fuel = 50
-
-    # Strain
-    if activity_entries:
-        today_activity = activity_entries[-1]
-        steps_7d = [a.steps for a in activity_entries[-7:]]
-        steps_mean, steps_std = mean_std(
-            steps_7d if steps_7d else [today_activity.steps]
-        )
-        steps_z_score = (today_activity.steps - steps_mean) / (
-            steps_std if steps_std else 1.0
-        )
-        steps_norm = 0.6 * clamp01((steps_z_score / 2.0) + 0.5)
-        hr_norm = 0.4 * clamp01((today_activity.heart_rate_avg - 90) / (170 - 90))
-        activity_norm = 0.2 * clamp01(today_activity.active_minutes / 120)
-        strain = round(100 * clamp01(steps_norm + hr_norm + activity_norm))
-    else:
-        strain = 40
-
-    return {
-        "Readiness": int(min(100, max(0, readiness))),
-        "Fuel": int(min(100, max(0, fuel))),
-        "Strain": int(min(100, max(0, strain))),
-    }
+T = TypeVar("T")
 
 
 def compute_state(user: UserProfile, user_id: str, today_iso: str) -> Dict[str, int]:
@@ -312,46 +215,30 @@ def _calculate_recovery_factor(user_id: str) -> float:
 
 
 # Global contextual bandit instances
-BANDITS: Dict[Tuple[str, str], MAB] = {}
+BANDIT_POLICY = BanditPolicy()
+BANDITS: Dict[Tuple[str, str], MAB] = BANDIT_POLICY.bandits
 
 
 def _get_state_context(state: Dict[str, int]) -> List[float]:
     """Convert state dict to context vector for bandit."""
-    return [
-        state["Readiness"] / 100.0,  # Normalize to 0-1
-        state["Fuel"] / 100.0,
-        state["Strain"] / 100.0,
-    ]
+    return state_context(state)
 
 
 def _get_or_create_bandit(user_id: str, domain: str) -> MAB:
     """Get or create a contextual bandit for user and domain."""
-    key = (user_id, domain)
-    if key not in BANDITS:
-        arms = list(ARMS[domain].keys())
-        # Use Thompson Sampling with contextual features
-        BANDITS[key] = MAB(
-            arms=arms,
-            learning_policy=LearningPolicy.ThompsonSampling(),
-            neighborhood_policy=NeighborhoodPolicy.KNearest(k=3),
-        )
-    return BANDITS[key]
+    return BANDIT_POLICY.get(user_id, domain)
 
 
 def thompson_sample_contextual(user_id: str, domain: str, state: Dict[str, int]) -> str:
     """Thompson sampling with state context using MABWiser."""
-    bandit = _get_or_create_bandit(user_id, domain)
-    context = _get_state_context(state)
+    return BANDIT_POLICY.sample(user_id, domain, state)
 
-    try:
-        # If bandit has been trained, predict with context
-        arm = bandit.predict([context])[0]
-    except:
-        # If not trained yet, randomly select an arm
-        arms = list(ARMS[domain].keys())
-        arm = random.choice(arms)
 
-    return arm
+def thompson_sample_contextual_batch(
+    user_id: str, domain: str, state: Dict[str, int], n: int
+) -> List[str]:
+    """Draw `n` Thompson samples for one user, domain and state in a single predict call."""
+    return BANDIT_POLICY.sample_batch(user_id, domain, state, n)
 
 
 # Candidate filtering and ranking
@@ -412,10 +299,10 @@ def filter_workout_candidates(
     return allowed
 
 
-def rank_music(
+def score_music(
     cands: List[MusicTrack], user: UserProfile, state: Dict[str, int]
 ) -> List[Tuple[MusicTrack, float]]:
-    """Rank music candidates by preference and state fit."""
+    """Score music candidates by preference and state fit (unsorted)."""
     results = []
     for m in cands:
         PrefFit = cosine_pref_fit(user.pref_music_genres, m.genres)
@@ -432,19 +319,18 @@ def rank_music(
             + 0.10 * novelty_bonus(m.id, "music")
         )
         results.append((m, score))
-    results.sort(key=lambda x: x[1], reverse=True)
     return results
 
 
-def rank_meals(
-    cands: List[MealTemplate], user: UserProfile, state: Dict[str, int]
+def score_meals(
+    cands: List[MealTemplate],
+    user: UserProfile,
+    state: Dict[str, int],
+    todays_nutrition: Optional[NutritionEntry] = None,
 ) -> List[Tuple[MealTemplate, float]]:
-    """Rank meal candidates by nutritional needs and preferences."""
+    """Score meal candidates by nutritional needs and preferences (unsorted)."""
     # Compute macro gaps from today's totals
-    today = get_today_iso(None)
-    todays = next(
-        (n for n in reversed(NUTRITION.get(user.user_id, [])) if n.date <= today), None
-    )
+    todays = todays_nutrition
     P_now, fiber_now, sugar_now, sodium_now = (
         (todays.protein_g, todays.fiber_g, todays.sugar_g, todays.sodium_mg)
         if todays
@@ -486,14 +372,13 @@ def rank_meals(
             + 0.10 * novelty_bonus(meal.id, "meal")
         )
         results.append((meal, score))
-    results.sort(key=lambda x: x[1], reverse=True)
     return results
 
 
-def rank_workouts(
+def score_workouts(
     cands: List[WorkoutTemplate], user: UserProfile, state: Dict[str, int]
 ) -> List[Tuple[WorkoutTemplate, float]]:
-    """Rank workout candidates by user goals and current state."""
+    """Score workout candidates by user goals and current state (unsorted)."""
     results = []
     for w in cands:
         Risk = risk_penalties_workout(w, user, state)
@@ -512,10 +397,47 @@ def rank_workouts(
             - 0.25 * Risk
         )
         results.append((w, score))
-    results.sort(key=lambda x: x[1], reverse=True)
     return results
 
 
+def top_k(scored: List[Tuple[T, float]], k: Optional[int] = None) -> List[Tuple[T, float]]:
+    """Best-first (item, score) pairs; with `k`, only the k best via partial selection."""
+    if k is None:
+        return sorted(scored, key=itemgetter(1), reverse=True)
+    return heapq.nlargest(k, scored, key=itemgetter(1))
+
+
+def rank_music(
+    cands: List[MusicTrack],
+    user: UserProfile,
+    state: Dict[str, int],
+    k: Optional[int] = None,
+) -> List[Tuple[MusicTrack, float]]:
+    """Rank music candidates by preference and state fit."""
+    return top_k(score_music(cands, user, state), k)
+
+
+def rank_meals(
+    cands: List[MealTemplate],
+    user: UserProfile,
+    state: Dict[str, int],
+    todays_nutrition: Optional[NutritionEntry] = None,
+    k: Optional[int] = None,
+) -> List[Tuple[MealTemplate, float]]:
+    """Rank meal candidates by nutritional needs and preferences."""
+    return top_k(score_meals(cands, user, state, todays_nutrition), k)
+
+
+def rank_workouts(
+    cands: List[WorkoutTemplate],
+    user: UserProfile,
+    state: Dict[str, int],
+    k: Optional[int] = None,
+) -> List[Tuple[WorkoutTemplate, float]]:
+    """Rank workout candidates by user goals and current state."""
+    return top_k(score_workouts(cands, user, state), k)
+
+
 def choose_domain(
     intent: Optional[str], state: Dict[str, int], hours_since_last_meal: Optional[float]
 ) -> str:
@@ -529,30 +451,6 @@ def choose_domain(
     return "music"
 
 
-def reward_from_feedback(domain: str, fb: Feedback) -> float:
-    """Calculate reward from user feedback."""
-    if domain == "music":
-        return clamp01(
-            0.4 * (fb.hr_zone_frac or 0)
-            + 0.3 * (1 if fb.thumbs > 0 else 0)
-            + 0.2 * (fb.completed or 0)
-            + 0.1 * (0 if (fb.skipped_early or 0) else 1)
-        )
-    if domain == "meal":
-        return clamp01(
-            0.5 * (fb.ate or 0)
-            + 0.3 * (fb.protein_gap_closed_norm or 0)
-            + 0.2 * (1 if fb.thumbs > 0 else 0)
-        )
-    if domain == "workout":
-        return clamp01(
-            0.4 * (fb.completed or 0)
-            + 0.3 * (fb.hr_zone_frac or 0)
-            + 0.3 * (1 - min(1.0, abs((fb.rpe or 0) - 5) / 5))
-        )
-    return 0.0
-
-
 def update_bandit(
     user_id: str,
     domain: str,
@@ -561,47 +459,11 @@ def update_bandit(
     state: Optional[Dict[str, int]] = None,
 ):
     """Update bandit arm based on reward with optional state context."""
-    bandit = _get_or_create_bandit(user_id, domain)
-    original_r = r
-    # ThompsonSampling (Beta) in mabwiser expects binary rewards unless binarizer specified.
-    # To prevent runtime errors, binarize when r not in {0,1}.
+    # ThompsonSampling (Beta) in mabwiser expects binary rewards; the policy binarizes
+    BANDIT_POLICY.update(user_id, domain, arm_id, r, state)
     if r not in (0, 1):
-        r = 1.0 if r >= 0.6 else 0.0
-    if state is not None:
-        context = _get_state_context(state)
-        bandit.partial_fit(decisions=[arm_id], rewards=[r], contexts=[context])
-    else:
-        bandit.partial_fit(decisions=[arm_id], rewards=[r])
-    if original_r != r:
         # Lightweight debug print (avoid heavy logging dependencies here)
-        print(f"📊 Bandit reward binarized {original_r:.3f} -> {r} for {user_id}/{domain}/{arm_id}")
-
-
-def update_preferences(
-    user: UserProfile, domain: str, item_tags: List[str], thumbs: int
-):
-    """Update user preferences based on feedback."""
-    if thumbs == 0 or not item_tags:
-        return
-    lr_fast = 0.3
-    if domain == "music":
-        for t in item_tags:
-            w = user.pref_music_genres.get(t, 0.0)
-            user.pref_music_genres[t] = float(
-                np.clip(w + (lr_fast if thumbs > 0 else -lr_fast), 0.0, 1.0)
-            )
-    elif domain == "meal":
-        for t in item_tags:
-            w = user.pref_meal_cuisines.get(t, 0.0)
-            user.pref_meal_cuisines[t] = float(
-                np.clip(w + (lr_fast if thumbs > 0 else -lr_fast), 0.0, 1.0)
-            )
-    elif domain == "workout":
-        for t in item_tags:
-            w = user.pref_workout_focus.get(t, 0.0)
-            user.pref_workout_focus[t] = float(
-                np.clip(w + (lr_fast if thumbs > 0 else -lr_fast), 0.0, 1.0)
-            )
+        print(f"📊 Bandit reward binarized {r:.3f} -> {binarize_reward(r)} for {user_id}/{domain}/{arm_id}")
 
 
 def generate_recommendation_explanation(
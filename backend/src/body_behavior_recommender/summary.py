@@ -0,0 +1,78 @@
+"""Cached collection counts behind the /data-summary endpoint."""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from .db import COLLECTIONS, collection_counts
+
+SUMMARY_TTL = float(os.getenv("BBR_SUMMARY_TTL", "30"))
+SUMMARY_REFRESH_INTERVAL = float(os.getenv("BBR_SUMMARY_REFRESH_INTERVAL", "20"))
+
+
+class CountSummary:
+    """Serves collection counts from a short-lived cache.
+
+    Estimated counts are read from collection metadata and cached for `ttl`
+    seconds; a daemon thread started on first use refreshes them every
+    `refresh_interval` seconds, so dashboard polls almost never reach MongoDB.
+    Precise counts are computed on demand and never cached.
+    """
+
+    def __init__(
+        self,
+        ttl: float = SUMMARY_TTL,
+        refresh_interval: Optional[float] = SUMMARY_REFRESH_INTERVAL,
+        count: Callable[..., Dict[str, int]] = collection_counts,
+    ):
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self._count = count
+        self._cached: Optional[Tuple[float, Dict[str, int]]] = None
+        self._lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def counts(self, precise: bool = False) -> Tuple[Dict[str, int], float]:
+        """Return (counts per collection, age of the counts in seconds)."""
+        if precise:
+            return self._count(COLLECTIONS, precise=True), 0.0
+        self._start_refresher()
+        cached = self._cached
+        if cached is None or time.monotonic() - cached[0] > self.ttl:
+            with self._lock:
+                # Another request may have refreshed while we waited
+                cached = self._cached
+                if cached is None or time.monotonic() - cached[0] > self.ttl:
+                    cached = self._refresh()
+        return cached[1], time.monotonic() - cached[0]
+
+    def _refresh(self) -> Tuple[float, Dict[str, int]]:
+        self._cached = (time.monotonic(), self._count(COLLECTIONS))
+        return self._cached
+
+    def _start_refresher(self):
+        if self._refresher is not None or not self.refresh_interval:
+            return
+        with self._lock:
+            if self._refresher is None:
+                self._refresher = threading.Thread(
+                    target=self._refresh_loop, name="summary-refresher", daemon=True
+                )
+                self._refresher.start()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                with self._lock:
+                    self._refresh()
+            except Exception as e:
+                print(f"⚠️ Data summary refresh failed, serving cached counts: {e}")
+
+    def stop(self):
+        """Stop the background refresher."""
+        self._stop.set()
+
+
+DATA_SUMMARY = CountSummary()
@@ -2,9 +2,10 @@
 
 import random
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional
 
 import numpy as np
+from bbr_core.utils import clamp01, mean_std  # noqa: F401  (shared implementations)
 
 from .models import (
     MealTemplate,
@@ -13,11 +14,6 @@ from .models import (
 )
 
 
-def clamp01(x: float) -> float:
-    """Clamp a value between 0 and 1."""
-    return max(0.0, min(1.0, x))
-
-
 def normalize01(x: float, lo: float, hi: float) -> float:
     """Normalize a value to 0-1 range."""
     if hi <= lo:
@@ -25,15 +21,6 @@ def normalize01(x: float, lo: float, hi: float) -> float:
     return clamp01((x - lo) / (hi - lo))
 
 
-def mean_std(values: List[float]) -> Tuple[float, float]:
-    """Calculate mean and standard deviation of values."""
-    if not values:
-        return 0.0, 1.0
-    mu = float(np.mean(values))
-    sigma = float(np.std(values)) or 1.0
-    return mu, sigma
-
-
 def get_today_iso(now_iso: Optional[str]) -> str:
     """Get today's date in ISO format."""
     if now_iso:
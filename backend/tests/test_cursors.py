@@ -0,0 +1,42 @@
+"""Tests for the pagination cursor store."""
+
+from unittest.mock import patch
+
+from body_behavior_recommender.cursors import CursorStore
+
+
+class TestCursorStore:
+    """Test opaque cursor storage."""
+
+    def test_put_and_get(self):
+        """A stored value is returned for its token; unknown tokens miss."""
+        store = CursorStore(max_size=10, ttl=60)
+        token = store.put({"offset": 3})
+
+        assert isinstance(token, str)
+        assert store.get(token) == {"offset": 3}
+        assert store.get("not-a-token") is None
+
+    def test_tokens_are_unique(self):
+        """Every put issues a fresh token."""
+        store = CursorStore(max_size=10, ttl=60)
+        assert store.put(1) != store.put(1)
+
+    def test_oldest_entries_evicted(self):
+        """The store never grows beyond max_size."""
+        store = CursorStore(max_size=2, ttl=60)
+        first = store.put("a")
+        store.put("b")
+        store.put("c")
+
+        assert len(store) == 2
+        assert store.get(first) is None
+
+    def test_entries_expire(self):
+        """Entries older than the ttl miss and are dropped."""
+        store = CursorStore(max_size=10, ttl=5)
+        with patch("body_behavior_recommender.cursors.time.monotonic", return_value=100.0):
+            token = store.put("a")
+        with patch("body_behavior_recommender.cursors.time.monotonic", return_value=106.0):
+            assert store.get(token) is None
+        assert len(store) == 0
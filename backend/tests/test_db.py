@@ -0,0 +1,158 @@
+"""Tests for MongoDB helpers that don't need a running database."""
+
+from unittest.mock import MagicMock, patch
+
+from bbr_core.preferences import build_preference_pipeline
+
+from body_behavior_recommender.db import (
+    get_recent_entries_batch,
+    get_user_data_summary,
+    get_users_by_ids,
+)
+
+
+def _clamped_add(path, step):
+    return {"$min": [1.0, {"$max": [0.0, {"$add": [{"$ifNull": [f"${path}", 0.0]}, step]}]}]}
+
+
+class TestPreferencePipeline:
+    """Test preference delta update pipelines."""
+
+    def test_single_stage_for_distinct_tags(self):
+        """Deltas on different weights share one $set stage."""
+        pipeline = build_preference_pipeline(
+            [("pref_music_genres", "pop", 0.3), ("pref_music_genres", "rock", 0.3)]
+        )
+        assert pipeline == [
+            {
+                "$set": {
+                    "pref_music_genres.pop": _clamped_add("pref_music_genres.pop", 0.3),
+                    "pref_music_genres.rock": _clamped_add("pref_music_genres.rock", 0.3),
+                }
+            }
+        ]
+
+    def test_repeated_tag_starts_new_stage(self):
+        """A weight updated twice is clamped after each step, in order."""
+        pipeline = build_preference_pipeline(
+            [("pref_music_genres", "pop", 0.3), ("pref_music_genres", "pop", -0.3)]
+        )
+        assert len(pipeline) == 2
+        assert pipeline[1]["$set"]["pref_music_genres.pop"] == _clamped_add(
+            "pref_music_genres.pop", -0.3
+        )
+
+    def test_empty_deltas(self):
+        """No deltas build an empty pipeline."""
+        assert build_preference_pipeline([]) == []
+
+
+class TestRecentEntriesBatch:
+    """Test the batched recent-entries lookup."""
+
+    @patch("body_behavior_recommender.db.get_database")
+    def test_groups_chronologically_per_user(self, mock_get_database):
+        """Each user's $topN window is returned oldest first; missing users map to []."""
+        collection = MagicMock()
+        collection.aggregate.return_value = [
+            {
+                "_id": "u1",
+                "docs": [
+                    {"_id": "b", "user_id": "u1", "date": "2024-01-02", "steps": 2,
+                     "calories_burned": 0, "active_minutes": 0, "distance_km": 0.0,
+                     "heart_rate_avg": 0, "workout_duration": 0},
+                    {"_id": "a", "user_id": "u1", "date": "2024-01-01", "steps": 1,
+                     "calories_burned": 0, "active_minutes": 0, "distance_km": 0.0,
+                     "heart_rate_avg": 0, "workout_duration": 0},
+                ],
+            }
+        ]
+        mock_get_database.return_value = {"activity": collection}
+
+        entries = get_recent_entries_batch("activity", ["u1", "u2"], limit=2)
+
+        assert [e["date"] for e in entries["u1"]] == ["2024-01-01", "2024-01-02"]
+        assert entries["u2"] == []
+        pipeline = collection.aggregate.call_args[0][0]
+        assert pipeline[0] == {"$match": {"user_id": {"$in": ["u1", "u2"]}}}
+        assert pipeline[1]["$group"]["docs"]["$topN"]["n"] == 2
+
+    @patch("body_behavior_recommender.db.get_database")
+    def test_empty_user_list_skips_database(self, mock_get_database):
+        """No query is issued for an empty batch."""
+        assert get_recent_entries_batch("sleep", []) == {}
+        mock_get_database.assert_not_called()
+
+
+class TestUsersByIds:
+    """Test the batched user lookup."""
+
+    @patch("body_behavior_recommender.db.get_database")
+    def test_one_in_query_on_shared_client(self, mock_get_database):
+        """Users come from one `$in` find on the shared client, keyed by user_id."""
+        users = MagicMock()
+        users.find.return_value = iter(
+            [
+                {"user_id": "u1", "age": 30, "weight": 70.0, "height": 175.0, "bmi": 22.9,
+                 "fitness_level": "intermediate", "goals": "endurance", "join_date": "2024-01-01"},
+            ]
+        )
+        mock_get_database.return_value = {"users": users}
+
+        found = get_users_by_ids(["u1", "u2"])
+
+        assert list(found) == ["u1"]
+        assert found["u1"]["age"] == 30
+        users.find.assert_called_once_with({"user_id": {"$in": ["u1", "u2"]}}, {"_id": 0})
+
+
+class TestUserDataSummary:
+    """Test the one-aggregation user summary."""
+
+    @patch("body_behavior_recommender.db.get_database")
+    def test_summary_from_facets(self, mock_get_database):
+        """Counts, ranges and the latest measurement come from one pipeline."""
+        database = MagicMock()
+        users, sleep = MagicMock(), MagicMock()
+        database.__getitem__.side_effect = lambda name: {"users": users, "sleep": sleep}[name]
+        users.find_one.return_value = {"user_id": "u1", "age": 30}
+        sleep.aggregate.return_value = iter(
+            [
+                {
+                    "ranges": [
+                        {"_id": "sleep", "count": 2, "start": "2024-01-01", "end": "2024-01-02"},
+                        {"_id": "measurements", "count": 1, "start": "2024-01-03", "end": "2024-01-03"},
+                    ],
+                    "latest_measurement": [{"user_id": "u1", "date": "2024-01-03"}],
+                }
+            ]
+        )
+        mock_get_database.return_value = database
+
+        summary = get_user_data_summary("u1")
+
+        assert summary["profile"] == {"user_id": "u1", "age": 30}
+        assert summary["data_counts"] == {
+            "sleep_entries": 2,
+            "nutrition_entries": 0,
+            "activity_entries": 0,
+            "measurement_entries": 1,
+        }
+        assert summary["date_ranges"]["sleep"] == {"start": "2024-01-01", "end": "2024-01-02"}
+        assert summary["date_ranges"]["activity"] == {"start": None, "end": None}
+        assert summary["date_ranges"]["measurements"] == {"start": "2024-01-03", "end": "2024-01-03"}
+        assert summary["latest_measurement"]["date"] == "2024-01-03"
+        pipeline = sleep.aggregate.call_args[0][0]
+        assert [stage for stage in pipeline if "$unionWith" in stage][0]["$unionWith"]["coll"] == "nutrition"
+        assert "$facet" in pipeline[-1]
+        sleep.aggregate.assert_called_once()
+
+    @patch("body_behavior_recommender.db.get_database")
+    def test_summary_unknown_user(self, mock_get_database):
+        """Unknown users return None without aggregating."""
+        database = MagicMock()
+        database.__getitem__.return_value.find_one.return_value = None
+        mock_get_database.return_value = database
+
+        assert get_user_data_summary("nope") is None
+        database.__getitem__.return_value.aggregate.assert_not_called()
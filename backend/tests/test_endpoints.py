@@ -368,20 +368,317 @@ class TestRecommendEndpoint:
             mock_choose.assert_called_once()
 
 
+class TestRecommendTopK:
+    """Test top-k recommendations and cursor paging."""
+
+    @patch("body_behavior_recommender.endpoints.db_get_user")
+    @patch("body_behavior_recommender.endpoints.get_recent_entries")
+    @patch("body_behavior_recommender.endpoints.thompson_sample_contextual")
+    @patch("body_behavior_recommender.endpoints.filter_music_candidates")
+    @patch("body_behavior_recommender.endpoints.score_music")
+    def test_top_k_pages_with_cursor(
+        self,
+        mock_score,
+        mock_filter,
+        mock_thompson,
+        mock_get_entries,
+        mock_get_user,
+        client,
+        mock_user_doc,
+        sample_music_track,
+    ):
+        """Pages follow one ranking and the last page has no cursor."""
+        tracks = [sample_music_track.model_copy(update={"id": f"t{i}"}) for i in range(5)]
+        mock_get_user.return_value = mock_user_doc
+        mock_get_entries.return_value = []
+        mock_thompson.return_value = "lofi_low"
+        mock_filter.return_value = tracks
+        mock_score.return_value = [(t, s) for t, s in zip(tracks, [0.1, 0.5, 0.3, 0.9, 0.7])]
+
+        response = client.post(
+            "/recommend", json={"user_id": "test_user_1", "intent": "music", "k": 2}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert [r["item"]["id"] for r in data["top_k"]] == ["t3", "t4"]
+        assert data["item"]["id"] == "t3"
+        assert data["next_cursor"]
+
+        response = client.post(
+            "/recommend",
+            json={"user_id": "test_user_1", "cursor": data["next_cursor"]},
+        )
+        data = response.json()
+        assert [r["item"]["id"] for r in data["top_k"]] == ["t1", "t2"]
+        assert data["bandit_arm"] == "lofi_low"
+
+        response = client.post(
+            "/recommend",
+            json={"user_id": "test_user_1", "cursor": data["next_cursor"]},
+        )
+        data = response.json()
+        assert [r["item"]["id"] for r in data["top_k"]] == ["t0"]
+        assert data["next_cursor"] is None
+        # Later pages reuse the stored state and scores
+        assert mock_get_user.call_count == 1
+        assert mock_score.call_count == 1
+
+    def test_unknown_cursor(self, client):
+        """Unknown or expired cursors are rejected."""
+        response = client.post(
+            "/recommend", json={"user_id": "test_user_1", "cursor": "bogus"}
+        )
+        assert response.status_code == 410
+
+
+class TestBatchRecommendEndpoint:
+    """Test batch recommendation endpoint."""
+
+    @patch("body_behavior_recommender.endpoints.get_users_by_ids")
+    @patch("body_behavior_recommender.endpoints.get_recent_entries_batch")
+    @patch("body_behavior_recommender.endpoints.thompson_sample_contextual_batch")
+    @patch("body_behavior_recommender.endpoints.filter_music_candidates")
+    @patch("body_behavior_recommender.endpoints.rank_music")
+    def test_recommend_batch_preserves_order_and_reports_errors(
+        self,
+        mock_rank,
+        mock_filter,
+        mock_thompson,
+        mock_get_entries,
+        mock_get_users,
+        client,
+        mock_user_doc,
+        mock_sleep_docs,
+        mock_nutrition_docs,
+        mock_activity_docs,
+        sample_music_track,
+    ):
+        """Results come back in input order with per-request errors."""
+        mock_get_users.return_value = {"test_user_1": mock_user_doc}
+        mock_get_entries.side_effect = [
+            {"test_user_1": mock_sleep_docs, "missing_user": []},
+            {"test_user_1": mock_nutrition_docs, "missing_user": []},
+            {"test_user_1": mock_activity_docs, "missing_user": []},
+        ]
+        mock_thompson.return_value = ["high_energy", "calm"]
+        mock_filter.return_value = [sample_music_track]
+        mock_rank.return_value = [(sample_music_track, 0.85)]
+
+        request_data = {
+            "requests": [
+                {"user_id": "test_user_1", "intent": "music"},
+                {"user_id": "missing_user", "intent": "music"},
+                {"user_id": "test_user_1", "intent": "music"},
+            ]
+        }
+
+        response = client.post("/recommend/batch", json=request_data)
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["user_id"] for r in results] == [
+            "test_user_1",
+            "missing_user",
+            "test_user_1",
+        ]
+        assert results[0]["recommendation"]["bandit_arm"] == "high_energy"
+        assert results[0]["recommendation"]["item"]["id"] == sample_music_track.id
+        assert results[1]["recommendation"] is None
+        assert results[1]["error"] == "user not found"
+        assert results[2]["recommendation"]["bandit_arm"] == "calm"
+        # One $in lookup for users and one sampling call for the shared user/domain
+        mock_get_users.assert_called_once_with(["test_user_1", "missing_user"])
+        assert mock_thompson.call_count == 1
+        assert mock_thompson.call_args[0][3] == 2
+
+    @patch("body_behavior_recommender.endpoints.get_users_by_ids")
+    @patch("body_behavior_recommender.endpoints.get_recent_entries_batch")
+    @patch("body_behavior_recommender.endpoints.thompson_sample_contextual_batch")
+    @patch("body_behavior_recommender.endpoints.filter_music_candidates")
+    @patch("body_behavior_recommender.endpoints.rank_music")
+    def test_recommend_batch_no_candidates(
+        self,
+        mock_rank,
+        mock_filter,
+        mock_thompson,
+        mock_get_entries,
+        mock_get_users,
+        client,
+        mock_user_doc,
+    ):
+        """A request without candidates gets an error, not a failed batch."""
+        mock_get_users.return_value = {"test_user_1": mock_user_doc}
+        mock_get_entries.return_value = {"test_user_1": []}
+        mock_thompson.return_value = ["high_energy"]
+        mock_filter.return_value = []
+        mock_rank.return_value = []
+
+        response = client.post(
+            "/recommend/batch",
+            json={"requests": [{"user_id": "test_user_1", "intent": "music"}]},
+        )
+
+        assert response.status_code == 200
+        result = response.json()["results"][0]
+        assert result["recommendation"] is None
+        assert result["error"] == "no music candidates"
+
+    @patch("body_behavior_recommender.endpoints.get_users_by_ids")
+    @patch("body_behavior_recommender.endpoints.get_recent_entries_batch")
+    @patch("body_behavior_recommender.endpoints.thompson_sample_contextual_batch")
+    @patch("body_behavior_recommender.endpoints.filter_music_candidates")
+    @patch("body_behavior_recommender.endpoints.rank_music")
+    @patch("body_behavior_recommender.endpoints.generate_recommendation_explanation")
+    def test_recommend_batch_explanations(
+        self,
+        mock_explain,
+        mock_rank,
+        mock_filter,
+        mock_thompson,
+        mock_get_entries,
+        mock_get_users,
+        client,
+        mock_user_doc,
+        sample_music_track,
+    ):
+        """Explanations are only generated when requested."""
+        mock_get_users.return_value = {"test_user_1": mock_user_doc}
+        mock_get_entries.return_value = {"test_user_1": []}
+        mock_thompson.return_value = ["high_energy"]
+        mock_filter.return_value = [sample_music_track]
+        mock_rank.return_value = [(sample_music_track, 0.85)]
+        mock_explain.return_value = "Because you slept well."
+
+        request = {"requests": [{"user_id": "test_user_1", "intent": "music"}]}
+        response = client.post("/recommend/batch", json=request)
+        assert response.json()["results"][0]["recommendation"]["explanation"] is None
+        mock_explain.assert_not_called()
+
+        response = client.post("/recommend/batch", json={**request, "explain": True})
+        explanation = response.json()["results"][0]["recommendation"]["explanation"]
+        assert explanation == "Because you slept well."
+
+    def test_recommend_batch_empty(self, client):
+        """An empty batch is rejected."""
+        response = client.post("/recommend/batch", json={"requests": []})
+        assert response.status_code == 422
+
+
+class TestBundleEndpoint:
+    """Test multi-domain bundle endpoint."""
+
+    @patch("body_behavior_recommender.endpoints.db_get_user")
+    @patch("body_behavior_recommender.endpoints.get_recent_entries")
+    @patch("body_behavior_recommender.endpoints.thompson_sample_contextual")
+    @patch("body_behavior_recommender.endpoints.rank_music")
+    @patch("body_behavior_recommender.endpoints.rank_meals")
+    @patch("body_behavior_recommender.endpoints.rank_workouts")
+    def test_bundle_success(
+        self,
+        mock_rank_workouts,
+        mock_rank_meals,
+        mock_rank_music,
+        mock_thompson,
+        mock_get_entries,
+        mock_get_user,
+        client,
+        mock_user_doc,
+        mock_sleep_docs,
+        mock_nutrition_docs,
+        mock_activity_docs,
+        sample_music_track,
+        sample_meal_template,
+        sample_workout_template,
+    ):
+        """All three domains come back from one state computation."""
+        mock_get_user.return_value = mock_user_doc
+        mock_get_entries.side_effect = [
+            mock_sleep_docs,
+            mock_nutrition_docs,
+            mock_activity_docs,
+        ]
+        mock_thompson.side_effect = lambda user_id, domain, state: {
+            "music": "lofi_low",
+            "meal": "bowl",
+            "workout": "z2_walk",
+        }[domain]
+        mock_rank_music.return_value = [(sample_music_track, 0.9), (sample_music_track, 0.5)]
+        mock_rank_meals.return_value = [(sample_meal_template, 0.8)]
+        mock_rank_workouts.return_value = [(sample_workout_template, 0.7)]
+
+        response = client.post("/recommend/bundle", json={"user_id": "test_user_1", "k": 2})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert "state" in data
+        recs = data["recommendations"]
+        assert set(recs) == {"music", "meal", "workout"}
+        assert recs["music"]["item"]["id"] == sample_music_track.id
+        assert [r["score"] for r in recs["music"]["top_k"]] == [0.9, 0.5]
+        assert recs["meal"]["item"]["id"] == sample_meal_template.id
+        assert recs["workout"]["item"]["id"] == sample_workout_template.id
+        assert mock_get_entries.call_count == 3
+        # Meals are ranked against today's nutrition entry
+        assert mock_rank_meals.call_args[0][3].date == "2024-01-15"
+
+    @patch("body_behavior_recommender.endpoints.db_get_user")
+    @patch("body_behavior_recommender.endpoints.get_recent_entries")
+    @patch("body_behavior_recommender.endpoints.thompson_sample_contextual")
+    @patch("body_behavior_recommender.endpoints.rank_music")
+    @patch("body_behavior_recommender.endpoints.rank_meals")
+    @patch("body_behavior_recommender.endpoints.rank_workouts")
+    def test_bundle_domain_without_candidates(
+        self,
+        mock_rank_workouts,
+        mock_rank_meals,
+        mock_rank_music,
+        mock_thompson,
+        mock_get_entries,
+        mock_get_user,
+        client,
+        mock_user_doc,
+        sample_music_track,
+        sample_meal_template,
+    ):
+        """An empty domain reports an error without failing the bundle."""
+        mock_get_user.return_value = mock_user_doc
+        mock_get_entries.return_value = []
+        mock_thompson.side_effect = lambda user_id, domain, state: {
+            "music": "lofi_low",
+            "meal": "bowl",
+            "workout": "z2_walk",
+        }[domain]
+        mock_rank_music.return_value = [(sample_music_track, 0.9)]
+        mock_rank_meals.return_value = [(sample_meal_template, 0.8)]
+        mock_rank_workouts.return_value = []
+
+        response = client.post("/recommend/bundle", json={"user_id": "test_user_1"})
+
+        assert response.status_code == 200
+        workout = response.json()["recommendations"]["workout"]
+        assert workout["item"] is None
+        assert workout["error"] == "no workout candidates"
+
+    @patch("body_behavior_recommender.endpoints.db_get_user")
+    def test_bundle_user_not_found(self, mock_get_user, client):
+        """Unknown users get a 404."""
+        mock_get_user.return_value = None
+
+        response = client.post("/recommend/bundle", json={"user_id": "nonexistent"})
+
+        assert response.status_code == 404
+
+
 class TestFeedbackEndpoint:
     """Test feedback submission endpoint."""
 
     @patch("body_behavior_recommender.endpoints.db_get_user")
     @patch("body_behavior_recommender.endpoints.get_recent_entries")
     @patch("body_behavior_recommender.endpoints.thompson_sample_contextual")
-    @patch("body_behavior_recommender.endpoints.reward_from_feedback")
     @patch("body_behavior_recommender.endpoints.update_bandit")
-    @patch("body_behavior_recommender.endpoints.update_preferences")
     def test_submit_feedback_success(
         self,
-        mock_update_pref,
         mock_update_bandit,
-        mock_reward,
         mock_thompson,
         mock_get_entries,
         mock_get_user,
@@ -399,7 +696,6 @@ class TestFeedbackEndpoint:
             mock_activity_docs,
         ]
         mock_thompson.return_value = "high_energy"
-        mock_reward.return_value = 0.8
 
         feedback_data = {
             "user_id": "test_user_1",
@@ -417,10 +713,8 @@ class TestFeedbackEndpoint:
         data = response.json()
         assert data["status"] == "feedback recorded"
 
-        # Verify the reward calculation and bandit update were called
-        mock_reward.assert_called_once()
+        # Verify the bandit update was called
         mock_update_bandit.assert_called_once()
-        mock_update_pref.assert_called_once()
 
     @patch("body_behavior_recommender.endpoints.db_get_user")
     def test_submit_feedback_user_not_found(self, mock_get_user, client):
@@ -480,6 +774,69 @@ class TestCatalogEndpoints:
         assert "count" in data
 
 
+class TestCatalogCaching:
+    """Test conditional GETs and catalog deltas."""
+
+    def test_catalog_conditional_get(self, client):
+        """Revalidating with the ETag returns 304 without a body."""
+        response = client.get("/catalog/music")
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        assert "max-age" in response.headers["cache-control"]
+
+        response = client.get("/catalog/music", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+    def test_catalog_changes(self, client):
+        """No changes are reported against the current version."""
+        version = int(client.get("/catalog/workouts").headers["x-catalog-version"])
+
+        response = client.get(f"/catalog/workouts/changes?since={version}")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["full"] is False
+        assert data["workouts"] == []
+        assert data["removed"] == []
+
+    def test_unknown_catalog_changes(self, client):
+        """Unknown catalogs are a 404."""
+        response = client.get("/catalog/podcasts/changes?since=1")
+        assert response.status_code == 404
+
+
+class TestDataSummaryEndpoint:
+    """Test data summary endpoint."""
+
+    @patch("body_behavior_recommender.endpoints.DATA_SUMMARY")
+    def test_data_summary(self, mock_summary, client):
+        """Counts come from the cached summary service."""
+        counts = {c: 5 for c in ["users", "sleep", "nutrition", "activity", "measurements"]}
+        mock_summary.counts.return_value = (counts, 2.04)
+
+        response = client.get("/data-summary")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["users"] == 5
+        assert data["total_sleep_entries"] == 5
+        assert data["counts_precise"] is False
+        assert data["counts_age_seconds"] == 2.0
+        mock_summary.counts.assert_called_once_with(precise=False)
+
+    @patch("body_behavior_recommender.endpoints.DATA_SUMMARY")
+    def test_data_summary_precise(self, mock_summary, client):
+        """precise=true is passed through."""
+        counts = {c: 5 for c in ["users", "sleep", "nutrition", "activity", "measurements"]}
+        mock_summary.counts.return_value = (counts, 0.0)
+
+        response = client.get("/data-summary?precise=true")
+
+        assert response.json()["counts_precise"] is True
+        mock_summary.counts.assert_called_once_with(precise=True)
+
+
 class TestUserEndpoints:
     """Test user information endpoints."""
 
@@ -544,3 +901,61 @@ class TestValidationErrors:
         # Feedback without required fields
         response = client.post("/feedback", json={"user_id": "test"})
         assert response.status_code == 422
+
+
+class TestUserDataEndpoints:
+    """Test Mongo-backed user summary and recent-data endpoints."""
+
+    @patch("body_behavior_recommender.endpoints.get_user_data_summary")
+    def test_user_summary(self, mock_summary, client):
+        """The summary is returned as built by the db layer."""
+        mock_summary.return_value = {"user_id": "test_user_1", "data_counts": {}}
+
+        response = client.get("/users/test_user_1/summary")
+
+        assert response.status_code == 200
+        assert response.json()["user_id"] == "test_user_1"
+
+    @patch("body_behavior_recommender.endpoints.get_user_data_summary")
+    def test_user_summary_not_found(self, mock_summary, client):
+        """Unknown users are a 404."""
+        mock_summary.return_value = None
+
+        response = client.get("/users/nonexistent/summary")
+
+        assert response.status_code == 404
+
+    @patch("body_behavior_recommender.endpoints.db_get_user")
+    @patch("body_behavior_recommender.endpoints.get_user_entries_since")
+    def test_user_recent(
+        self, mock_since, mock_get_user, client, mock_user_doc, mock_sleep_docs
+    ):
+        """Recent entries come from date range queries per collection."""
+        mock_get_user.return_value = mock_user_doc
+        mock_since.side_effect = lambda collection, user_id, since: (
+            mock_sleep_docs if collection == "sleep" else []
+        )
+
+        response = client.get("/users/test_user_1/recent?days=3")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["days"] == 3
+        assert data["recent_sleep"] == mock_sleep_docs
+        assert data["recent_activity"] == []
+        assert "recent_measurements" not in data
+        assert {c.args[0] for c in mock_since.call_args_list} == {
+            "sleep",
+            "nutrition",
+            "activity",
+            "measurements",
+        }
+
+    @patch("body_behavior_recommender.endpoints.db_get_user")
+    def test_user_recent_not_found(self, mock_get_user, client):
+        """Unknown users are a 404."""
+        mock_get_user.return_value = None
+
+        response = client.get("/users/nonexistent/recent")
+
+        assert response.status_code == 404
@@ -0,0 +1,101 @@
+"""Tests for response serialisation helpers."""
+
+import numpy as np
+import orjson
+
+from body_behavior_recommender.serialization import (
+    CatalogPayloads,
+    ORJSONResponse,
+    etag_matches,
+)
+
+
+class TestORJSONResponse:
+    """Test the app-wide JSON response class."""
+
+    def test_renders_numpy_and_int_keys(self):
+        """numpy scalars/arrays and non-string keys are encoded."""
+        response = ORJSONResponse({"mean": np.float64(1.5), 7: np.arange(2)})
+        assert orjson.loads(response.body) == {"mean": 1.5, "7": [0, 1]}
+
+
+class TestCatalogPayloads:
+    """Test pre-serialised catalog bodies."""
+
+    def test_body_cached_per_version(self, sample_music_track):
+        """The same bytes are served until the version or catalog changes."""
+        payloads = CatalogPayloads()
+        catalog = [sample_music_track]
+
+        first = payloads.body("tracks", catalog, 1)
+        assert payloads.body("tracks", catalog, 1) is first
+        assert orjson.loads(first) == {
+            "count": 1,
+            "tracks": [sample_music_track.model_dump()],
+        }
+
+        catalog.append(sample_music_track)
+        assert payloads.body("tracks", catalog, 1) is first  # same version: not rebuilt
+        rebuilt = payloads.body("tracks", catalog, 2)
+        assert orjson.loads(rebuilt)["count"] == 2
+
+        assert payloads.body("tracks", list(catalog), 2) is not rebuilt
+
+    def test_response_is_json(self, sample_meal_template):
+        """Responses carry the cached body with a JSON media type."""
+        payloads = CatalogPayloads()
+        catalog = [sample_meal_template]
+        response = payloads.response("meals", catalog, 1)
+
+        assert response.media_type == "application/json"
+        assert response.body is payloads.body("meals", catalog, 1)
+
+    def test_not_modified_when_etag_matches(self, sample_meal_template):
+        """A matching If-None-Match gets an empty 304 with the same validators."""
+        payloads = CatalogPayloads(max_age=60)
+        catalog = [sample_meal_template]
+        fresh = payloads.response("meals", catalog, 1)
+        etag = fresh.headers["etag"]
+
+        cached = payloads.response("meals", catalog, 1, if_none_match=f"W/{etag}")
+
+        assert cached.status_code == 304
+        assert cached.body == b""
+        assert cached.headers["etag"] == etag
+        assert cached.headers["cache-control"] == "public, max-age=60, must-revalidate"
+        assert payloads.response("meals", catalog, 1, '"stale"').status_code == 200
+
+    def test_changes_since_version(self, sample_music_track):
+        """Only changed and removed items are reported against a known version."""
+        payloads = CatalogPayloads()
+        a = sample_music_track.model_copy(update={"id": "a"})
+        b = sample_music_track.model_copy(update={"id": "b"})
+        c = sample_music_track.model_copy(update={"id": "c"})
+        payloads.snapshot("tracks", [a, b], 1)
+
+        b2 = b.model_copy(update={"bpm": b.bpm + 10})
+        delta = payloads.changes("tracks", [b2, c], 2, since=1)
+
+        assert delta["version"] == 2
+        assert delta["full"] is False
+        assert [t["id"] for t in delta["tracks"]] == ["b", "c"]
+        assert delta["removed"] == ["a"]
+
+    def test_changes_since_unknown_version(self, sample_music_track):
+        """An unknown version falls back to the full catalog."""
+        payloads = CatalogPayloads()
+        delta = payloads.changes("tracks", [sample_music_track], 3, since=1)
+
+        assert delta["full"] is True
+        assert len(delta["tracks"]) == 1
+
+
+class TestEtagMatches:
+    """Test If-None-Match parsing."""
+
+    def test_etag_matches(self):
+        assert etag_matches('"a", "b"', '"b"')
+        assert etag_matches('W/"b"', '"b"')
+        assert etag_matches("*", '"b"')
+        assert not etag_matches(None, '"b"')
+        assert not etag_matches('"a"', '"b"')
@@ -262,3 +262,63 @@ class TestServiceLogicIsolated:
         assert abs(steps_norm - 0.6 * 0.5) < 1e-10  # 0.3
         assert hr_norm > 0  # Should be positive for HR 140
         assert activity_norm > 0  # Should be positive for 45 minutes
+
+
+class TestPreferenceDeltas:
+    """Test preference updates and the deltas they report."""
+
+    def test_update_preferences_returns_deltas(self, sample_user):
+        """Positive feedback raises weights and reports one delta per tag."""
+        from body_behavior_recommender.app import app  # noqa: F401  (resolves import cycle)
+        from bbr_core.preferences import update_preferences
+
+        deltas = update_preferences(sample_user, "meal", ["italian", "mexican"], 1)
+
+        assert deltas == [
+            ("pref_meal_cuisines", "italian", 0.3),
+            ("pref_meal_cuisines", "mexican", 0.3),
+        ]
+        assert sample_user.pref_meal_cuisines["italian"] == 1.0  # clamped
+        assert abs(sample_user.pref_meal_cuisines["mexican"] - 0.3) < 1e-9
+
+    def test_update_preferences_neutral_feedback(self, sample_user):
+        """Neutral feedback changes nothing and reports no deltas."""
+        from body_behavior_recommender.app import app  # noqa: F401
+        from bbr_core.preferences import update_preferences
+
+        before = dict(sample_user.pref_music_genres)
+        assert update_preferences(sample_user, "music", ["pop"], 0) == []
+        assert sample_user.pref_music_genres == before
+
+
+class TestRankMeals:
+    """Test meal ranking against today's nutrition."""
+
+    def test_rank_meals_uses_todays_nutrition(self, sample_user, sample_nutrition_entry):
+        """Meals rank without a nutrition entry and re-rank once one is supplied."""
+        from body_behavior_recommender.app import app  # noqa: F401
+        from body_behavior_recommender.services import MEALS, rank_meals
+
+        state = {"Readiness": 60, "Fuel": 40, "Strain": 30}
+        without = rank_meals(list(MEALS), sample_user, state)
+        with_entry = rank_meals(list(MEALS), sample_user, state, sample_nutrition_entry)
+
+        assert without and with_entry
+        assert [s for _, s in without] == sorted((s for _, s in without), reverse=True)
+        # Protein already eaten today shrinks the gap and changes the scores
+        assert dict((m.id, s) for m, s in without) != dict((m.id, s) for m, s in with_entry)
+
+
+class TestTopK:
+    """Test partial top-k selection."""
+
+    def test_top_k_matches_full_sort(self):
+        """Partial selection returns the same prefix as a full sort."""
+        from body_behavior_recommender.app import app  # noqa: F401
+        from body_behavior_recommender.services import top_k
+
+        scored = [("a", 0.2), ("b", 0.9), ("c", 0.5), ("d", 0.7)]
+
+        assert top_k(scored) == [("b", 0.9), ("d", 0.7), ("c", 0.5), ("a", 0.2)]
+        assert top_k(scored, 2) == [("b", 0.9), ("d", 0.7)]
+        assert top_k(scored, 10) == top_k(scored)
@@ -0,0 +1,71 @@
+"""Tests for cached data-summary counts."""
+
+from unittest.mock import MagicMock, patch
+
+from body_behavior_recommender.summary import CountSummary
+
+
+def _counter(value=1):
+    return MagicMock(
+        side_effect=lambda collections, precise=False: {c: value for c in collections}
+    )
+
+
+class TestCountSummary:
+    """Test the count cache behind /data-summary."""
+
+    def test_estimated_counts_cached_within_ttl(self):
+        """Repeated reads within the ttl reuse one round of counts."""
+        count = _counter()
+        summary = CountSummary(ttl=30, refresh_interval=None, count=count)
+
+        first, _ = summary.counts()
+        second, _ = summary.counts()
+
+        assert first == second
+        assert first["users"] == 1
+        count.assert_called_once()
+        assert count.call_args.kwargs == {}
+
+    def test_counts_refreshed_after_ttl(self):
+        """Expired counts are recomputed."""
+        count = _counter()
+        summary = CountSummary(ttl=5, refresh_interval=None, count=count)
+        with patch("body_behavior_recommender.summary.time.monotonic", return_value=100.0):
+            summary.counts()
+        with patch("body_behavior_recommender.summary.time.monotonic", return_value=106.0):
+            summary.counts()
+
+        assert count.call_count == 2
+
+    def test_precise_counts_bypass_cache(self):
+        """Precise mode always counts exactly and does not touch the cache."""
+        count = _counter()
+        summary = CountSummary(ttl=30, refresh_interval=None, count=count)
+
+        counts, age = summary.counts(precise=True)
+
+        assert age == 0.0
+        assert count.call_args.kwargs == {"precise": True}
+        summary.counts()
+        assert count.call_count == 2
+
+
+class TestCollectionCounts:
+    """Test collection counting on the shared client."""
+
+    @patch("body_behavior_recommender.db.get_database")
+    def test_deduplicated_estimated_counts(self, mock_get_database):
+        """Each collection is counted once, from metadata by default."""
+        from body_behavior_recommender.db import collection_counts
+
+        database = MagicMock()
+        database.__getitem__.return_value.estimated_document_count.return_value = 7
+        mock_get_database.return_value = database
+
+        counts = collection_counts(["sleep", "users", "sleep"])
+
+        assert counts == {"sleep": 7, "users": 7}
+        collection = database.__getitem__.return_value
+        assert collection.estimated_document_count.call_count == 2
+        collection.count_documents.assert_not_called()
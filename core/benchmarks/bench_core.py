@@ -0,0 +1,77 @@
+"""Micro-benchmarks for the shared core (run: python benchmarks/bench_core.py).
+
+Prints the mean time per call of the hot paths both the API and the worker
+go through, so an optimisation can be measured once for both services.
+"""
+
+import argparse
+import timeit
+
+from bbr_core import (
+    BanditPolicy,
+    compute_state_entries,
+    get_item_tags,
+    reward_from_feedback,
+    update_preferences,
+)
+from bbr_core.models import ActivityEntry, Feedback, NutritionEntry, SleepEntry, UserProfile
+
+
+def _fixtures():
+    user = UserProfile(
+        user_id="bench", age=34, weight=72.0, height=178.0, bmi=22.7,
+        fitness_level="intermediate", goals="endurance", join_date="2024-01-01",
+    )
+    sleep = [
+        SleepEntry(user_id="bench", date=f"2024-01-{d:02d}", sleep_duration_minutes=400 + 7 * d,
+                   deep_sleep_minutes=90, rem_sleep_minutes=95, light_sleep_minutes=220,
+                   sleep_efficiency=84.0 + d, bedtime=f"22:{5 * d:02d}", wake_time="06:45")
+        for d in range(1, 8)
+    ]
+    activity = [
+        ActivityEntry(user_id="bench", date=f"2024-01-{d:02d}", steps=5000 + 650 * d, calories_burned=320,
+                      active_minutes=40 + d, distance_km=4.5, heart_rate_avg=118 + d, workout_duration=30)
+        for d in range(1, 8)
+    ]
+    nutrition = NutritionEntry(user_id="bench", date="2024-01-07", calories_consumed=2050, protein_g=105.0,
+                               carbs_g=230.0, fat_g=68.0, fiber_g=24.0, sugar_g=48.0, sodium_mg=1900.0)
+    feedback = Feedback(user_id="bench", domain="music", item_id="m2", thumbs=1, completed=1, hr_zone_frac=0.7)
+    return user, sleep, nutrition, activity, feedback
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000, help="calls per benchmark")
+    parser.add_argument("--batch", type=int, default=16, help="events per batched bandit call")
+    args = parser.parse_args()
+
+    user, sleep, nutrition, activity, feedback = _fixtures()
+    state = compute_state_entries(user, sleep, nutrition, activity)
+
+    policy = BanditPolicy()
+    arms = ["lofi_low", "synth_mid", "pop_up"] * 4
+    policy.update_batch("bench", "music", arms, [1, 0, 1] * 4, state)  # trained bandit
+    batch_arms = (arms * args.batch)[:args.batch]
+    batch_rewards = ([1, 0] * args.batch)[:args.batch]
+
+    benchmarks = [
+        ("compute_state_entries", lambda: compute_state_entries(user, sleep, nutrition, activity), 1),
+        ("reward_from_feedback", lambda: reward_from_feedback("music", feedback), 1),
+        ("get_item_tags", lambda: get_item_tags("music", "m2"), 1),
+        ("update_preferences", lambda: update_preferences(user, "music", ["lofi", "chillhop"], 1), 1),
+        ("BanditPolicy.sample", lambda: policy.sample("bench", "music", state), 1),
+        ("BanditPolicy.sample_batch", lambda: policy.sample_batch("bench", "music", state, args.batch), args.batch),
+        ("BanditPolicy.update", lambda: policy.update("bench", "music", "pop_up", 1.0, state), 1),
+        ("BanditPolicy.update_batch", lambda: policy.update_batch("bench", "music", batch_arms, batch_rewards, state), args.batch),
+    ]
+
+    print(f"{'benchmark':<28}{'per call':>12}{'per event':>12}")
+    for name, func, events in benchmarks:
+        # Bandit updates grow the kNN history, so keep their call count modest
+        number = max(1, args.number // 10) if name.startswith("BanditPolicy.update") else args.number
+        seconds = timeit.timeit(func, number=number) / number
+        print(f"{name:<28}{seconds * 1e6:>10.1f}us{seconds * 1e6 / events:>10.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Shared state engine, rewards, arms, catalogs and bandit policy.
+
+Used by both the API and the feedback worker so scoring logic and its
+optimisations live in one place.
+"""
+
+from .arms import ARM_IDS, ARMS, DOMAINS
+from .bandits import BanditPolicy
+from .catalogs import CATALOGS, MEALS, MUSIC, WORKOUTS, get_item, get_item_tags
+from .preferences import (
+    APPLIED_FEEDBACK_FIELD,
+    APPLIED_FEEDBACK_LIMIT,
+    PREFERENCE_FIELDS,
+    PreferenceDelta,
+    build_guarded_preference_pipeline,
+    build_preference_pipeline,
+    update_preferences,
+)
+from .rewards import REWARD_THRESHOLD, binarize_reward, reward_from_feedback
+from .state import compute_state_entries, state_context, todays_nutrition
+
+__version__ = "0.1.0"
+
+__all__ = [
+    "ARMS",
+    "ARM_IDS",
+    "DOMAINS",
+    "BanditPolicy",
+    "CATALOGS",
+    "MUSIC",
+    "MEALS",
+    "WORKOUTS",
+    "get_item",
+    "get_item_tags",
+    "APPLIED_FEEDBACK_FIELD",
+    "APPLIED_FEEDBACK_LIMIT",
+    "PREFERENCE_FIELDS",
+    "PreferenceDelta",
+    "build_guarded_preference_pipeline",
+    "build_preference_pipeline",
+    "update_preferences",
+    "REWARD_THRESHOLD",
+    "binarize_reward",
+    "reward_from_feedback",
+    "compute_state_entries",
+    "state_context",
+    "todays_nutrition",
+]
@@ -0,0 +1,27 @@
+"""Bandit arms per recommendation domain."""
+
+from typing import Dict, Tuple
+
+ARMS = {
+    "music": {
+        "lofi_low": {"genres": ["lofi", "chillhop"], "energy_cap": 0.55},
+        "synth_mid": {"genres": ["synthwave", "edm"], "energy_cap": 0.75},
+        "pop_up": {"genres": ["pop"], "energy_cap": 0.85},
+    },
+    "meal": {
+        "shake": {"tags": ["quick-high-protein"]},
+        "bowl": {"tags": ["protein-fiber-bowl"]},
+        "wrap": {"tags": ["handheld", "high-protein"]},
+    },
+    "workout": {
+        "z2_walk": {"zone": "Z2_low"},
+        "z2_cycle": {"zone": "Z2"},
+        "tempo_intervals": {"zone": "Tempo"},
+        "mobility": {"zone": "Z2_low"},
+    },
+}
+
+# Arm ids per domain, built once instead of on every sample
+ARM_IDS: Dict[str, Tuple[str, ...]] = {domain: tuple(arms) for domain, arms in ARMS.items()}
+
+DOMAINS: Tuple[str, ...] = tuple(ARMS)
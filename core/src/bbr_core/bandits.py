@@ -0,0 +1,100 @@
+"""Per-user contextual bandit policy (Thompson sampling + kNN context)."""
+
+import pickle
+import random
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from mabwiser.mab import MAB, LearningPolicy, NeighborhoodPolicy
+
+from .arms import ARM_IDS
+from .rewards import binarize_reward
+from .state import state_context
+
+
+class BanditPolicy:
+    """Owns one MABWiser contextual bandit per (user_id, domain).
+
+    Bandits are created lazily on first use. Until a bandit has seen any
+    feedback it cannot predict, so sampling falls back to a uniform random arm.
+    `export` and `restore` move a user's bandits between processes as opaque
+    bytes (pickled MABWiser models).
+    """
+
+    def __init__(self, k: int = 3):
+        self.k = k
+        self.bandits: Dict[Tuple[str, str], MAB] = {}
+
+    def get(self, user_id: str, domain: str) -> MAB:
+        """Get or create the bandit for a user and domain."""
+        key = (user_id, domain)
+        bandit = self.bandits.get(key)
+        if bandit is None:
+            bandit = self.bandits[key] = MAB(
+                arms=list(ARM_IDS[domain]),
+                learning_policy=LearningPolicy.ThompsonSampling(),
+                neighborhood_policy=NeighborhoodPolicy.KNearest(k=self.k),
+            )
+        return bandit
+
+    def sample(self, user_id: str, domain: str, state: Dict[str, int]) -> str:
+        """Thompson-sample one arm for the user's current state."""
+        return self.sample_batch(user_id, domain, state, 1)[0]
+
+    def sample_batch(self, user_id: str, domain: str, state: Dict[str, int], n: int) -> List[str]:
+        """Sample `n` arms for the same user, domain and state with one predict call."""
+        bandit = self.get(user_id, domain)
+        try:
+            arms = bandit.predict([state_context(state)] * n)
+        except Exception:
+            # Not trained yet: pick arms uniformly
+            return [random.choice(ARM_IDS[domain]) for _ in range(n)]
+        # MABWiser returns a bare arm for a single context
+        return arms if isinstance(arms, list) else [arms]
+
+    def update(
+        self,
+        user_id: str,
+        domain: str,
+        arm_id: str,
+        reward: float,
+        state: Optional[Dict[str, int]] = None,
+    ):
+        """Train the bandit with one (arm, reward) observation."""
+        self.update_batch(user_id, domain, [arm_id], [reward], state)
+
+    def update_batch(
+        self,
+        user_id: str,
+        domain: str,
+        arm_ids: Sequence[str],
+        rewards: Sequence[float],
+        state: Optional[Dict[str, int]] = None,
+    ):
+        """Train the bandit with several observations made in the same state, in one `partial_fit`.
+
+        Rewards outside {0, 1} are binarized for the Beta-Bernoulli model.
+        """
+        bandit = self.get(user_id, domain)
+        rewards = [binarize_reward(r) for r in rewards]
+        if state is not None:
+            contexts = [state_context(state)] * len(arm_ids)
+            bandit.partial_fit(decisions=list(arm_ids), rewards=rewards, contexts=contexts)
+        else:
+            bandit.partial_fit(decisions=list(arm_ids), rewards=rewards)
+
+    def release(self, user_ids: Iterable[str]):
+        """Drop the bandits of the given users."""
+        user_ids = set(user_ids)
+        for key in [key for key in self.bandits if key[0] in user_ids]:
+            del self.bandits[key]
+
+    def export(self, user_ids: Iterable[str]) -> Dict[Tuple[str, str], bytes]:
+        """Serialize the bandits of the given users, keyed by (user_id, domain)."""
+        user_ids = set(user_ids)
+        return {key: pickle.dumps(bandit) for key, bandit in list(self.bandits.items()) if key[0] in user_ids}
+
+    def restore(self, states: Dict[Tuple[str, str], bytes]):
+        """Load bandits produced by `export`; bandits already in memory are kept."""
+        for key, state in states.items():
+            if key not in self.bandits:
+                self.bandits[key] = pickle.loads(state)
@@ -0,0 +1,61 @@
+"""Static recommendation catalogs and lookup indexes."""
+
+from typing import Dict, List, Optional, Tuple, Union
+
+from .models import MealTemplate, MusicTrack, WorkoutTemplate
+
+CatalogItem = Union[MusicTrack, MealTemplate, WorkoutTemplate]
+
+MUSIC: Tuple[MusicTrack, ...] = (
+    MusicTrack(id="m1", title="Late Night Study", artist="BeatLoop", bpm=105, energy=0.45, valence=0.5, genres=["lofi"]),
+    MusicTrack(id="m2", title="Window Rain", artist="LoKey", bpm=112, energy=0.48, valence=0.4, genres=["lofi", "chillhop"]),
+    MusicTrack(id="m3", title="Neon Drive", artist="Pulse 84", bpm=128, energy=0.70, valence=0.6, genres=["synthwave"]),
+    MusicTrack(id="m4", title="Sunset Run", artist="Dynawave", bpm=138, energy=0.78, valence=0.7, genres=["synthwave", "edm"]),
+    MusicTrack(id="m5", title="Top Vibes", artist="Nova", bpm=120, energy=0.65, valence=0.8, genres=["pop"]),
+)
+
+MEALS: Tuple[MealTemplate, ...] = (
+    MealTemplate(id="meal1", name="Greek Yogurt + Whey + Chia", cuisine_tags=["mediterranean"], calories=350, protein_g=35, carbs_g=30, fat_g=10, fiber_g=8, sugar_g=12, sodium_mg=180, allergens=["dairy"], diet_ok=["omnivore", "vegetarian"]),
+    MealTemplate(id="meal2", name="Lentil-Tuna Bowl", cuisine_tags=["mediterranean"], calories=600, protein_g=50, carbs_g=55, fat_g=18, fiber_g=14, sugar_g=6, sodium_mg=520, allergens=["fish"], diet_ok=["omnivore"]),
+    MealTemplate(id="meal3", name="Chicken Wrap", cuisine_tags=["mexican"], calories=550, protein_g=42, carbs_g=50, fat_g=18, fiber_g=9, sugar_g=7, sodium_mg=680, allergens=["gluten"], diet_ok=["omnivore"]),
+)
+
+WORKOUTS: Tuple[WorkoutTemplate, ...] = (
+    WorkoutTemplate(id="w1", name="Zone-2 Walk", intensity_zone="Z2_low", impact="low", equipment_needed=["shoes"], duration_min=30, focus_tags=["endurance"]),
+    WorkoutTemplate(id="w2", name="Zone-2 Bike", intensity_zone="Z2", impact="low", equipment_needed=["stationary_bike"], duration_min=30, focus_tags=["endurance"]),
+    WorkoutTemplate(id="w3", name="Tempo Intervals 4x4", intensity_zone="Tempo", impact="moderate", equipment_needed=["shoes"], duration_min=28, focus_tags=["endurance"]),
+    WorkoutTemplate(id="w4", name="Mobility Flow 15", intensity_zone="Z2_low", impact="low", equipment_needed=["yoga_mat"], duration_min=15, focus_tags=["mobility"]),
+)
+
+CATALOGS: Dict[str, Tuple[CatalogItem, ...]] = {
+    "music": MUSIC,
+    "meal": MEALS,
+    "workout": WORKOUTS,
+}
+
+
+def _item_tags(domain: str, item: CatalogItem) -> List[str]:
+    if domain == "music":
+        return item.genres
+    if domain == "meal":
+        return item.cuisine_tags
+    return item.focus_tags
+
+
+# O(1) lookups instead of scanning the catalogs per feedback
+ITEMS_BY_ID: Dict[str, Dict[str, CatalogItem]] = {
+    domain: {item.id: item for item in items} for domain, items in CATALOGS.items()
+}
+ITEM_TAGS: Dict[str, Dict[str, List[str]]] = {
+    domain: {item.id: _item_tags(domain, item) for item in items} for domain, items in CATALOGS.items()
+}
+
+
+def get_item(domain: str, item_id: str) -> Optional[CatalogItem]:
+    """Return a catalog item by domain and id, or None if unknown."""
+    return ITEMS_BY_ID.get(domain, {}).get(item_id)
+
+
+def get_item_tags(domain: str, item_id: str) -> List[str]:
+    """Return the preference tags of a catalog item (empty if unknown)."""
+    return ITEM_TAGS.get(domain, {}).get(item_id, [])
@@ -0,0 +1,105 @@
+"""Preference updates and their atomic MongoDB representation."""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from .models import UserProfile
+
+PREFERENCE_FIELDS = {
+    "music": "pref_music_genres",
+    "meal": "pref_meal_cuisines",
+    "workout": "pref_workout_focus",
+}
+
+LR_FAST = 0.3
+
+# User document field holding the ids of the latest feedback applied to it,
+# and how many ids it keeps (enough to cover redelivery and retries)
+APPLIED_FEEDBACK_FIELD = "applied_feedback"
+APPLIED_FEEDBACK_LIMIT = 200
+
+# (field, tag, step): add `step` to user.<field>[tag] and clamp to [0, 1]
+PreferenceDelta = Tuple[str, str, float]
+
+
+def update_preferences(
+    user: UserProfile, domain: str, item_tags: List[str], thumbs: int
+) -> List[PreferenceDelta]:
+    """Update user preferences based on feedback.
+
+    Returns the applied (field, tag, step) deltas; `build_preference_pipeline`
+    turns them into an atomic MongoDB update with the same semantics.
+    """
+    if thumbs == 0 or not item_tags or domain not in PREFERENCE_FIELDS:
+        return []
+    step = LR_FAST if thumbs > 0 else -LR_FAST
+    field = PREFERENCE_FIELDS[domain]
+    prefs = getattr(user, field)
+    for t in item_tags:
+        prefs[t] = max(0.0, min(1.0, prefs.get(t, 0.0) + step))
+    return [(field, t, step) for t in item_tags]
+
+
+def build_preference_pipeline(deltas: List[PreferenceDelta]) -> List[Dict[str, Any]]:
+    """Build an update pipeline applying ordered (field, tag, step) preference deltas.
+
+    Each step is added to ``field.tag`` (missing weights start at 0.0) and the
+    result is clamped to [0, 1] server-side, matching `update_preferences`. A
+    `$set` stage never touches the same weight twice, so clamping still happens
+    after every step in order.
+    """
+    return _preference_stages([(None, deltas)])
+
+
+def build_guarded_preference_pipeline(
+    deltas_by_feedback: List[Tuple[Optional[str], List[PreferenceDelta]]],
+    limit: int = APPLIED_FEEDBACK_LIMIT,
+) -> List[Dict[str, Any]]:
+    """Like `build_preference_pipeline`, but safe to run again for the same feedback.
+
+    ``deltas_by_feedback`` holds (feedback_id, deltas) pairs in order. Each
+    feedback's deltas only apply if its id is not yet in the document's
+    ``applied_feedback``, and the new ids are appended there (keeping the last
+    `limit`) in the same update, so redelivered feedback is a no-op. Pairs
+    without an id are applied unconditionally.
+    """
+    applied = {"$ifNull": [f"${APPLIED_FEEDBACK_FIELD}", []]}
+    stages = _preference_stages(deltas_by_feedback, applied)
+    new_ids = [
+        {"$cond": [_is_applied(feedback_id, applied), [], {"$literal": [feedback_id]}]}
+        for feedback_id in dict.fromkeys(feedback_id for feedback_id, _ in deltas_by_feedback)
+        if feedback_id is not None
+    ]
+    if new_ids:
+        # Last stage, so every guard above still sees the ids from before this update
+        stages.append({"$set": {APPLIED_FEEDBACK_FIELD: {"$slice": [{"$concatArrays": [applied, *new_ids]}, -limit]}}})
+    return stages
+
+
+def _is_applied(feedback_id: str, applied: Dict[str, Any]) -> Dict[str, Any]:
+    return {"$in": [{"$literal": feedback_id}, applied]}
+
+
+def _preference_stages(
+    deltas_by_feedback: List[Tuple[Optional[str], List[PreferenceDelta]]], applied: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    stages: List[Dict[str, Any]] = []
+    current: Dict[str, Any] = {}
+    for feedback_id, deltas in deltas_by_feedback:
+        for field, tag, step in deltas:
+            path = f"{field}.{tag}"
+            if path in current:
+                stages.append({"$set": current})
+                current = {}
+            value = {
+                "$min": [
+                    1.0,
+                    {"$max": [0.0, {"$add": [{"$ifNull": [f"${path}", 0.0]}, float(step)]}]},
+                ]
+            }
+            if applied is not None and feedback_id is not None:
+                # Already applied: keep the current weight
+                value = {"$cond": [_is_applied(feedback_id, applied), f"${path}", value]}
+            current[path] = value
+    if current:
+        stages.append({"$set": current})
+    return stages
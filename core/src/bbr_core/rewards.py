@@ -0,0 +1,38 @@
+"""Reward shaping from user feedback."""
+
+from .models import Feedback
+from .utils import clamp01
+
+# ThompsonSampling (Beta) expects binary rewards
+REWARD_THRESHOLD = 0.6
+
+
+def reward_from_feedback(domain: str, fb: Feedback) -> float:
+    """Calculate reward from user feedback."""
+    if domain == "music":
+        return clamp01(
+            0.4 * (fb.hr_zone_frac or 0)
+            + 0.3 * (1 if fb.thumbs > 0 else 0)
+            + 0.2 * (fb.completed or 0)
+            + 0.1 * (0 if (fb.skipped_early or 0) else 1)
+        )
+    if domain == "meal":
+        return clamp01(
+            0.5 * (fb.ate or 0)
+            + 0.3 * (fb.protein_gap_closed_norm or 0)
+            + 0.2 * (1 if fb.thumbs > 0 else 0)
+        )
+    if domain == "workout":
+        return clamp01(
+            0.4 * (fb.completed or 0)
+            + 0.3 * (fb.hr_zone_frac or 0)
+            + 0.3 * (1 - min(1.0, abs((fb.rpe or 0) - 5) / 5))
+        )
+    return 0.0
+
+
+def binarize_reward(r: float) -> float:
+    """Map a shaped reward to {0, 1} for the Beta-Bernoulli bandit (0 and 1 pass through)."""
+    if r in (0, 1):
+        return float(r)
+    return 1.0 if r >= REWARD_THRESHOLD else 0.0
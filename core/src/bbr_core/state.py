@@ -0,0 +1,131 @@
+"""Readiness / Fuel / Strain state engine."""
+
+import math
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from .models import ActivityEntry, NutritionEntry, SleepEntry, UserProfile
+from .utils import clamp01, mean_std
+
+DEFAULT_STATE = {"Readiness": 55, "Fuel": 50, "Strain": 40}
+
+
+def _pstd(values: Sequence[float]) -> float:
+    """Population standard deviation (same as ``np.std``) without array conversion."""
+    n = len(values)
+    mu = sum(values) / n
+    return math.sqrt(sum((v - mu) * (v - mu) for v in values) / n)
+
+
+def _bedtime_minutes(sleep_entries: Iterable[SleepEntry]) -> List[int]:
+    minutes = []
+    for s in sleep_entries:
+        try:
+            hour, minute = map(int, s.bedtime.split(":"))
+            minutes.append(hour * 60 + minute)
+        except Exception:
+            continue
+    return minutes
+
+
+def todays_nutrition(
+    nutrition_entries: Sequence[NutritionEntry], today: str
+) -> Optional[NutritionEntry]:
+    """Return the newest nutrition entry dated on or before `today` (entries are chronological)."""
+    for entry in reversed(nutrition_entries):
+        if entry.date <= today:
+            return entry
+    return None
+
+
+def compute_state_entries(
+    user: UserProfile,
+    sleep_entries: Sequence[SleepEntry],
+    todays_nutrition: Optional[NutritionEntry],
+    activity_entries: Sequence[ActivityEntry],
+) -> Dict[str, int]:
+    """Pure state computation from supplied entries (Mongo-friendly).
+
+    Falls back to default baselines when data slices are empty.
+    """
+    # Step counts are needed by both Readiness (recovery) and Strain
+    steps_7d = [a.steps for a in activity_entries[-7:]]
+
+    # Readiness
+    recent_sleep = sleep_entries[-2:]
+    if recent_sleep:
+        n_recent = len(recent_sleep)
+        avg_sleep = sum(s.sleep_duration_minutes / 60 for s in recent_sleep) / n_recent
+        sleep_debt = max(0.0, 8.0 - avg_sleep)
+        duration_score = clamp01(1 - sleep_debt / 2.0)
+        avg_efficiency = sum(s.sleep_efficiency for s in recent_sleep) / n_recent / 100.0
+        efficiency_score = clamp01(avg_efficiency)
+        # Bedtime consistency (use up to 7 entries)
+        bedtime_minutes = _bedtime_minutes(sleep_entries[-7:])
+        if len(bedtime_minutes) >= 2:
+            bedtime_consistency = clamp01(1 - _pstd(bedtime_minutes) / 120.0)
+        else:
+            bedtime_consistency = 0.5
+        # Recovery factor from last 7 activities
+        recovery_factor = 0.5
+        if len(activity_entries) >= 2:
+            mean_s, std_s = mean_std(steps_7d)
+            if std_s > 0:
+                strain_z = (activity_entries[-1].steps - mean_s) / std_s
+                recovery_factor = clamp01(1 - strain_z / 2.0)
+        sleep_component = 0.7 * duration_score + 0.3 * efficiency_score
+        readiness = round(
+            100
+            * (
+                0.50 * sleep_component
+                + 0.25 * bedtime_consistency
+                + 0.25 * recovery_factor
+            )
+        )
+    else:
+        readiness = DEFAULT_STATE["Readiness"]
+
+    # Fuel
+    if todays_nutrition:
+        protein_target = (1.4 if user.goals == "endurance" else 1.2) * user.weight
+        protein_score = clamp01(todays_nutrition.protein_g / max(1.0, protein_target))
+        fiber_score = clamp01(todays_nutrition.fiber_g / 30.0)
+        sugar_penalty = clamp01(todays_nutrition.sugar_g / 75.0)
+        sodium_penalty = clamp01(todays_nutrition.sodium_mg / 2300.0)
+        fuel = round(
+            100
+            * (
+                0.45 * protein_score
+                + 0.25 * fiber_score
+                + 0.15 * (1 - sugar_penalty)
+                + 0.15 * (1 - sodium_penalty)
+            )
+        )
+    else:
+        fuel = DEFAULT_STATE["Fuel"]
+
+    # Strain
+    if activity_entries:
+        today_activity = activity_entries[-1]
+        steps_mean, steps_std = mean_std(steps_7d)
+        steps_z_score = (today_activity.steps - steps_mean) / steps_std
+        steps_norm = 0.6 * clamp01((steps_z_score / 2.0) + 0.5)
+        hr_norm = 0.4 * clamp01((today_activity.heart_rate_avg - 90) / (170 - 90))
+        activity_norm = 0.2 * clamp01(today_activity.active_minutes / 120)
+        strain = round(100 * clamp01(steps_norm + hr_norm + activity_norm))
+    else:
+        strain = DEFAULT_STATE["Strain"]
+
+    return {
+        "Readiness": int(min(100, max(0, readiness))),
+        "Fuel": int(min(100, max(0, fuel))),
+        "Strain": int(min(100, max(0, strain))),
+    }
+
+
+def state_context(state: Dict[str, int]) -> List[float]:
+    """Convert a state dict to the bandit context vector (each score normalised to 0-1)."""
+    return [
+        state["Readiness"] / 100.0,
+        state["Fuel"] / 100.0,
+        state["Strain"] / 100.0,
+    ]
@@ -0,0 +1,24 @@
+"""Numeric helpers used by the state engine and scoring."""
+
+import math
+from typing import Sequence, Tuple
+
+
+def clamp01(x: float) -> float:
+    """Clamp a value between 0 and 1."""
+    return max(0.0, min(1.0, x))
+
+
+def mean_std(values: Sequence[float]) -> Tuple[float, float]:
+    """Calculate mean and (population) standard deviation of values.
+
+    Pure Python: for the 2-7 element windows the state engine uses this is
+    several times faster than converting to a numpy array, with the same
+    results. A zero deviation is reported as 1.0 so it can be divided by.
+    """
+    n = len(values)
+    if not n:
+        return 0.0, 1.0
+    mu = sum(values) / n
+    sigma = math.sqrt(sum((v - mu) * (v - mu) for v in values) / n)
+    return float(mu), sigma or 1.0
@@ -0,0 +1,211 @@
+"""Tests for the shared state engine, rewards, preferences and bandit policy."""
+
+import pickle
+
+import numpy as np
+import pytest
+
+from bbr_core import (
+    ARM_IDS,
+    BanditPolicy,
+    binarize_reward,
+    build_guarded_preference_pipeline,
+    build_preference_pipeline,
+    compute_state_entries,
+    get_item_tags,
+    reward_from_feedback,
+    state_context,
+    todays_nutrition,
+    update_preferences,
+)
+from bbr_core.models import (
+    ActivityEntry,
+    Feedback,
+    NutritionEntry,
+    SleepEntry,
+    UserProfile,
+)
+from bbr_core.utils import mean_std
+
+
+@pytest.fixture
+def user():
+    return UserProfile(
+        user_id="u1",
+        age=30,
+        weight=70.0,
+        height=175.0,
+        bmi=22.9,
+        fitness_level="intermediate",
+        goals="endurance",
+        join_date="2024-01-01",
+        pref_music_genres={"lofi": 0.9},
+    )
+
+
+def _sleep(day, minutes, bedtime):
+    return SleepEntry(
+        user_id="u1",
+        date=f"2024-01-{day:02d}",
+        sleep_duration_minutes=minutes,
+        deep_sleep_minutes=90,
+        rem_sleep_minutes=90,
+        light_sleep_minutes=minutes - 180,
+        sleep_efficiency=88.0,
+        bedtime=bedtime,
+        wake_time="07:00",
+    )
+
+
+def _activity(day, steps):
+    return ActivityEntry(
+        user_id="u1",
+        date=f"2024-01-{day:02d}",
+        steps=steps,
+        calories_burned=300,
+        active_minutes=45,
+        distance_km=5.0,
+        heart_rate_avg=120,
+        workout_duration=30,
+    )
+
+
+def _nutrition(day):
+    return NutritionEntry(
+        user_id="u1",
+        date=f"2024-01-{day:02d}",
+        calories_consumed=2100,
+        protein_g=110.0,
+        carbs_g=220.0,
+        fat_g=70.0,
+        fiber_g=25.0,
+        sugar_g=40.0,
+        sodium_mg=1800.0,
+    )
+
+
+class TestState:
+    """Test the state engine."""
+
+    def test_defaults_without_data(self, user):
+        assert compute_state_entries(user, [], None, []) == {
+            "Readiness": 55,
+            "Fuel": 50,
+            "Strain": 40,
+        }
+
+    def test_scores_in_range(self, user):
+        sleep = [_sleep(d, 420 + 10 * d, f"22:{10 * (d % 5):02d}") for d in range(1, 8)]
+        activity = [_activity(d, 6000 + 500 * d) for d in range(1, 8)]
+        state = compute_state_entries(user, sleep, _nutrition(7), activity)
+        assert set(state) == {"Readiness", "Fuel", "Strain"}
+        assert all(0 <= v <= 100 for v in state.values())
+
+    def test_todays_nutrition_picks_latest_not_after_today(self):
+        entries = [_nutrition(5), _nutrition(6), _nutrition(8)]
+        assert todays_nutrition(entries, "2024-01-07").date == "2024-01-06"
+        assert todays_nutrition(entries, "2024-01-01") is None
+
+    def test_state_context_normalised(self):
+        assert state_context({"Readiness": 50, "Fuel": 100, "Strain": 0}) == [0.5, 1.0, 0.0]
+
+    def test_mean_std_matches_numpy(self):
+        values = [5200, 7400, 6100, 9800, 4300, 7000]
+        mu, sigma = mean_std(values)
+        assert mu == pytest.approx(np.mean(values))
+        assert sigma == pytest.approx(np.std(values))
+        assert mean_std([3, 3]) == (3.0, 1.0)
+
+
+class TestRewards:
+    """Test reward shaping."""
+
+    def test_music_reward(self):
+        fb = Feedback(user_id="u1", domain="music", item_id="m1", thumbs=1, completed=1, hr_zone_frac=1.0)
+        assert reward_from_feedback("music", fb) == pytest.approx(1.0)
+
+    def test_binarize(self):
+        assert binarize_reward(0.65) == 1.0
+        assert binarize_reward(0.3) == 0.0
+        assert binarize_reward(1) == 1.0
+
+
+class TestPreferences:
+    """Test preference updates and their update pipeline."""
+
+    def test_update_clamps_and_reports_deltas(self, user):
+        deltas = update_preferences(user, "music", get_item_tags("music", "m2"), 1)
+        assert deltas == [("pref_music_genres", "lofi", 0.3), ("pref_music_genres", "chillhop", 0.3)]
+        assert user.pref_music_genres == {"lofi": 1.0, "chillhop": 0.3}
+
+    def test_pipeline_splits_repeated_weights(self):
+        pipeline = build_preference_pipeline(
+            [("pref_music_genres", "lofi", 0.3), ("pref_music_genres", "pop", 0.3), ("pref_music_genres", "lofi", -0.3)]
+        )
+        assert [sorted(stage["$set"]) for stage in pipeline] == [
+            ["pref_music_genres.lofi", "pref_music_genres.pop"],
+            ["pref_music_genres.lofi"],
+        ]
+
+    def test_guarded_pipeline_skips_applied_feedback(self):
+        pipeline = build_guarded_preference_pipeline(
+            [("f1", [("pref_music_genres", "lofi", 0.3)]), ("f2", []), (None, [("pref_music_genres", "pop", 0.3)])],
+            limit=50,
+        )
+        applied = {"$ifNull": ["$applied_feedback", []]}
+        lofi = pipeline[0]["$set"]["pref_music_genres.lofi"]
+        assert lofi["$cond"][0] == {"$in": [{"$literal": "f1"}, applied]}
+        assert lofi["$cond"][1] == "$pref_music_genres.lofi"
+        # Feedback without an id is applied unconditionally
+        assert "$min" in pipeline[0]["$set"]["pref_music_genres.pop"]
+        # Ids are recorded last, including feedback without deltas
+        recorded = pipeline[-1]["$set"]["applied_feedback"]["$slice"]
+        assert recorded[1] == -50
+        assert [part["$cond"][2] for part in recorded[0]["$concatArrays"][1:]] == [
+            {"$literal": ["f1"]},
+            {"$literal": ["f2"]},
+        ]
+
+
+class TestBanditPolicy:
+    """Test the contextual bandit policy."""
+
+    def test_untrained_sample_is_valid_arm(self):
+        policy = BanditPolicy()
+        state = {"Readiness": 70, "Fuel": 60, "Strain": 30}
+        assert policy.sample("u1", "workout", state) in ARM_IDS["workout"]
+        assert len(policy.sample_batch("u1", "workout", state, 4)) == 4
+
+    def test_batch_update_then_sample(self):
+        policy = BanditPolicy()
+        state = {"Readiness": 70, "Fuel": 60, "Strain": 30}
+        policy.update_batch("u1", "music", ["pop_up", "lofi_low", "pop_up"], [1.0, 0.2, 0.9], state)
+        arms = policy.sample_batch("u1", "music", state, 3)
+        assert len(arms) == 3
+        assert all(arm in ARM_IDS["music"] for arm in arms)
+
+    def test_release_drops_user_bandits(self):
+        policy = BanditPolicy()
+        policy.get("u1", "music")
+        policy.get("u2", "meal")
+        policy.release(["u1"])
+        assert list(policy.bandits) == [("u2", "meal")]
+
+    def test_export_restore_round_trip(self):
+        policy = BanditPolicy()
+        state = {"Readiness": 70, "Fuel": 60, "Strain": 30}
+        policy.update_batch("u1", "music", ["pop_up", "lofi_low", "pop_up"], [1.0, 0.0, 1.0], state)
+        policy.get("u2", "meal")
+        states = policy.export(["u1"])
+        assert list(states) == [("u1", "music")]
+
+        other = BanditPolicy()
+        other.restore(states)
+        # Untrained bandits cannot predict, so this only passes if the training came along
+        assert other.bandits[("u1", "music")].predict([state_context(state)]) in ARM_IDS["music"]
+
+    def test_restore_keeps_bandits_in_memory(self):
+        policy = BanditPolicy()
+        bandit = policy.get("u1", "music")
+        policy.restore({("u1", "music"): pickle.dumps(None)})
+        assert policy.bandits[("u1", "music")] is bandit
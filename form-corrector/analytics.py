@@ -0,0 +1,203 @@
+"""Whole-set analytics over a landmark sequence: joint angles, reps, tempo and form scores.
+
+Everything works on a (frames, landmarks, >=2) array of normalised x, y
+(extra columns such as visibility are ignored), so a full set is analysed
+with a handful of numpy operations once inference is done.
+"""
+
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# MediaPipe Pose landmark indices (left side, as in exercise_analyzer)
+LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST = 11, 13, 15
+LEFT_HIP, LEFT_KNEE, LEFT_ANKLE = 23, 25, 27
+
+SMOOTHING_WINDOW = 5
+
+
+class ExerciseSpec(NamedTuple):
+    """How to turn landmarks into reps for one exercise.
+
+    `joint` is the (a, b, c) landmark triplet whose angle at b drives the
+    movement. A rep starts when the angle drops below `down` and ends when it
+    climbs back above `up`; the gap between the two is the hysteresis band
+    that keeps jitter from counting extra reps. `target` is the depth angle
+    that earns a full depth score. `alignment` is an optional second triplet
+    whose angle should stay within `alignment_range` throughout. Exercises
+    without reps (holds) are scored on time spent in `alignment_range` for
+    the `joint` angle.
+    """
+
+    joint: Tuple[int, int, int]
+    down: float = 0.0
+    up: float = 0.0
+    target: float = 0.0
+    alignment: Optional[Tuple[int, int, int]] = None
+    alignment_range: Tuple[float, float] = (160.0, 180.0)
+    reps: bool = True
+
+
+EXERCISE_SPECS = {
+    "squat": ExerciseSpec(joint=(LEFT_HIP, LEFT_KNEE, LEFT_ANKLE), down=110.0, up=155.0, target=90.0),
+    "pushup": ExerciseSpec(
+        joint=(LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST),
+        down=110.0,
+        up=150.0,
+        target=90.0,
+        alignment=(LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE),
+    ),
+    "plank": ExerciseSpec(joint=(LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE), reps=False),
+}
+
+
+def joint_angles(landmarks: np.ndarray, a: int, b: int, c: int) -> np.ndarray:
+    """Angle at landmark `b` (degrees, 0–180) for every frame; NaN where a point is missing.
+
+    Same formula as ``exercise_analyzer.calculate_angle``, applied to all
+    frames at once.
+    """
+    pa, pb, pc = landmarks[:, a, :2], landmarks[:, b, :2], landmarks[:, c, :2]
+    radians = np.arctan2(pc[:, 1] - pb[:, 1], pc[:, 0] - pb[:, 0]) - np.arctan2(
+        pa[:, 1] - pb[:, 1], pa[:, 0] - pb[:, 0]
+    )
+    angles = np.abs(np.degrees(radians))
+    return np.where(angles > 180.0, 360.0 - angles, angles)
+
+
+def fill_gaps(values: np.ndarray) -> np.ndarray:
+    """Linearly interpolate NaNs (frames without a pose) from their neighbours."""
+    missing = np.isnan(values)
+    if not missing.any() or missing.all():
+        return values
+    index = np.arange(len(values))
+    filled = values.copy()
+    filled[missing] = np.interp(index[missing], index[~missing], values[~missing])
+    return filled
+
+
+def smooth(values: np.ndarray, window: int = SMOOTHING_WINDOW) -> np.ndarray:
+    """Centred moving average; the ends are padded with the edge values."""
+    if window <= 1 or len(values) < window:
+        return values
+    padded = np.pad(values, (window // 2, window - 1 - window // 2), mode="edge")
+    return np.convolve(padded, np.ones(window) / window, mode="valid")
+
+
+def detect_reps(angles: np.ndarray, down: float, up: float) -> np.ndarray:
+    """(reps, 3) array of start, bottom and end frame indices.
+
+    Each frame is classed as top (angle above `up`), bottom (below `down`) or
+    in between; in-between frames inherit the last definite class, so only a
+    full bottom-to-top crossing of the band changes state. A rep runs from
+    the last top frame before a descent to the first top frame after it, with
+    its bottom at the smallest angle in between.
+    """
+    state = np.where(angles >= up, 1, np.where(angles <= down, -1, 0))
+    definite = np.flatnonzero(state)
+    if len(definite) == 0:
+        return np.empty((0, 3), dtype=np.int64)
+    # Forward-fill the last definite state into the in-between frames
+    last = np.maximum.accumulate(np.where(state != 0, np.arange(len(state)), -1))
+    held = np.where(last >= 0, state[np.maximum(last, 0)], 0)
+    change = np.flatnonzero(np.diff(held) != 0) + 1
+    descents = change[held[change] == -1]
+    ascents = change[held[change] == 1]
+    reps = []
+    for descent in descents:
+        # A rep needs a top before the descent and a return to the top after it
+        if held[descent - 1] != 1:
+            continue
+        after = ascents[ascents > descent]
+        if len(after) == 0:
+            break
+        start = np.flatnonzero(state[:descent] == 1)[-1]
+        end = int(after[0])
+        bottom = start + int(np.argmin(angles[start : end + 1]))
+        reps.append((int(start), bottom, end))
+    return np.array(reps, dtype=np.int64).reshape(-1, 3)
+
+
+def analyze_set(
+    landmarks: np.ndarray,
+    exercise: str,
+    fps: float = 30.0,
+    times: Optional[np.ndarray] = None,
+) -> dict:
+    """Reps, tempo, range of motion and form scores for one set.
+
+    `times` gives each frame's timestamp in seconds (for sampled frames);
+    by default frames are 1/`fps` apart.
+    """
+    spec = EXERCISE_SPECS[exercise]
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    frames = len(landmarks)
+    if times is None:
+        times = np.arange(frames) / fps
+    times = np.asarray(times, dtype=np.float64)
+    if frames == 0:
+        return {"exercise": exercise, "frames": 0, "duration": 0.0, "reps": 0 if spec.reps else None}
+
+    raw = joint_angles(landmarks, *spec.joint)
+    angles = smooth(fill_gaps(raw))
+    low, high = spec.alignment_range
+    result = {
+        "exercise": exercise,
+        "frames": frames,
+        "duration": round(float(times[-1] - times[0]), 3),
+        "pose_coverage": round(float(np.mean(~np.isnan(raw))), 3),
+    }
+    if np.isnan(angles).all():
+        result["reps"] = 0 if spec.reps else None
+        return result
+
+    if not spec.reps:
+        in_range = (angles >= low) & (angles <= high)
+        steps = np.diff(times, append=times[-1])
+        result.update(
+            hold_seconds=round(float(steps[in_range].sum()), 2),
+            form_score=round(100.0 * float(in_range.mean())),
+            mean_angle=round(float(angles.mean()), 1),
+        )
+        return result
+
+    aligned = None
+    if spec.alignment is not None:
+        alignment = smooth(fill_gaps(joint_angles(landmarks, *spec.alignment)))
+        aligned = (alignment >= low) & (alignment <= high)
+
+    reps = detect_reps(angles, spec.down, spec.up)
+    details = []
+    for start, bottom, end in reps:
+        depth = angles[bottom]
+        top = angles[start : end + 1].max()
+        depth_score = np.clip((spec.up - depth) / (spec.up - spec.target), 0.0, 1.0)
+        if aligned is None:
+            score = depth_score
+        else:
+            score = 0.6 * depth_score + 0.4 * aligned[start : end + 1].mean()
+        details.append(
+            {
+                "start": int(start),
+                "bottom": int(bottom),
+                "end": int(end),
+                "down_seconds": round(float(times[bottom] - times[start]), 3),
+                "up_seconds": round(float(times[end] - times[bottom]), 3),
+                "duration": round(float(times[end] - times[start]), 3),
+                "range_of_motion": round(float(top - depth), 1),
+                "min_angle": round(float(depth), 1),
+                "form_score": round(100.0 * float(score)),
+            }
+        )
+    result["reps"] = len(details)
+    result["rep_details"] = details
+    if details:
+        for key in ("down_seconds", "up_seconds", "duration", "range_of_motion", "form_score"):
+            result[f"mean_{key}"] = round(float(np.mean([rep[key] for rep in details])), 2)
+    return result
+
+
+def analyze_series(series) -> dict:
+    """`analyze_set` for the output of ``video_analysis.analyze_video_series``."""
+    times = np.asarray(series["frame"], dtype=np.float64) / series["fps"]
+    return analyze_set(series["landmarks"], series["exercise"], series["fps"], times)
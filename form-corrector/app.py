@@ -1,17 +1,74 @@
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, Request, UploadFile, File, Form, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+import asyncio
+import hashlib
+import json
 import os
-import uuid
-import shutil
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
 
 # Reuse existing analyzer module in this folder
-from exercise_analyzer import analyze_video as run_analyze_video, EXERCISE_CHECKS
-import cv2
-import numpy as np
-import mediapipe as mp
+from exercise_analyzer import EXERCISE_CHECKS
 
-app = FastAPI(title="Form Corrector Service", version="0.1.0")
+from frame_analysis import analyze_image, create_pose, decode_frame
+from frame_workers import FramePoolSaturated, FrameWorkerPool
+from jobs import DONE, JobManager, JobQueueFull
+from analytics import analyze_series
+from landmark_series import series_to_binary, series_to_json
+from result_cache import FRAME_CACHE, RESULT_CACHE, cache_key, hash_file
+from scratch import (
+    Janitor,
+    configure_upload_spooling,
+    remove_file,
+    save_upload,
+    scratch_path,
+    upload_as_path,
+)
+from video_analysis import AnalysisOptions, analyze_video_file, analyze_video_series, shutdown_pipeline
+
+# Worker processes (each with a warm single-image Pose) for /vision/stream-frame
+FRAME_WORKERS = FrameWorkerPool()
+
+# Worker processes for whole-video jobs submitted to /vision/jobs
+JOBS = JobManager()
+
+# Deletes stale scratch files, sparing those of jobs still in flight or awaiting download
+JANITOR = Janitor(in_use=JOBS.live_paths)
+
+# /vision/analyze output: annotated video, or the pose time series only
+# (output -> cache file suffix, media type)
+OUTPUT_MODES = {
+    "video": (".mp4", "video/mp4"),
+    "json": (".json", "application/json"),
+    "binary": (".bin", "application/octet-stream"),
+}
+CACHE_HIT = {"X-Cache": "hit"}
+CACHE_MISS = {"X-Cache": "miss"}
+
+# Each live session holds its own tracking Pose
+WS_MAX_SESSIONS = int(os.getenv("WS_MAX_SESSIONS", str(2 * (os.cpu_count() or 1))))
+_ws_sessions = 0
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep small uploads in memory; larger ones spill to a temporary file
+    configure_upload_spooling()
+    FRAME_WORKERS.start()
+    JOBS.start()
+    JANITOR.start()
+    await asyncio.to_thread(FRAME_WORKERS.warm_up)
+    yield
+    JANITOR.stop()
+    FRAME_WORKERS.shutdown()
+    JOBS.shutdown()
+    shutdown_pipeline()
+
+
+app = FastAPI(title="Form Corrector Service", version="0.1.0", lifespan=lifespan)
 
 # Dev CORS for local React app
 app.add_middleware(
@@ -23,6 +80,29 @@ app.add_middleware(
 )
 
 
+def _server_timing(timings):
+    """Server-Timing header (milliseconds per stage) for a pipelined analysis."""
+    stages = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items() if stage != "slowest"]
+    return {"Server-Timing": ", ".join(stages)} if stages else {}
+
+
+def _stream_file(f, media_type: str, filename: str, headers: dict):
+    """Send an already open file, closing it afterwards.
+
+    Cached results are sent this way rather than by path: the cache may
+    evict (unlink) the entry while the response is going out, but the open
+    file keeps its data until it is closed.
+    """
+    size = os.fstat(f.fileno()).st_size
+
+    def chunks():
+        while chunk := f.read(1024 * 1024):
+            yield chunk
+
+    headers = {**headers, "Content-Length": str(size), "Content-Disposition": f'attachment; filename="{filename}"'}
+    return StreamingResponse(chunks(), media_type=media_type, headers=headers, background=BackgroundTask(f.close))
+
+
 @app.get("/health")
 def health():
     return {"ok": True}
@@ -34,132 +114,237 @@ def exercises():
 
 
 @app.post("/vision/analyze")
-def analyze(file: UploadFile = File(...), exercise: str = Form("pushup")):
+def analyze(
+    file: UploadFile = File(...),
+    exercise: str = Form("pushup"),
+    frame_step: int = Form(1),
+    target_fps: float = Form(0.0),
+    max_side: int = Form(0),
+    interpolate: bool = Form(True),
+    output: str = Form("video"),
+):
     if exercise not in EXERCISE_CHECKS:
         return JSONResponse({"error": f"exercise must be one of {list(EXERCISE_CHECKS.keys())}"}, status_code=400)
-
-    tmp_dir = os.path.abspath("temp")
-    os.makedirs(tmp_dir, exist_ok=True)
-    in_path = os.path.join(tmp_dir, f"in_{uuid.uuid4().hex}.mp4")
-    out_path = os.path.join(tmp_dir, f"out_{uuid.uuid4().hex}.mp4")
-    with open(in_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
+    if output not in OUTPUT_MODES:
+        return JSONResponse({"error": f"output must be one of {list(OUTPUT_MODES)}"}, status_code=400)
     try:
-        # Use a more robust analyzer with FPS fallback first
-        ok = _analyze_video_safe(in_path, exercise, out_path)
-        if not ok:
-            # Fallback to original implementation if something went wrong
-            run_analyze_video(in_path, exercise=exercise, output_video=out_path)
-        # Validate output exists and non-empty
-        if not os.path.exists(out_path) or os.path.getsize(out_path) < 1024:
-            return JSONResponse({"error": "processing failed: empty output"}, status_code=500)
-        return FileResponse(out_path, media_type="video/mp4", filename="processed.mp4")
-    finally:
-        try:
-            os.remove(in_path)
-        except OSError:
-            pass
+        options = AnalysisOptions(frame_step, target_fps, max_side, interpolate)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
 
+    # Re-uploads and client retries of the same clip are served from the result cache
+    key = cache_key(hash_file(file.file), exercise, options, output)
+    suffix, media_type = OUTPUT_MODES[output]
+    if output == "video":
+        cached = RESULT_CACHE.open(key, suffix)
+        if cached is not None:
+            return _stream_file(cached, media_type, "processed.mp4", CACHE_HIT)
+    else:
+        cached = RESULT_CACHE.read(key, suffix)
+        if cached is not None:
+            return Response(cached, media_type=media_type, headers=CACHE_HIT)
 
-def _analyze_frame_bytes(image_bytes: bytes, exercise: str):
-    """Run pose on a single image frame and return feedback + landmarks.
+    out_path = scratch_path("out")
+    try:
+        with upload_as_path(file.file) as in_path:
+            if output != "video":
+                # Landmarks only: no drawing or re-encoding, the client renders overlays
+                series = analyze_video_series(in_path, exercise, options)
+                if series is None:
+                    return JSONResponse({"error": "processing failed: unreadable video"}, status_code=400)
+                series["summary"] = analyze_series(series)
+                if output == "binary":
+                    body = series_to_binary(series)
+                else:
+                    body = json.dumps(series_to_json(series), ensure_ascii=False).encode("utf-8")
+                RESULT_CACHE.put_bytes(key, suffix, body)
+                return Response(body, media_type=media_type, headers=CACHE_MISS)
+            # Use a more robust analyzer with FPS fallback first
+            timings = {}
+            ok = analyze_video_file(in_path, exercise, out_path, options=options, timings=timings)
+    except Exception:
+        remove_file(out_path)
+        raise
+    if not ok:
+        remove_file(out_path)
+        return JSONResponse({"error": "processing failed: empty output"}, status_code=500)
+    # Opened before the cache takes it, so the response survives its eviction
+    result = open(out_path, "rb")
+    if RESULT_CACHE.put_file(key, suffix, out_path) == out_path:
+        # Not cached; the open file keeps the data until it is sent
+        remove_file(out_path)
+    headers = {**CACHE_MISS, **_server_timing(timings)}
+    return _stream_file(result, media_type, "processed.mp4", headers)
 
-    Returns dict: {feedback, angle, point: [x,y], color: [r,g,b], landmarks: [[x,y,visibility]...], width, height}
-    """
+
+@app.post("/vision/jobs", status_code=202)
+def create_job(
+    request: Request,
+    file: UploadFile = File(...),
+    exercise: str = Form("pushup"),
+    frame_step: int = Form(1),
+    target_fps: float = Form(0.0),
+    max_side: int = Form(0),
+    interpolate: bool = Form(True),
+):
+    """Queue a video for analysis and return its job id straight away."""
     if exercise not in EXERCISE_CHECKS:
-        return {"error": f"exercise must be one of {list(EXERCISE_CHECKS.keys())}"}
-
-    npbuf = np.frombuffer(image_bytes, np.uint8)
-    img = cv2.imdecode(npbuf, cv2.IMREAD_COLOR)
-    if img is None:
-        return {"error": "invalid image"}
-    h, w = img.shape[:2]
-
-    mp_pose = mp.solutions.pose
-    with mp_pose.Pose(static_image_mode=True, min_detection_confidence=0.5) as pose:
-        rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        res = pose.process(rgb)
-        if not res.pose_landmarks:
-            return {"feedback": "No person detected", "landmarks": [], "width": w, "height": h}
-        lms = res.pose_landmarks.landmark
-        check_func = EXERCISE_CHECKS[exercise]
-        try:
-            feedback, point, angle, color = check_func(lms)
-        except Exception:
-            feedback, point, angle, color = ("", (0, 0), 0.0, (0, 255, 0))
-        # normalize output
-        lm_list = [[float(p.x), float(p.y), float(getattr(p, 'visibility', 0.0))] for p in lms]
-        return {
-            "feedback": feedback,
-            "angle": float(angle),
-            "point": [float(point[0]), float(point[1])],
-            "color": [int(color[2]), int(color[1]), int(color[0])],  # convert BGR to RGB order
-            "landmarks": lm_list,
-            "width": int(w),
-            "height": int(h),
-        }
+        return JSONResponse({"error": f"exercise must be one of {list(EXERCISE_CHECKS.keys())}"}, status_code=400)
+    try:
+        options = AnalysisOptions(frame_step, target_fps, max_side, interpolate)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    if JOBS.pending() >= JOBS.max_pending:
+        return JSONResponse({"error": "too many jobs queued, retry later"}, status_code=429, headers={"Retry-After": "30"})
+
+    # The job outlives the request, so it gets its own copy of the upload
+    in_path = save_upload(file.file)
+    try:
+        job = JOBS.submit(in_path, exercise, scratch_path("out"), options)
+    except JobQueueFull:
+        remove_file(in_path)
+        return JSONResponse({"error": "too many jobs queued, retry later"}, status_code=429, headers={"Retry-After": "30"})
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": str(request.url_for("job_status", job_id=job.id)),
+    }
+
+
+@app.get("/vision/jobs/{job_id}")
+def job_status(request: Request, job_id: str):
+    job = JOBS.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "unknown or expired job"}, status_code=404)
+    info = JOBS.status(job)
+    if job.status == DONE:
+        info["result_url"] = str(request.url_for("job_result", job_id=job.id))
+    return info
+
+
+@app.get("/vision/jobs/{job_id}/result")
+def job_result(job_id: str):
+    job = JOBS.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "unknown or expired job"}, status_code=404)
+    if job.status != DONE:
+        return JSONResponse(JOBS.status(job), status_code=409)
+    return FileResponse(job.output_path, media_type="video/mp4", filename="processed.mp4")
 
 
 @app.post("/vision/stream-frame")
-async def stream_frame(file: UploadFile = File(...), exercise: str = Form("pushup")):
+async def stream_frame(file: UploadFile = File(...), exercise: str = Form("pushup"), cache: bool = Form(False)):
+    if exercise not in EXERCISE_CHECKS:
+        return JSONResponse({"error": f"exercise must be one of {list(EXERCISE_CHECKS.keys())}"}, status_code=400)
     data = await file.read()
-    result = _analyze_frame_bytes(data, exercise)
+    # Live frames almost never repeat, so only opted-in requests touch the disk cache
+    key = cache_key(hashlib.sha256(data).hexdigest(), exercise, "frame") if cache else None
+    if key is not None:
+        cached = await asyncio.to_thread(FRAME_CACHE.read, key, ".frame.json")
+        if cached is not None:
+            return Response(cached, media_type="application/json", headers=CACHE_HIT)
+    try:
+        result = await FRAME_WORKERS.analyze(data, exercise)
+    except FramePoolSaturated:
+        return JSONResponse({"error": "too many frames in flight, retry shortly"}, status_code=429, headers={"Retry-After": "1"})
+    except BrokenProcessPool:
+        return JSONResponse({"error": "frame worker crashed, retry shortly"}, status_code=503)
     if "error" in result:
         return JSONResponse(result, status_code=400)
-    return result
+    if key is None:
+        return JSONResponse(result)
+    body = json.dumps(result, ensure_ascii=False).encode("utf-8")
+    await asyncio.to_thread(FRAME_CACHE.put_bytes, key, ".frame.json", body)
+    return Response(body, media_type="application/json", headers=CACHE_MISS)
 
 
-def _analyze_video_safe(input_video: str, exercise: str, output_video: str) -> bool:
+@app.websocket("/vision/ws")
+async def vision_ws(websocket: WebSocket, exercise: str = "pushup"):
+    """Live form correction over a WebSocket.
+
+    The client sends binary JPEG/PNG frames (and optionally text JSON such as
+    ``{"exercise": "squat"}`` to switch exercise); each analysed frame is
+    answered with the same JSON as /vision/stream-frame plus ``frame`` (the
+    sequence number of the analysed frame) and ``dropped``. The session owns a
+    tracking-mode Pose, so consecutive frames are far cheaper than stateless
+    ones. Only the newest frame is kept while one is being analysed: if the
+    client sends faster than the server keeps up, stale frames are dropped.
+    """
+    global _ws_sessions
+    await websocket.accept()
     if exercise not in EXERCISE_CHECKS:
-        return False
-    check_func = EXERCISE_CHECKS[exercise]
-
-    cap = cv2.VideoCapture(input_video)
-    if not cap.isOpened():
-        return False
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 640)
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 360)
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    try:
-        fps = float(fps)
-        if fps <= 1 or fps != fps:  # <=1 or NaN
-            fps = 24.0
-    except Exception:
-        fps = 24.0
+        await websocket.send_json({"error": f"exercise must be one of {list(EXERCISE_CHECKS.keys())}"})
+        await websocket.close(code=1008)
+        return
+    if _ws_sessions >= WS_MAX_SESSIONS:
+        await websocket.send_json({"error": "too many live sessions, try again later"})
+        await websocket.close(code=1013)
+        return
 
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    out = cv2.VideoWriter(output_video, fourcc, fps, (width, height))
-    wrote_any = False
+    session = {"exercise": exercise, "frame": None, "seq": 0, "dropped": 0}
+    frame_ready = asyncio.Event()
+    pose = None
+    # Held while a worker thread uses the pose, so closing waits for it
+    pose_lock = threading.Lock()
+    tasks = []
 
-    mp_pose = mp.solutions.pose
-    with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose:
+    async def receive_frames():
         while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            image.flags.writeable = False
-            results = pose.process(image)
-            image.flags.writeable = True
-            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-            if results.pose_landmarks:
-                lms = results.pose_landmarks.landmark
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes") is not None:
+                if session["frame"] is not None:
+                    session["dropped"] += 1
+                session["seq"] += 1
+                session["frame"] = (session["seq"], message["bytes"])
+                frame_ready.set()
+            elif message.get("text"):
                 try:
-                    feedback, point, angle, color = check_func(lms)
-                    px, py = tuple(np.multiply(point, [width, height]).astype(int))
-                    cv2.rectangle(image, (30, 20), (min(width - 30, 560), 70), (0, 0, 0), -1)
-                    cv2.putText(image, feedback, (40, 55), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-                    cv2.rectangle(image, (px - 30, py - 30), (px + 30, py + 30), (0, 0, 0), -1)
-                    cv2.putText(image, str(int(angle)), (px - 20, py + 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-                except Exception:
-                    pass
-                mp.solutions.drawing_utils.draw_landmarks(image, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
-            out.write(image)
-            wrote_any = True
-
-    cap.release()
-    out.release()
-    return wrote_any and os.path.exists(output_video)
+                    control = json.loads(message["text"])
+                except ValueError:
+                    continue
+                if control.get("exercise") in EXERCISE_CHECKS:
+                    session["exercise"] = control["exercise"]
+
+    def analyze(data: bytes, exercise: str):
+        img = decode_frame(data)
+        if img is None:
+            return {"error": "invalid image"}
+        with pose_lock:
+            return analyze_image(img, exercise, pose)
+
+    def close_pose():
+        with pose_lock:
+            pose.close()
+
+    async def analyze_frames():
+        while True:
+            await frame_ready.wait()
+            frame_ready.clear()
+            seq, data = session["frame"]
+            session["frame"] = None
+            result = await asyncio.to_thread(analyze, data, session["exercise"])
+            result["frame"] = seq
+            result["dropped"] = session["dropped"]
+            await websocket.send_json(result)
+
+    try:
+        _ws_sessions += 1
+        # Loading the model takes a while: keep it off the event loop
+        pose = await asyncio.to_thread(
+            create_pose, static_image_mode=False, min_detection_confidence=0.5, min_tracking_confidence=0.5
+        )
+        tasks = [asyncio.create_task(receive_frames()), asyncio.create_task(analyze_frames())]
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        _ws_sessions -= 1
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if pose is not None:
+            # Even if this handler is cancelled here, the thread still closes the pose
+            await asyncio.to_thread(close_pose)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,68 @@
+"""Serial vs pipelined whole-video analysis (run: python benchmarks/bench_video.py clip.mp4).
+
+Analyses the clip with the serial loop and with the staged pipeline, a few
+times each, and prints the wall-clock time per run plus the pipeline's
+per-stage timing, so VIDEO_PIPELINE can be turned on only where it pays off.
+The first pipelined run includes starting the inference process; later runs
+reuse it, as the service does.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from video_analysis import (  # noqa: E402
+    AnalysisOptions,
+    analyze_video_pipelined,
+    analyze_video_safe,
+    shutdown_pipeline,
+)
+
+
+def _run(func, video, exercise, options, timings=None):
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, "out.mp4")
+        started = time.perf_counter()
+        args = (video, exercise, output, None, options) + ((timings,) if timings is not None else ())
+        if not func(*args):
+            raise SystemExit(f"{func.__name__} produced no output for {video}")
+        return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("video", help="clip to analyse")
+    parser.add_argument("--exercise", default="squat")
+    parser.add_argument("--runs", type=int, default=3, help="runs per mode")
+    parser.add_argument("--frame-step", type=int, default=1)
+    parser.add_argument("--target-fps", type=float, default=0.0)
+    parser.add_argument("--max-side", type=int, default=0)
+    args = parser.parse_args()
+    options = AnalysisOptions(args.frame_step, args.target_fps, args.max_side)
+
+    try:
+        serial = [_run(analyze_video_safe, args.video, args.exercise, options) for _ in range(args.runs)]
+        pipelined, stages = [], []
+        for _ in range(args.runs):
+            timings = {}
+            pipelined.append(_run(analyze_video_pipelined, args.video, args.exercise, options, timings))
+            stages.append(timings)
+    finally:
+        shutdown_pipeline()
+
+    print(f"{'mode':<12}{'first':>10}{'median':>10}{'best':>10}")
+    for name, times in (("serial", serial), ("pipelined", pipelined)):
+        print(f"{name:<12}{times[0]:>9.2f}s{statistics.median(times):>9.2f}s{min(times):>9.2f}s")
+    print(f"speed-up (median): {statistics.median(serial) / statistics.median(pipelined):.2f}x")
+    last = stages[-1]
+    busy = ", ".join(f"{stage} {last[stage]:.2f}s" for stage in ("decode", "infer", "annotate", "encode"))
+    print(f"pipeline stages (last run): {busy}; slowest {last['slowest']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import math
+
 import cv2
 import mediapipe as mp
 import numpy as np
@@ -9,11 +11,9 @@ mp_pose = mp.solutions.pose
 # Utility function
 # ----------------------------
 def calculate_angle(a, b, c):
-    a = np.array(a)
-    b = np.array(b)
-    c = np.array(c)
-    radians = np.arctan2(c[1]-b[1], c[0]-b[0]) - np.arctan2(a[1]-b[1], a[0]-b[0])
-    angle = np.abs(radians*180.0/np.pi)
+    # Scalar math: this runs per frame, where building numpy arrays costs more than the maths
+    radians = math.atan2(c[1]-b[1], c[0]-b[0]) - math.atan2(a[1]-b[1], a[0]-b[0])
+    angle = abs(radians*180.0/math.pi)
     if angle > 180.0:
         angle = 360 - angle
     return angle
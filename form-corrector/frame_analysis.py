@@ -0,0 +1,60 @@
+"""Single-frame pose analysis shared by the HTTP, WebSocket and worker-process paths."""
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+from exercise_analyzer import EXERCISE_CHECKS
+
+
+def create_pose(**pose_kwargs):
+    """Build a `mp.solutions.pose.Pose` and run it once, so its graph is initialised before real frames arrive."""
+    pose = mp.solutions.pose.Pose(**pose_kwargs)
+    pose.process(np.zeros((64, 64, 3), dtype=np.uint8))
+    return pose
+
+
+def decode_frame(image_bytes: bytes):
+    """Decode JPEG/PNG bytes to a BGR image, or None if they are not an image."""
+    npbuf = np.frombuffer(image_bytes, np.uint8)
+    return cv2.imdecode(npbuf, cv2.IMREAD_COLOR)
+
+
+def analyze_image(img, exercise: str, pose):
+    """Run `pose` on a decoded BGR image and return feedback + landmarks."""
+    h, w = img.shape[:2]
+    rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    res = pose.process(rgb)
+    if not res.pose_landmarks:
+        return {"feedback": "No person detected", "landmarks": [], "width": w, "height": h}
+    lms = res.pose_landmarks.landmark
+    check_func = EXERCISE_CHECKS[exercise]
+    try:
+        feedback, point, angle, color = check_func(lms)
+    except Exception:
+        feedback, point, angle, color = ("", (0, 0), 0.0, (0, 255, 0))
+    # normalize output
+    lm_list = [[float(p.x), float(p.y), float(getattr(p, 'visibility', 0.0))] for p in lms]
+    return {
+        "feedback": feedback,
+        "angle": float(angle),
+        "point": [float(point[0]), float(point[1])],
+        "color": [int(color[2]), int(color[1]), int(color[0])],  # convert BGR to RGB order
+        "landmarks": lm_list,
+        "width": int(w),
+        "height": int(h),
+    }
+
+
+def analyze_frame_bytes(image_bytes: bytes, exercise: str, pose):
+    """Run `pose` on a single image frame and return feedback + landmarks.
+
+    Returns dict: {feedback, angle, point: [x,y], color: [r,g,b], landmarks: [[x,y,visibility]...], width, height}
+    """
+    if exercise not in EXERCISE_CHECKS:
+        return {"error": f"exercise must be one of {list(EXERCISE_CHECKS.keys())}"}
+
+    img = decode_frame(image_bytes)
+    if img is None:
+        return {"error": "invalid image"}
+    return analyze_image(img, exercise, pose)
@@ -0,0 +1,93 @@
+"""Process pool that runs single-frame pose analysis off the event loop."""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+FRAME_WORKERS = int(os.getenv("FRAME_WORKERS", "0")) or (os.cpu_count() or 1)
+# Frames allowed in flight (running + queued) before new ones get a 429
+FRAME_QUEUE_DEPTH = int(os.getenv("FRAME_QUEUE_DEPTH", "0")) or 2 * FRAME_WORKERS
+
+# Set in each worker process by _init_worker
+_pose = None
+
+
+def _init_worker():
+    global _pose
+    from frame_analysis import create_pose
+
+    # A process analyses one frame at a time, so one warm instance is all it needs
+    _pose = create_pose(static_image_mode=True, min_detection_confidence=0.5)
+
+
+def _warm_up_worker():
+    # Long enough that every warm-up task lands on its own process
+    time.sleep(0.2)
+    return os.getpid()
+
+
+def _analyze_in_worker(image_bytes: bytes, exercise: str):
+    from frame_analysis import analyze_frame_bytes
+
+    return analyze_frame_bytes(image_bytes, exercise, _pose)
+
+
+class FramePoolSaturated(Exception):
+    """Raised when FRAME_QUEUE_DEPTH frames are already in flight."""
+
+
+class FrameWorkerPool:
+    """Dispatches frames to worker processes, each holding a pre-warmed Pose.
+
+    MediaPipe inference and OpenCV decoding hold the GIL for most of a frame,
+    so threads would still serialise them and stall the event loop; separate
+    processes do not. Admission is bounded: once `max_pending` frames are in
+    flight, `analyze` raises `FramePoolSaturated` instead of queueing more.
+    """
+
+    def __init__(self, workers: int = FRAME_WORKERS, max_pending: int = FRAME_QUEUE_DEPTH):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor = None
+
+    def start(self):
+        # spawn: forking a process that already runs MediaPipe threads is unsafe
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+
+    def warm_up(self):
+        """Start every worker process and load its model before serving traffic."""
+        futures = [self._executor.submit(_warm_up_worker) for _ in range(self.workers)]
+        pids = {future.result() for future in futures}
+        print(f"Frame workers ready: {len(pids)} processes")
+
+    async def analyze(self, image_bytes: bytes, exercise: str):
+        """Analyse one frame in a worker process."""
+        if self.pending >= self.max_pending:
+            raise FramePoolSaturated()
+        self.pending += 1
+        executor = self._executor
+        try:
+            future = executor.submit(_analyze_in_worker, image_bytes, exercise)
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # A worker died (e.g. crashed inside native code): replace the pool once
+            if self._executor is executor:
+                print("Frame worker pool broken, restarting it")
+                self.shutdown()
+                self.start()
+            raise
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,180 @@
+"""Background video analysis jobs run on a bounded process pool."""
+
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from scratch import remove_file
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Jobs allowed queued + running before new submissions get a 429
+JOB_QUEUE_DEPTH = int(os.getenv("JOB_QUEUE_DEPTH", "8"))
+# Finished jobs (and their output files) are forgotten after this many seconds
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+def _run_job(job_id: str, input_path: str, exercise: str, output_path: str, options, progress):
+    from video_analysis import AnalysisOptions, analyze_video_file
+
+    def report(frames_done, frames_total):
+        progress[job_id] = (frames_done, frames_total)
+
+    report(0, 0)
+    timings = {}
+    # Job workers already run in parallel, so each analyses its video serially
+    # rather than starting an inference process of its own
+    ok = analyze_video_file(
+        input_path, exercise, output_path, report, options or AnalysisOptions(), timings, pipelined=False
+    )
+    return ok, timings
+
+
+class JobQueueFull(Exception):
+    """Raised when JOB_QUEUE_DEPTH jobs are already queued or running."""
+
+
+@dataclass
+class Job:
+    id: str
+    exercise: str
+    input_path: str
+    output_path: str
+    status: str = QUEUED
+    error: Optional[str] = None
+    timings: dict = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+
+class JobManager:
+    """Runs whole-video analyses in worker processes and tracks their state.
+
+    `submit` returns as soon as the job is queued; at most `max_pending` jobs
+    may be queued or running at once. Workers report frame progress through a
+    managed dict, and finished jobs are kept for `result_ttl` seconds so the
+    client can download the output. `target` is the function a worker runs
+    for each job (the video analysis unless a test swaps in a stub).
+    """
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        max_pending: int = JOB_QUEUE_DEPTH,
+        result_ttl: float = JOB_RESULT_TTL,
+        target=_run_job,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.target = target
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._manager = None
+        self._progress = None
+
+    def start(self):
+        context = multiprocessing.get_context("spawn")
+        self._manager = context.Manager()
+        self._progress = self._manager.dict()
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status in (QUEUED, RUNNING))
+
+    def submit(self, input_path: str, exercise: str, output_path: str, options=None) -> Job:
+        """Queue an analysis of `input_path`; the job owns (and later deletes) the input file."""
+        self.prune()
+        job = Job(uuid.uuid4().hex, exercise, input_path, output_path)
+        with self._lock:
+            pending = sum(1 for j in self._jobs.values() if j.status in (QUEUED, RUNNING))
+            if pending >= self.max_pending:
+                raise JobQueueFull()
+            self._jobs[job.id] = job
+        future = self._executor.submit(
+            self.target, job.id, input_path, exercise, output_path, options, self._progress
+        )
+        future.add_done_callback(lambda f: self._finish(job, f))
+        return job
+
+    def _finish(self, job: Job, future):
+        try:
+            ok, timings = future.result()
+            error = None if ok else "processing failed: empty output"
+        except Exception as e:
+            error, timings = str(e) or type(e).__name__, {}
+        with self._lock:
+            job.timings = timings
+            job.status = FAILED if error else DONE
+            job.error = error
+            job.finished_at = time.time()
+        remove_file(job.input_path)
+        if error:
+            remove_file(job.output_path)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self.prune()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job: Job) -> dict:
+        """Public view of a job, with progress while it runs."""
+        frames_done, frames_total = self._progress.get(job.id, (0, 0))
+        status = job.status
+        if status == QUEUED and job.id in self._progress:
+            status = RUNNING
+        if status == DONE:
+            progress = 1.0
+        elif frames_total:
+            progress = round(min(frames_done / frames_total, 0.99), 3)
+        else:
+            progress = 0.0
+        info = {
+            "job_id": job.id,
+            "exercise": job.exercise,
+            "status": status,
+            "progress": progress,
+            "frames_done": frames_done,
+            "frames_total": frames_total,
+        }
+        if job.timings:
+            info["timings"] = job.timings
+        if job.error:
+            info["error"] = job.error
+        return info
+
+    def prune(self):
+        """Forget jobs finished more than `result_ttl` seconds ago and delete their outputs."""
+        now = time.time()
+        with self._lock:
+            expired = [
+                job for job in self._jobs.values()
+                if job.finished_at is not None and now - job.finished_at > self.result_ttl
+            ]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            self._progress.pop(job.id, None)
+            remove_file(job.output_path)
+
+    def live_paths(self):
+        """Scratch files still owned by a job (after pruning expired ones)."""
+        self.prune()
+        with self._lock:
+            return [path for job in self._jobs.values() for path in (job.input_path, job.output_path)]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
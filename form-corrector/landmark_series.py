@@ -0,0 +1,39 @@
+"""Compact encodings of a pose time series (see video_analysis.analyze_video_series)."""
+
+import json
+import struct
+
+import numpy as np
+
+# Quantised landmark units per normalised image unit in the JSON encoding
+LANDMARK_SCALE = 1000
+
+
+def series_to_json(series) -> dict:
+    """Columnar JSON: one list per field, landmarks as quantised integers.
+
+    ``landmarks`` holds one flat list of 33 × (x, y, visibility) integers per
+    sampled frame (divide by ``landmark_scale``), or null without a pose.
+    """
+    data = {key: value for key, value in series.items() if key != "landmarks"}
+    quantised = np.rint(series["landmarks"] * LANDMARK_SCALE)
+    data["landmark_scale"] = LANDMARK_SCALE
+    data["landmarks"] = [
+        None if np.isnan(row).any() else row.astype(np.int32).ravel().tolist()
+        for row in quantised
+    ]
+    return data
+
+
+def series_to_binary(series) -> bytes:
+    """Length-prefixed JSON header followed by a float16 landmark array.
+
+    Layout: a little-endian uint32 header length, the UTF-8 JSON header (every
+    field except ``landmarks``, plus ``shape``), then the (frames, 33, 3)
+    x, y, visibility array as little-endian float16 (NaN without a pose).
+    """
+    landmarks = series["landmarks"].astype("<f2")
+    header = {key: value for key, value in series.items() if key != "landmarks"}
+    header["shape"] = list(landmarks.shape)
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    return struct.pack("<I", len(header_bytes)) + header_bytes + landmarks.tobytes()
@@ -0,0 +1,160 @@
+"""Size-bounded on-disk LRU of analysis results, keyed by a hash of the input."""
+
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+RESULT_CACHE_DIR = os.path.abspath(os.getenv("RESULT_CACHE_DIR", "cache"))
+# 0 disables the cache
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(1024 ** 3)))
+# Single-frame results get their own small budget, so live frames never push out videos
+FRAME_CACHE_MAX_BYTES = int(os.getenv("FRAME_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Bump when analysis output changes, so stale results are never served
+RESULT_CACHE_VERSION = "1"
+
+_CHUNK = 1024 * 1024
+
+
+def hash_file(fileobj) -> str:
+    """SHA-256 of a seekable file object's contents; leaves it rewound to the start."""
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    while True:
+        chunk = fileobj.read(_CHUNK)
+        if not chunk:
+            break
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def cache_key(content_digest: str, *params) -> str:
+    """Key for a result of analysing content with `content_digest` under `params`."""
+    material = "|".join([RESULT_CACHE_VERSION, content_digest, *map(str, params)])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Stores result files under `directory`, evicting least recently used ones past `max_bytes`.
+
+    Recency is the file's mtime, which a hit refreshes, so the order survives
+    restarts (the index is rebuilt from the directory on first use). Entries
+    are named by key plus a suffix describing the result kind (``.mp4``,
+    ``.json``, ...), and written atomically, so a reader never sees a partial
+    file.
+    """
+
+    def __init__(self, directory: str = RESULT_CACHE_DIR, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries = None  # OrderedDict name -> size, least recently used first
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name, stat.st_size))
+        self._entries = OrderedDict((name, size) for _, name, size in sorted(files))
+        self._size = sum(self._entries.values())
+
+    def path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, key + suffix)
+
+    def get(self, key: str, suffix: str):
+        """Path of the cached result, or None on a miss."""
+        if not self.enabled:
+            return None
+        name = key + suffix
+        with self._lock:
+            self._load()
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+        path = self.path(key, suffix)
+        try:
+            os.utime(path)
+        except OSError:
+            # Deleted behind our back (another process evicted it)
+            with self._lock:
+                self._size -= self._entries.pop(name, 0)
+            return None
+        return path
+
+    def open(self, key: str, suffix: str):
+        """Cached result opened for binary reading, or None on a miss.
+
+        The open file stays readable even if the entry is evicted meanwhile,
+        which a path handed to a later reader does not.
+        """
+        path = self.get(key, suffix)
+        if path is None:
+            return None
+        try:
+            return open(path, "rb")
+        except OSError:
+            return None
+
+    def read(self, key: str, suffix: str):
+        """Cached result bytes, or None on a miss."""
+        f = self.open(key, suffix)
+        if f is None:
+            return None
+        with f:
+            return f.read()
+
+    def put_file(self, key: str, suffix: str, src_path: str) -> str:
+        """Move `src_path` into the cache and return its new path."""
+        if not self.enabled:
+            return src_path
+        with self._lock:
+            self._load()
+        path = self.path(key, suffix)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        shutil.move(src_path, tmp)
+        os.replace(tmp, path)
+        self._added(key + suffix, os.path.getsize(path))
+        return path
+
+    def put_bytes(self, key: str, suffix: str, data: bytes):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._load()
+        path = self.path(key, suffix)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self._added(key + suffix, len(data))
+
+    def _added(self, name: str, size: int):
+        evicted = []
+        with self._lock:
+            self._size += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+            # Never evict the entry just written, even if it alone exceeds the budget
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                old, old_size = self._entries.popitem(last=False)
+                self._size -= old_size
+                evicted.append(old)
+        for old in evicted:
+            try:
+                os.remove(os.path.join(self.directory, old))
+            except OSError:
+                pass
+
+
+RESULT_CACHE = ResultCache()
+FRAME_CACHE = ResultCache(os.path.join(RESULT_CACHE_DIR, "frames"), FRAME_CACHE_MAX_BYTES)
@@ -0,0 +1,130 @@
+"""Scratch space for uploads and outputs, and the janitor that keeps it from growing."""
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from starlette.formparsers import MultiPartParser
+
+# Point this at a tmpfs (e.g. /dev/shm/form-corrector) to keep scratch files in RAM
+SCRATCH_DIR = os.path.abspath(os.getenv("SCRATCH_DIR", "temp"))
+# Files untouched for longer than this are deleted by the janitor
+SCRATCH_MAX_AGE = float(os.getenv("SCRATCH_MAX_AGE", "3600"))
+JANITOR_INTERVAL = float(os.getenv("JANITOR_INTERVAL", "300"))
+# Uploads up to this size stay in memory instead of being spooled to disk
+UPLOAD_SPOOL_MAX_BYTES = int(os.getenv("UPLOAD_SPOOL_MAX_BYTES", str(8 * 1024 * 1024)))
+
+
+def configure_upload_spooling():
+    """Make multipart uploads up to UPLOAD_SPOOL_MAX_BYTES stay in memory.
+
+    Starlette only exposes this as a class attribute of its multipart parser,
+    so it applies to every app in the process; this is the one place it is
+    set, at startup. `upload_as_path` relies on it to tell which uploads are
+    on disk.
+    """
+    MultiPartParser.spool_max_size = UPLOAD_SPOOL_MAX_BYTES
+
+
+def scratch_path(prefix: str, suffix: str = ".mp4") -> str:
+    os.makedirs(SCRATCH_DIR, exist_ok=True)
+    return os.path.join(SCRATCH_DIR, f"{prefix}_{uuid.uuid4().hex}{suffix}")
+
+
+def remove_file(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def save_upload(fileobj, prefix: str = "in") -> str:
+    """Copy an upload into scratch space and return the new path."""
+    path = scratch_path(prefix)
+    fileobj.seek(0)
+    with open(path, "wb") as f:
+        shutil.copyfileobj(fileobj, f, 1024 * 1024)
+    return path
+
+
+@contextmanager
+def upload_as_path(fileobj):
+    """A path OpenCV can open for the upload, valid for the `with` block.
+
+    An upload that was spooled to disk is read in place through /proc (its
+    temporary file has no name of its own), so large videos are not copied a
+    second time. Uploads still held in memory, or on systems without /proc,
+    are written to scratch space and removed afterwards.
+    """
+    # Calling fileno() on an in-memory SpooledTemporaryFile would force it to disk;
+    # it rolls over once it holds more than the spool size
+    fileobj.seek(0, os.SEEK_END)
+    on_disk = fileobj.tell() > UPLOAD_SPOOL_MAX_BYTES
+    fileobj.seek(0)
+    source = None
+    if on_disk and os.path.isdir("/proc/self/fd"):
+        try:
+            source = f"/proc/self/fd/{fileobj.fileno()}"
+        except (AttributeError, OSError, ValueError):
+            pass
+    if source is not None:
+        yield source
+        return
+    path = save_upload(fileobj)
+    try:
+        yield path
+    finally:
+        remove_file(path)
+
+
+class Janitor:
+    """Deletes scratch files older than `max_age` every `interval` seconds.
+
+    `in_use()` returns paths that must survive regardless of age (inputs and
+    outputs of jobs that are still queued, running or awaiting download).
+    """
+
+    def __init__(self, directory: str = SCRATCH_DIR, max_age: float = SCRATCH_MAX_AGE, interval: float = JANITOR_INTERVAL, in_use=None):
+        self.directory = directory
+        self.max_age = max_age
+        self.interval = interval
+        self.in_use = in_use or (lambda: ())
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sweep(self) -> int:
+        """Delete stale files now; returns how many were removed."""
+        if not os.path.isdir(self.directory):
+            return 0
+        keep = set(self.in_use())
+        cutoff = time.time() - self.max_age
+        removed = 0
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.is_file() and entry.path not in keep and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                removed = self.sweep()
+                if removed:
+                    print(f"Janitor removed {removed} stale scratch files")
+            except Exception as e:
+                print(f"Janitor sweep failed: {e}")
+
+    def start(self):
+        self._stop.clear()
+        self.sweep()
+        self._thread = threading.Thread(target=self._run, name="scratch-janitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,221 @@
+"""Tests for the whole-set analytics on synthetic angle series."""
+
+import numpy as np
+import pytest
+
+from analytics import (
+    EXERCISE_SPECS,
+    LEFT_ELBOW,
+    LEFT_HIP,
+    LEFT_KNEE,
+    LEFT_SHOULDER,
+    LEFT_WRIST,
+    analyze_set,
+    detect_reps,
+    fill_gaps,
+    joint_angles,
+)
+
+
+def _place(landmarks, joint, angles, origin=(0.5, 0.5), radius=0.2):
+    """Put the (a, b, c) triplet in every frame so the angle at b is `angles` (degrees)."""
+    a, b, c = joint
+    theta = np.radians(np.asarray(angles, dtype=np.float64))
+    landmarks[:, b, 0], landmarks[:, b, 1] = origin
+    landmarks[:, a, 0], landmarks[:, a, 1] = origin[0], origin[1] - radius
+    landmarks[:, c, 0] = origin[0] + radius * np.sin(theta)
+    landmarks[:, c, 1] = origin[1] - radius * np.cos(theta)
+
+
+def _landmarks(exercise, angles):
+    """(frames, 33, 3) landmarks whose main joint follows `angles`; NaN angles become missing poses."""
+    angles = np.asarray(angles, dtype=np.float64)
+    landmarks = np.zeros((len(angles), 33, 3))
+    landmarks[:, :, 2] = 1.0
+    _place(landmarks, EXERCISE_SPECS[exercise].joint, np.nan_to_num(angles, nan=180.0))
+    landmarks[np.isnan(angles)] = np.nan
+    return landmarks
+
+
+def _reps(count, top=170.0, bottom=80.0, frames_per_rep=40):
+    """Cosine angle series starting and ending at the top, with `count` reps."""
+    t = np.linspace(0.0, count, count * frames_per_rep + 1)
+    return bottom + (top - bottom) * (1 + np.cos(2 * np.pi * t)) / 2
+
+
+def _segment(*pieces):
+    """Concatenate (start, end, frames) ramps into one series."""
+    return np.concatenate([np.linspace(start, end, frames) for start, end, frames in pieces])
+
+
+class TestJointAngles:
+    """Test the vectorised angle formula."""
+
+    @pytest.mark.parametrize("angle", [30.0, 90.0, 135.0, 180.0])
+    def test_matches_placed_angle(self, angle):
+        landmarks = _landmarks("squat", [angle])
+
+        assert joint_angles(landmarks, *EXERCISE_SPECS["squat"].joint)[0] == pytest.approx(angle)
+
+    def test_missing_point_gives_nan(self):
+        landmarks = _landmarks("squat", [120.0, np.nan])
+
+        angles = joint_angles(landmarks, *EXERCISE_SPECS["squat"].joint)
+
+        assert not np.isnan(angles[0])
+        assert np.isnan(angles[1])
+
+
+class TestFillGaps:
+    """Test linear gap filling of frames without a pose."""
+
+    def test_interpolates_interior_gaps(self):
+        filled = fill_gaps(np.array([100.0, np.nan, np.nan, 130.0]))
+
+        np.testing.assert_allclose(filled, [100.0, 110.0, 120.0, 130.0])
+
+    def test_holds_edge_values(self):
+        filled = fill_gaps(np.array([np.nan, 90.0, 120.0, np.nan]))
+
+        np.testing.assert_allclose(filled, [90.0, 90.0, 120.0, 120.0])
+
+    def test_all_nan_left_alone(self):
+        assert np.isnan(fill_gaps(np.full(4, np.nan))).all()
+
+    def test_does_not_modify_input(self):
+        values = np.array([1.0, np.nan, 3.0])
+
+        fill_gaps(values)
+
+        assert np.isnan(values[1])
+
+
+class TestDetectReps:
+    """Test hysteresis rep detection."""
+
+    @pytest.mark.parametrize("count", [1, 3, 5])
+    def test_counts_cosine_reps(self, count):
+        angles = _reps(count)
+
+        reps = detect_reps(angles, down=110.0, up=155.0)
+
+        assert len(reps) == count
+        # Bottoms land on the cosine minima, half way through each rep
+        np.testing.assert_array_equal(reps[:, 1], 20 + 40 * np.arange(count))
+        assert (reps[:, 0] < reps[:, 1]).all() and (reps[:, 1] < reps[:, 2]).all()
+
+    def test_jitter_inside_band_is_not_a_rep(self):
+        rng = np.random.default_rng(0)
+        angles = np.concatenate([np.full(10, 170.0), rng.uniform(115.0, 150.0, 200), np.full(10, 170.0)])
+
+        assert len(detect_reps(angles, down=110.0, up=155.0)) == 0
+
+    def test_jitter_across_one_threshold_counts_once(self):
+        # Bounces across `down` at the bottom, but only one return to the top
+        bottom = np.tile([105.0, 115.0], 10)
+        angles = np.concatenate([np.full(5, 170.0), bottom, np.full(5, 170.0)])
+
+        reps = detect_reps(angles, down=110.0, up=155.0)
+
+        assert len(reps) == 1
+        assert reps[0].tolist() == [4, 5, 25]
+
+    def test_unfinished_rep_is_not_counted(self):
+        angles = _segment((170.0, 170.0, 5), (170.0, 80.0, 20))
+
+        assert len(detect_reps(angles, down=110.0, up=155.0)) == 0
+
+    def test_starting_at_the_bottom_is_not_a_rep(self):
+        angles = _segment((80.0, 80.0, 5), (80.0, 170.0, 20))
+
+        assert len(detect_reps(angles, down=110.0, up=155.0)) == 0
+
+    def test_no_definite_state(self):
+        assert detect_reps(np.full(10, 130.0), down=110.0, up=155.0).shape == (0, 3)
+
+
+class TestAnalyzeSet:
+    """Test rep scoring, gap handling and holds end to end."""
+
+    def test_squat_reps_and_tempo(self):
+        result = analyze_set(_landmarks("squat", _reps(3)), "squat", fps=40.0)
+
+        assert result["reps"] == 3
+        assert result["pose_coverage"] == 1.0
+        assert result["duration"] == pytest.approx(3.0)
+        rep = result["rep_details"][0]
+        assert rep["down_seconds"] + rep["up_seconds"] == pytest.approx(rep["duration"])
+        assert rep["min_angle"] < 90.0
+        assert rep["form_score"] == 100
+
+    def test_shallow_rep_scores_lower(self):
+        # Hold the bottom so smoothing leaves the depth untouched
+        deep = _segment((170.0, 170.0, 10), (170.0, 90.0, 20), (90.0, 90.0, 10), (90.0, 170.0, 20), (170.0, 170.0, 10))
+        shallow = _segment((170.0, 170.0, 10), (170.0, 105.0, 20), (105.0, 105.0, 10), (105.0, 170.0, 20), (170.0, 170.0, 10))
+
+        deep_score = analyze_set(_landmarks("squat", deep), "squat")["rep_details"][0]["form_score"]
+        shallow_score = analyze_set(_landmarks("squat", shallow), "squat")["rep_details"][0]["form_score"]
+
+        assert deep_score == 100
+        # (up - depth) / (up - target) = (155 - 105) / (155 - 90)
+        assert shallow_score == round(100 * 50 / 65)
+
+    def test_pushup_alignment_weighs_in(self):
+        angles = _reps(2)
+
+        def pushup(knee_drop):
+            landmarks = np.zeros((len(angles), 33, 3))
+            _place(landmarks, (LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST), angles)
+            shoulder = landmarks[:, LEFT_SHOULDER, :2]
+            landmarks[:, LEFT_HIP, :2] = shoulder + [0.3, 0.0]
+            landmarks[:, LEFT_KNEE, :2] = shoulder + [0.6, knee_drop]
+            return analyze_set(landmarks, "pushup", fps=40.0)
+
+        straight, sagging = pushup(0.0), pushup(0.3)
+
+        assert straight["reps"] == sagging["reps"] == 2
+        assert straight["mean_form_score"] == 100
+        # Depth still counts for 60%, alignment for the rest
+        assert sagging["mean_form_score"] == 60
+
+    def test_gaps_are_filled(self):
+        angles = _reps(2)
+        angles[15:26] = np.nan  # no pose around the first bottom
+
+        result = analyze_set(_landmarks("squat", angles), "squat", fps=40.0)
+
+        assert result["reps"] == 2
+        assert result["pose_coverage"] == pytest.approx(1 - 11 / len(angles), abs=1e-3)
+
+    def test_sampled_frame_times(self):
+        angles = _reps(1)
+        times = np.arange(len(angles)) * 0.1
+
+        result = analyze_set(_landmarks("squat", angles), "squat", times=times)
+
+        rep = result["rep_details"][0]
+        assert result["duration"] == pytest.approx(4.0)
+        assert rep["duration"] == pytest.approx((rep["end"] - rep["start"]) * 0.1)
+
+    @pytest.mark.parametrize("exercise, reps", [("squat", 0), ("plank", None)])
+    def test_all_nan(self, exercise, reps):
+        result = analyze_set(_landmarks(exercise, np.full(30, np.nan)), exercise)
+
+        assert result["reps"] == reps
+        assert result["pose_coverage"] == 0.0
+        assert "rep_details" not in result
+
+    def test_empty(self):
+        assert analyze_set(np.empty((0, 33, 3)), "squat") == {
+            "exercise": "squat", "frames": 0, "duration": 0.0, "reps": 0,
+        }
+
+    def test_plank_hold(self):
+        angles = np.concatenate([np.full(60, 175.0), np.full(30, 140.0)])
+
+        result = analyze_set(_landmarks("plank", angles), "plank", fps=30.0)
+
+        assert "reps" not in result
+        assert result["hold_seconds"] == pytest.approx(2.0)
+        assert result["form_score"] == round(100 * 60 / 90)
+        assert 140.0 < result["mean_angle"] < 175.0
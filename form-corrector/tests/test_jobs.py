@@ -0,0 +1,122 @@
+"""Tests for the background job manager, with a stub in place of the video analysis."""
+
+import os
+import time
+
+import pytest
+
+from jobs import DONE, FAILED, QUEUED, RUNNING, JobManager, JobQueueFull
+
+
+def _stub_job(job_id, input_path, exercise, output_path, options, progress):
+    """Reports progress, then waits for `<input>.go` before writing the output."""
+    progress[job_id] = (1, 4)
+    deadline = time.time() + 30
+    while not os.path.exists(input_path + ".go") and time.time() < deadline:
+        time.sleep(0.02)
+    if exercise == "fail":
+        raise RuntimeError("stub failure")
+    with open(output_path, "wb") as f:
+        f.write(b"video")
+    return True, {"total": 0.1}
+
+
+def _wait(predicate, timeout=30.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        if time.time() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def manager():
+    managers = []
+
+    def start(**kwargs):
+        jobs = JobManager(target=_stub_job, **kwargs)
+        jobs.start()
+        managers.append(jobs)
+        return jobs
+
+    yield start
+    for jobs in managers:
+        jobs.shutdown()
+
+
+def _input(tmp_path, name):
+    path = tmp_path / f"{name}.mp4"
+    path.write_bytes(b"in")
+    return str(path)
+
+
+def _release(input_path):
+    open(input_path + ".go", "w").close()
+
+
+class TestJobManager:
+    """Test submission, admission, status transitions and pruning."""
+
+    def test_job_runs_to_done(self, manager, tmp_path):
+        jobs = manager(workers=1, max_pending=2)
+        first_in, second_in = _input(tmp_path, "a"), _input(tmp_path, "b")
+        first = jobs.submit(first_in, "squat", str(tmp_path / "a_out.mp4"))
+        second = jobs.submit(second_in, "squat", str(tmp_path / "b_out.mp4"))
+
+        # The single worker picks up the first job; its progress marks it running
+        _wait(lambda: jobs.status(first)["status"] == RUNNING)
+        assert jobs.status(first)["frames_done"] == 1
+        assert jobs.status(first)["progress"] == 0.25
+        assert jobs.status(second)["status"] == QUEUED
+
+        _release(first_in)
+        _release(second_in)
+        _wait(lambda: jobs.get(second.id).status == DONE)
+
+        info = jobs.status(first)
+        assert info["status"] == DONE
+        assert info["progress"] == 1.0
+        assert info["timings"] == {"total": 0.1}
+        assert not os.path.exists(first_in)
+        assert open(first.output_path, "rb").read() == b"video"
+        assert jobs.pending() == 0
+
+    def test_queue_full(self, manager, tmp_path):
+        jobs = manager(workers=1, max_pending=1)
+        first_in = _input(tmp_path, "a")
+        jobs.submit(first_in, "squat", str(tmp_path / "a_out.mp4"))
+
+        with pytest.raises(JobQueueFull):
+            jobs.submit(_input(tmp_path, "b"), "squat", str(tmp_path / "b_out.mp4"))
+        assert jobs.pending() == 1
+
+        _release(first_in)
+        _wait(lambda: jobs.pending() == 0)
+        jobs.submit(_input(tmp_path, "c"), "squat", str(tmp_path / "c_out.mp4"))
+
+    def test_failed_job(self, manager, tmp_path):
+        jobs = manager(workers=1)
+        job_in = _input(tmp_path, "a")
+        job = jobs.submit(job_in, "fail", str(tmp_path / "a_out.mp4"))
+
+        _release(job_in)
+        _wait(lambda: jobs.get(job.id).status == FAILED)
+
+        info = jobs.status(job)
+        assert info["error"] == "stub failure"
+        assert not os.path.exists(job_in)
+        assert not os.path.exists(job.output_path)
+
+    def test_finished_jobs_pruned(self, manager, tmp_path):
+        jobs = manager(workers=1, result_ttl=0.2)
+        job_in = _input(tmp_path, "a")
+        job = jobs.submit(job_in, "squat", str(tmp_path / "a_out.mp4"))
+        assert set(jobs.live_paths()) == {job_in, job.output_path}
+
+        _release(job_in)
+        _wait(lambda: jobs.get(job.id).status == DONE)
+        time.sleep(0.3)
+
+        assert jobs.get(job.id) is None
+        assert not os.path.exists(job.output_path)
+        assert jobs.live_paths() == []
@@ -0,0 +1,106 @@
+"""Tests for the JSON and binary pose series encodings."""
+
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from landmark_series import LANDMARK_SCALE, series_to_binary, series_to_json
+
+
+@pytest.fixture
+def series():
+    landmarks = np.random.default_rng(0).uniform(0.0, 1.0, (3, 33, 3)).astype(np.float32)
+    landmarks[1] = np.nan  # no pose on the second sampled frame
+    return {
+        "exercise": "squat",
+        "fps": 30.0,
+        "width": 640,
+        "height": 360,
+        "frame_count": 7,
+        "frame": [0, 3, 6],
+        "angle": [91.5, None, 120.25],
+        "feedback": [0, -1, 1],
+        "feedback_codes": ["Go lower", "Good depth"],
+        "landmarks": landmarks,
+    }
+
+
+def _decode_binary(body):
+    (length,) = struct.unpack_from("<I", body)
+    header = json.loads(body[4 : 4 + length].decode("utf-8"))
+    landmarks = np.frombuffer(body[4 + length :], dtype="<f2").reshape(header["shape"])
+    return header, landmarks
+
+
+class TestSeriesToJson:
+    """Test the columnar JSON encoding."""
+
+    def test_columns_kept(self, series):
+        data = series_to_json(series)
+
+        for key in ("exercise", "fps", "frame", "angle", "feedback", "feedback_codes"):
+            assert data[key] == series[key]
+        assert data["landmark_scale"] == LANDMARK_SCALE
+
+    def test_landmarks_quantised(self, series):
+        data = series_to_json(series)
+
+        assert len(data["landmarks"]) == 3
+        assert len(data["landmarks"][0]) == 33 * 3
+        restored = np.array(data["landmarks"][0]).reshape(33, 3) / LANDMARK_SCALE
+        np.testing.assert_allclose(restored, series["landmarks"][0], atol=0.5 / LANDMARK_SCALE + 1e-6)
+
+    def test_missing_pose_is_null(self, series):
+        data = series_to_json(series)
+
+        assert data["landmarks"][1] is None
+        assert data["landmarks"][2] is not None
+
+    def test_serialisable(self, series):
+        data = series_to_json(series)
+
+        assert json.loads(json.dumps(data)) == data
+        assert "NaN" not in json.dumps(data)
+
+    def test_empty(self, series):
+        series["landmarks"] = np.empty((0, 33, 3), dtype=np.float32)
+
+        assert series_to_json(series)["landmarks"] == []
+
+
+class TestSeriesToBinary:
+    """Test the length-prefixed binary encoding."""
+
+    def test_header_and_layout(self, series):
+        body = series_to_binary(series)
+
+        (length,) = struct.unpack_from("<I", body)
+        assert len(body) == 4 + length + 3 * 33 * 3 * 2
+        header, _ = _decode_binary(body)
+        assert header["shape"] == [3, 33, 3]
+        assert header["frame"] == [0, 3, 6]
+        assert "landmarks" not in header
+
+    def test_round_trip(self, series):
+        _, landmarks = _decode_binary(series_to_binary(series))
+
+        assert landmarks.shape == series["landmarks"].shape
+        assert np.isnan(landmarks[1]).all()
+        np.testing.assert_allclose(landmarks[[0, 2]], series["landmarks"][[0, 2]], atol=1e-3)
+
+    def test_non_ascii_header(self, series):
+        series["feedback_codes"] = ["Genou trop avancé"]
+
+        header, _ = _decode_binary(series_to_binary(series))
+
+        assert header["feedback_codes"] == ["Genou trop avancé"]
+
+    def test_empty(self, series):
+        series["landmarks"] = np.empty((0, 33, 3), dtype=np.float32)
+
+        header, landmarks = _decode_binary(series_to_binary(series))
+
+        assert header["shape"] == [0, 33, 3]
+        assert landmarks.size == 0
@@ -0,0 +1,130 @@
+"""Tests for the on-disk LRU result cache."""
+
+import io
+import os
+
+import pytest
+
+from result_cache import ResultCache, cache_key, hash_file
+
+
+def _touch(cache, key, suffix, mtime):
+    os.utime(cache.path(key, suffix), (mtime, mtime))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(str(tmp_path / "cache"), max_bytes=100)
+
+
+class TestKeys:
+    """Test content hashing and cache keys."""
+
+    def test_hash_file_rewinds(self):
+        fileobj = io.BytesIO(b"video bytes")
+        fileobj.seek(5)
+
+        digest = hash_file(fileobj)
+
+        assert fileobj.tell() == 0
+        assert digest == hash_file(io.BytesIO(b"video bytes"))
+
+    def test_key_depends_on_params(self):
+        assert cache_key("abc", "squat", 1) != cache_key("abc", "squat", 2)
+        assert cache_key("abc", "squat", 1) == cache_key("abc", "squat", 1)
+
+
+class TestResultCache:
+    """Test storage, LRU eviction and recovery from the directory."""
+
+    def test_round_trip(self, cache):
+        cache.put_bytes("k1", ".json", b"{}")
+
+        assert cache.read("k1", ".json") == b"{}"
+        assert cache.read("k1", ".bin") is None
+        assert cache.get("k2", ".json") is None
+
+    def test_put_file_moves_into_cache(self, cache, tmp_path):
+        src = tmp_path / "out.mp4"
+        src.write_bytes(b"x" * 10)
+
+        path = cache.put_file("k1", ".mp4", str(src))
+
+        assert not src.exists()
+        assert path == cache.get("k1", ".mp4")
+        assert open(path, "rb").read() == b"x" * 10
+
+    def test_evicts_least_recently_used(self, cache):
+        cache.put_bytes("k1", ".json", b"a" * 40)
+        cache.put_bytes("k2", ".json", b"b" * 40)
+        cache.get("k1", ".json")  # k2 is now the least recently used
+
+        cache.put_bytes("k3", ".json", b"c" * 40)
+
+        assert cache.get("k2", ".json") is None
+        assert not os.path.exists(cache.path("k2", ".json"))
+        assert cache.read("k1", ".json") == b"a" * 40
+        assert cache.read("k3", ".json") == b"c" * 40
+        assert cache._size == 80
+
+    def test_open_entry_survives_eviction(self, cache):
+        cache.put_bytes("k1", ".mp4", b"a" * 60)
+        f = cache.open("k1", ".mp4")
+
+        cache.put_bytes("k2", ".mp4", b"b" * 60)
+
+        with f:
+            assert f.read() == b"a" * 60
+        assert cache.open("k1", ".mp4") is None
+
+    def test_keeps_oversized_entry_just_written(self, cache):
+        cache.put_bytes("k1", ".json", b"a" * 40)
+
+        cache.put_bytes("big", ".json", b"b" * 150)
+
+        assert cache.get("k1", ".json") is None
+        assert cache.read("big", ".json") == b"b" * 150
+
+    def test_replacing_entry_updates_size(self, cache):
+        cache.put_bytes("k1", ".json", b"a" * 60)
+        cache.put_bytes("k1", ".json", b"a" * 10)
+        cache.put_bytes("k2", ".json", b"b" * 60)
+
+        assert cache.read("k1", ".json") == b"a" * 10
+        assert cache._size == 70
+
+    def test_index_rebuilt_from_directory(self, cache):
+        for key in ("k1", "k2", "k3"):
+            cache.put_bytes(key, ".json", b"x" * 30)
+        # k2 was used most recently before the restart, k1 least
+        _touch(cache, "k1", ".json", 1000)
+        _touch(cache, "k3", ".json", 2000)
+        _touch(cache, "k2", ".json", 3000)
+        open(cache.path("k4", ".json") + ".123.tmp", "wb").close()  # interrupted write
+
+        restarted = ResultCache(cache.directory, max_bytes=100)
+        restarted.put_bytes("k5", ".json", b"y" * 30)
+
+        assert restarted.get("k1", ".json") is None
+        assert restarted.get("k3", ".json") is not None
+        assert restarted.get("k2", ".json") is not None
+        assert restarted._size == 90
+
+    def test_entry_deleted_behind_our_back(self, cache):
+        cache.put_bytes("k1", ".json", b"a" * 40)
+        os.remove(cache.path("k1", ".json"))
+
+        assert cache.get("k1", ".json") is None
+        assert cache._size == 0
+
+    def test_disabled(self, tmp_path):
+        cache = ResultCache(str(tmp_path / "off"), max_bytes=0)
+        src = tmp_path / "out.mp4"
+        src.write_bytes(b"x")
+
+        cache.put_bytes("k1", ".json", b"{}")
+
+        assert not cache.enabled
+        assert cache.put_file("k2", ".mp4", str(src)) == str(src)
+        assert cache.get("k1", ".json") is None
+        assert not os.path.exists(cache.directory)
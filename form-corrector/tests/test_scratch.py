@@ -0,0 +1,99 @@
+"""Tests for upload spooling and the scratch janitor."""
+
+import io
+import os
+import tempfile
+import time
+
+import pytest
+
+import scratch
+from scratch import Janitor, upload_as_path
+
+SPOOL = 100
+
+
+@pytest.fixture(autouse=True)
+def scratch_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "scratch"
+    monkeypatch.setattr(scratch, "SCRATCH_DIR", str(directory))
+    monkeypatch.setattr(scratch, "UPLOAD_SPOOL_MAX_BYTES", SPOOL)
+    return directory
+
+
+def _upload(data):
+    upload = tempfile.SpooledTemporaryFile(max_size=SPOOL)
+    upload.write(data)
+    upload.seek(0)
+    return upload
+
+
+def _age(path, seconds):
+    mtime = time.time() - seconds
+    os.utime(path, (mtime, mtime))
+
+
+class TestUploadAsPath:
+    """Test how uploads are handed to OpenCV."""
+
+    def test_in_memory_upload_copied_to_scratch(self, scratch_dir):
+        upload = _upload(b"x" * SPOOL)
+
+        with upload_as_path(upload) as path:
+            assert os.path.dirname(path) == str(scratch_dir)
+            assert open(path, "rb").read() == b"x" * SPOOL
+
+        assert not os.path.exists(path)
+        assert os.listdir(scratch_dir) == []
+
+    @pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc")
+    def test_rolled_upload_read_in_place(self, scratch_dir):
+        upload = _upload(b"y" * (SPOOL + 1))
+
+        with upload_as_path(upload) as path:
+            assert path == f"/proc/self/fd/{upload.fileno()}"
+            assert open(path, "rb").read() == b"y" * (SPOOL + 1)
+
+        assert not scratch_dir.exists()
+
+    def test_plain_file_object(self, scratch_dir):
+        with upload_as_path(io.BytesIO(b"z" * (SPOOL + 1))) as path:
+            assert open(path, "rb").read() == b"z" * (SPOOL + 1)
+
+        assert os.listdir(scratch_dir) == []
+
+
+class TestJanitor:
+    """Test scratch sweeping."""
+
+    def test_sweep_expires_old_files(self, tmp_path):
+        old, new = tmp_path / "old.mp4", tmp_path / "new.mp4"
+        old.write_bytes(b"o")
+        new.write_bytes(b"n")
+        _age(old, 120)
+
+        removed = Janitor(str(tmp_path), max_age=60).sweep()
+
+        assert removed == 1
+        assert not old.exists() and new.exists()
+
+    def test_sweep_spares_files_in_use(self, tmp_path):
+        kept, stale = tmp_path / "job_in.mp4", tmp_path / "stale.mp4"
+        for path in (kept, stale):
+            path.write_bytes(b"x")
+            _age(path, 120)
+
+        removed = Janitor(str(tmp_path), max_age=60, in_use=lambda: [str(kept)]).sweep()
+
+        assert removed == 1
+        assert kept.exists() and not stale.exists()
+
+    def test_sweep_skips_directories(self, tmp_path):
+        (tmp_path / "sub").mkdir()
+        _age(tmp_path / "sub", 120)
+
+        assert Janitor(str(tmp_path), max_age=60).sweep() == 0
+        assert (tmp_path / "sub").exists()
+
+    def test_missing_directory(self, tmp_path):
+        assert Janitor(str(tmp_path / "nope")).sweep() == 0
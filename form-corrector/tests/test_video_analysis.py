@@ -0,0 +1,126 @@
+"""Tests for the serial and pipelined whole-video analysis (need OpenCV and MediaPipe)."""
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("mediapipe")
+
+import video_analysis  # noqa: E402
+from video_analysis import (  # noqa: E402
+    AnalysisOptions,
+    analyze_video_file,
+    analyze_video_pipelined,
+    analyze_video_safe,
+    shutdown_pipeline,
+)
+
+FRAMES = 24
+
+
+def _frame_count(path):
+    cap = cv2.VideoCapture(path)
+    count = 0
+    while cap.read()[0]:
+        count += 1
+    cap.release()
+    return count
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("video") / "clip.mp4")
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 24.0, (320, 240))
+    for i in range(FRAMES):
+        frame = np.full((240, 320, 3), 40, dtype=np.uint8)
+        cv2.rectangle(frame, (10 + 8 * i, 60), (60 + 8 * i, 180), (200, 180, 160), -1)
+        out.write(frame)
+    out.release()
+    return path
+
+
+@pytest.fixture(autouse=True)
+def pipeline():
+    yield
+    shutdown_pipeline()
+
+
+class TestAnalysisOptions:
+    """Test sampling options."""
+
+    def test_stride(self):
+        assert AnalysisOptions(frame_step=3).stride(30.0) == 3
+        assert AnalysisOptions(frame_step=3, target_fps=10.0).stride(30.0) == 3
+        assert AnalysisOptions(target_fps=60.0).stride(30.0) == 1
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            AnalysisOptions(frame_step=0)
+
+    def test_interpolation_bounded_by_buffer(self, monkeypatch):
+        monkeypatch.setattr(video_analysis, "INTERPOLATION_BUFFER_BYTES", 10 * 320 * 240 * 3)
+        options = AnalysisOptions()
+
+        assert options.interpolates(4, 320, 240)
+        assert not options.interpolates(12, 320, 240)
+        assert not options.interpolates(1, 320, 240)
+        assert not AnalysisOptions(interpolate=False).interpolates(4, 320, 240)
+
+
+class TestPipelined:
+    """Test the staged pipeline against the serial loop."""
+
+    @pytest.mark.parametrize("options", [AnalysisOptions(), AnalysisOptions(frame_step=3, max_side=160)])
+    def test_writes_every_frame(self, clip, tmp_path, options):
+        serial, pipelined = str(tmp_path / "serial.mp4"), str(tmp_path / "pipelined.mp4")
+        progress, timings = [], {}
+
+        assert analyze_video_safe(clip, "squat", serial, options=options)
+        assert analyze_video_pipelined(clip, "squat", pipelined, lambda *p: progress.append(p), options, timings)
+
+        assert _frame_count(pipelined) == _frame_count(serial) == FRAMES
+        assert progress[-1] == (FRAMES, FRAMES)
+        assert set(timings) == {"decode", "infer", "annotate", "encode", "total", "slowest"}
+
+    def test_reuses_inference_process(self, clip, tmp_path):
+        analyze_video_pipelined(clip, "squat", str(tmp_path / "a.mp4"))
+        (worker,) = video_analysis._idle_inference
+        pid = worker.process.pid
+
+        analyze_video_pipelined(clip, "squat", str(tmp_path / "b.mp4"))
+
+        assert [w.process.pid for w in video_analysis._idle_inference] == [pid]
+
+    def test_dead_inference_process_is_replaced(self, clip, tmp_path):
+        analyze_video_pipelined(clip, "squat", str(tmp_path / "a.mp4"))
+        (worker,) = video_analysis._idle_inference
+        worker.process.kill()
+        worker.process.join()
+
+        assert analyze_video_pipelined(clip, "squat", str(tmp_path / "b.mp4"))
+        assert video_analysis._idle_inference[0] is not worker
+
+    def test_unknown_exercise(self, clip, tmp_path):
+        assert not analyze_video_pipelined(clip, "lunge", str(tmp_path / "out.mp4"))
+
+
+class TestAnalyzeVideoFile:
+    """Test the entry point's fallbacks."""
+
+    def test_pipeline_failure_falls_back_to_serial(self, clip, tmp_path, monkeypatch):
+        def broken(*args):
+            raise RuntimeError("inference process exited")
+
+        monkeypatch.setattr(video_analysis, "analyze_video_pipelined", broken)
+        output = str(tmp_path / "out.mp4")
+        timings = {}
+
+        assert analyze_video_file(clip, "squat", output, timings=timings, pipelined=True)
+        assert _frame_count(output) == FRAMES
+        assert "total" in timings
+
+    def test_serial(self, clip, tmp_path):
+        output = str(tmp_path / "out.mp4")
+
+        assert analyze_video_file(clip, "squat", output, pipelined=False)
+        assert _frame_count(output) == FRAMES
@@ -0,0 +1,635 @@
+"""Whole-video pose analysis with drawn overlays."""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+import cv2
+import mediapipe as mp
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+from exercise_analyzer import analyze_video as run_analyze_video, EXERCISE_CHECKS
+
+PROGRESS_EVERY = 10
+
+# Run decode, inference, drawing and encoding as concurrent stages (off = one serial loop);
+# measure with benchmarks/bench_video.py before turning it on
+VIDEO_PIPELINE = os.getenv("VIDEO_PIPELINE", "0") not in ("0", "false", "no")
+# Frames buffered between two pipeline stages
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+# Most inference processes at once; each is kept warm for the next pipelined video
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "1"))
+# Most memory the full-size frames held back for interpolation may take per video
+INTERPOLATION_BUFFER_BYTES = int(os.getenv("INTERPOLATION_BUFFER_BYTES", str(64 * 1024 * 1024)))
+
+
+@dataclass(frozen=True)
+class AnalysisOptions:
+    """How much of a video to run pose inference on.
+
+    Inference runs on every `frame_step`-th frame, or on as many frames as
+    needed to reach `target_fps` when that is set (it takes precedence).
+    Frames wider or taller than `max_side` pixels are downscaled before
+    inference; landmarks are normalised, so the overlay is still drawn on the
+    full-size frame. Frames between two sampled ones get linearly
+    interpolated landmarks if `interpolate` is set, otherwise they repeat the
+    last sampled pose. Interpolating holds the frames between two samples in
+    memory, so it is skipped (the last pose is repeated) when they would not
+    fit in INTERPOLATION_BUFFER_BYTES. The defaults analyse every frame at
+    full resolution.
+    """
+
+    frame_step: int = 1
+    target_fps: float = 0.0
+    max_side: int = 0
+    interpolate: bool = True
+
+    def __post_init__(self):
+        if self.frame_step < 1:
+            raise ValueError("frame_step must be >= 1")
+        if self.target_fps < 0:
+            raise ValueError("target_fps must be >= 0")
+        if self.max_side < 0:
+            raise ValueError("max_side must be >= 0")
+
+    def stride(self, fps: float) -> int:
+        """Frames per inference for a video playing at `fps`."""
+        if self.target_fps:
+            return max(1, round(fps / self.target_fps))
+        return self.frame_step
+
+    def interpolates(self, stride: int, width: int, height: int) -> bool:
+        """Whether to interpolate at `stride` for frames of `width` x `height`."""
+        if not self.interpolate or stride == 1:
+            return False
+        held = (stride - 1) * width * height * 3
+        if held > INTERPOLATION_BUFFER_BYTES:
+            print(f"Not interpolating: {stride - 1} frames between samples need {held / 1e6:.0f} MB")
+            return False
+        return True
+
+
+class _Landmark(NamedTuple):
+    x: float
+    y: float
+    z: float
+    visibility: float
+
+
+def _landmark_array(pose_landmarks):
+    """(33, 4) array of x, y, z, visibility, or None if no pose was found."""
+    if pose_landmarks is None:
+        return None
+    return np.array(
+        [(p.x, p.y, p.z, p.visibility) for p in pose_landmarks.landmark], dtype=np.float32
+    )
+
+
+def _video_fps(cap) -> float:
+    try:
+        fps = float(cap.get(cv2.CAP_PROP_FPS))
+        if fps <= 1 or fps != fps:  # <=1 or NaN
+            fps = 24.0
+    except Exception:
+        fps = 24.0
+    return fps
+
+
+def _inference_size(width: int, height: int, max_side: int):
+    """(width, height) of the inference input for a frame of `width` x `height`."""
+    if max_side and max(width, height) > max_side:
+        scale = max_side / max(width, height)
+        return max(1, round(width * scale)), max(1, round(height * scale))
+    return width, height
+
+
+def _inference_input(frame, max_side: int, out=None):
+    """RGB copy of a BGR frame, downscaled so neither side exceeds `max_side`.
+
+    With `out`, the image is written into that (height, width, 3) array
+    instead, and resized to fit it.
+    """
+    h, w = frame.shape[:2]
+    size = _inference_size(w, h, max_side) if out is None else (out.shape[1], out.shape[0])
+    if size != (w, h):
+        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    if out is not None:
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=out)
+    image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    image.flags.writeable = False
+    return image
+
+
+def _infer(pose, frame, max_side: int):
+    return _landmark_array(pose.process(_inference_input(frame, max_side)).pose_landmarks)
+
+
+def _blend(before, after, t: float):
+    if before is None or after is None:
+        return before if t < 0.5 else after
+    return before + (after - before) * t
+
+
+def _annotate(image, lms, check_func, width: int, height: int):
+    """Draw feedback, angle and skeleton for landmark array `lms` onto `image` in place."""
+    if lms is None:
+        return image
+    try:
+        feedback, point, angle, color = check_func([_Landmark(*row) for row in lms.tolist()])
+        px, py = tuple(np.multiply(point, [width, height]).astype(int))
+        cv2.rectangle(image, (30, 20), (min(width - 30, 560), 70), (0, 0, 0), -1)
+        cv2.putText(image, feedback, (40, 55), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+        cv2.rectangle(image, (px - 30, py - 30), (px + 30, py + 30), (0, 0, 0), -1)
+        cv2.putText(image, str(int(angle)), (px - 20, py + 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    except Exception:
+        pass
+    landmark_list = landmark_pb2.NormalizedLandmarkList(
+        landmark=[
+            landmark_pb2.NormalizedLandmark(x=x, y=y, z=z, visibility=v)
+            for x, y, z, v in lms.tolist()
+        ]
+    )
+    mp.solutions.drawing_utils.draw_landmarks(image, landmark_list, mp.solutions.pose.POSE_CONNECTIONS)
+    return image
+
+
+def analyze_video_safe(
+    input_video: str,
+    exercise: str,
+    output_video: str,
+    progress=None,
+    options: AnalysisOptions = AnalysisOptions(),
+) -> bool:
+    """Annotate `input_video` with pose overlays and feedback into `output_video`.
+
+    Every frame is written, but pose inference only runs on the frames picked
+    by `options`. `progress(frames_done, frames_total)` is called every
+    PROGRESS_EVERY frames (frames_total is 0 when the container does not
+    report a frame count).
+    """
+    if exercise not in EXERCISE_CHECKS:
+        return False
+    check_func = EXERCISE_CHECKS[exercise]
+
+    cap = cv2.VideoCapture(input_video)
+    if not cap.isOpened():
+        return False
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 640)
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 360)
+    fps = _video_fps(cap)
+    frames_total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    frames_done = 0
+    stride = options.stride(fps)
+    interpolate = options.interpolates(stride, width, height)
+
+    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+    out = cv2.VideoWriter(output_video, fourcc, fps, (width, height))
+
+    def write(frame, lms):
+        nonlocal frames_done
+        out.write(_annotate(frame, lms, check_func, width, height))
+        frames_done += 1
+        if progress is not None and frames_done % PROGRESS_EVERY == 0:
+            progress(frames_done, frames_total)
+
+    last_index, last_lms = 0, None
+    waiting = []  # (index, frame) between two sampled frames, when interpolating
+    mp_pose = mp.solutions.pose
+    with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose:
+        index = 0
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if index % stride == 0:
+                lms = _infer(pose, frame, options.max_side)
+                for waiting_index, waiting_frame in waiting:
+                    t = (waiting_index - last_index) / (index - last_index)
+                    write(waiting_frame, _blend(last_lms, lms, t))
+                waiting.clear()
+                write(frame, lms)
+                last_index, last_lms = index, lms
+            elif interpolate:
+                waiting.append((index, frame))
+            else:
+                write(frame, last_lms)
+            index += 1
+        # Trailing frames after the last sampled one have nothing to blend towards
+        for _, waiting_frame in waiting:
+            write(waiting_frame, last_lms)
+
+    cap.release()
+    out.release()
+    if progress is not None:
+        progress(frames_done, max(frames_total, frames_done))
+    return frames_done > 0 and os.path.exists(output_video)
+
+
+def _put(q, item, stop: threading.Event) -> bool:
+    """Put into a bounded queue, giving up once `stop` is set."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _acquire(semaphore: threading.Semaphore, stop: threading.Event) -> bool:
+    """Acquire `semaphore`, giving up once `stop` is set."""
+    while not stop.is_set():
+        if semaphore.acquire(timeout=0.1):
+            return True
+    return False
+
+
+def _inference_worker(inbox, outbox):
+    """Inference process: one warm Pose, reused for every video it is handed.
+
+    Messages are ``("video", shm_name, shape)`` to start a video whose
+    frames sit in a ring of shared memory slots, ``("frame", slot)`` for each
+    frame to analyse (answered with ``(landmarks, seconds)``), ``("end",)``
+    when the video is done (answered with None once the shared memory is
+    released) and None to exit.
+    """
+    shm = frames = None
+    with mp.solutions.pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose:
+        while True:
+            message = inbox.get()
+            if message is None:
+                break
+            if message[0] == "frame":
+                started = time.perf_counter()
+                try:
+                    lms = _landmark_array(pose.process(frames[message[1]]).pose_landmarks)
+                except Exception:
+                    lms = None
+                outbox.put((lms, time.perf_counter() - started))
+            elif message[0] == "video":
+                _, name, shape = message
+                shm = shared_memory.SharedMemory(name=name)
+                frames = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+                # Tracking must not carry over from the previous video
+                pose.reset()
+            else:
+                frames = None
+                if shm is not None:
+                    shm.close()
+                    shm = None
+                outbox.put(None)
+
+
+class _InferenceProcess:
+    """Handle on an `_inference_worker` process and its queues."""
+
+    def __init__(self):
+        context = multiprocessing.get_context("spawn")
+        self.inbox = context.Queue()
+        self.outbox = context.Queue()
+        self.process = context.Process(
+            target=_inference_worker, args=(self.inbox, self.outbox), name="video-infer", daemon=True
+        )
+        self.process.start()
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def close(self, wait: bool = True):
+        """Stop the process; without `wait` it is terminated straight away."""
+        if wait and self.process.is_alive():
+            self.inbox.put(None)
+            self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        for q in (self.inbox, self.outbox):
+            q.cancel_join_thread()
+            q.close()
+
+
+class _FrameRing:
+    """`slots` RGB frames of `height` x `width` in shared memory, read by the inference process."""
+
+    def __init__(self, slots: int, height: int, width: int):
+        self.shape = (slots, height, width, 3)
+        self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self.shape)))
+        self.frames = np.ndarray(self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    def release(self):
+        # The array view must go before the mapping can be closed
+        self.frames = None
+        self.shm.unlink()
+        self.shm.close()
+
+
+_idle_inference = []
+_inference_lock = threading.Lock()
+# Held by each video using an inference process, so at most PIPELINE_WORKERS exist
+_inference_slots = threading.BoundedSemaphore(PIPELINE_WORKERS)
+
+
+def _checkout_inference() -> _InferenceProcess:
+    """An idle inference process, or a new one; blocks while PIPELINE_WORKERS are busy."""
+    _inference_slots.acquire()
+    try:
+        with _inference_lock:
+            while _idle_inference:
+                worker = _idle_inference.pop()
+                if worker.is_alive():
+                    return worker
+        return _InferenceProcess()
+    except BaseException:
+        _inference_slots.release()
+        raise
+
+
+def _checkin_inference(worker: _InferenceProcess, reusable: bool = True):
+    """Give back `worker`: kept warm for the next video if `reusable`, otherwise stopped."""
+    try:
+        if reusable and worker.is_alive():
+            with _inference_lock:
+                _idle_inference.append(worker)
+        else:
+            # Results of its last video may still be in flight; don't hand them to the next one
+            worker.close(wait=False)
+    finally:
+        _inference_slots.release()
+
+
+def shutdown_pipeline():
+    """Stop the idle inference processes."""
+    with _inference_lock:
+        workers = list(_idle_inference)
+        _idle_inference.clear()
+    for worker in workers:
+        worker.close()
+
+
+def analyze_video_pipelined(
+    input_video: str,
+    exercise: str,
+    output_video: str,
+    progress=None,
+    options: AnalysisOptions = AnalysisOptions(),
+    timings=None,
+) -> bool:
+    """Same output as `analyze_video_safe`, with the work split into concurrent stages.
+
+    A decoder thread reads frames and prepares the sampled ones for inference,
+    a long-lived inference process runs the Pose, the calling thread draws
+    the overlays and an encoder thread writes the output. Inference inputs
+    travel through a ring of PIPELINE_QUEUE_SIZE shared memory slots rather
+    than being pickled, and the other stages are linked by queues of the same
+    size, so a slow stage holds the others back instead of buffering the
+    whole video. If `timings` is a dict, it receives the seconds each stage
+    spent working (``decode``, ``infer``, ``annotate``, ``encode``), the
+    wall-clock ``total`` and the ``slowest`` stage.
+    """
+    if exercise not in EXERCISE_CHECKS:
+        return False
+    check_func = EXERCISE_CHECKS[exercise]
+
+    cap = cv2.VideoCapture(input_video)
+    if not cap.isOpened():
+        return False
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 640)
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 360)
+    fps = _video_fps(cap)
+    frames_total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    stride = options.stride(fps)
+    interpolate = options.interpolates(stride, width, height)
+    out = cv2.VideoWriter(output_video, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+
+    stage_seconds = {"decode": 0.0, "infer": 0.0, "annotate": 0.0, "encode": 0.0}
+    frames_done = 0
+    started = time.perf_counter()
+    stop = threading.Event()
+    decoded = queue.Queue(PIPELINE_QUEUE_SIZE)  # (index, frame, sampled), None at the end
+    annotated = queue.Queue(PIPELINE_QUEUE_SIZE)  # frames ready to write, None at the end
+    in_width, in_height = _inference_size(width, height, options.max_side)
+    ring = _FrameRing(PIPELINE_QUEUE_SIZE, in_height, in_width)
+    free_slots = threading.Semaphore(PIPELINE_QUEUE_SIZE)
+    worker = _checkout_inference()
+    worker.inbox.put(("video", ring.shm.name, ring.shape))
+
+    def decode():
+        index = sent = 0
+        try:
+            while True:
+                t = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                sampled = index % stride == 0
+                stage_seconds["decode"] += time.perf_counter() - t
+                if sampled:
+                    if not _acquire(free_slots, stop):
+                        return
+                    t = time.perf_counter()
+                    slot = sent % PIPELINE_QUEUE_SIZE
+                    _inference_input(frame, options.max_side, out=ring.frames[slot])
+                    stage_seconds["decode"] += time.perf_counter() - t
+                    worker.inbox.put(("frame", slot))
+                    sent += 1
+                if not _put(decoded, (index, frame, sampled), stop):
+                    return
+                index += 1
+        except Exception as e:
+            print(f"Video decode stopped early: {e}")
+        _put(decoded, None, stop)
+
+    def encode():
+        nonlocal frames_done
+        while not stop.is_set():
+            try:
+                image = annotated.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if image is None:
+                break
+            t = time.perf_counter()
+            out.write(image)
+            stage_seconds["encode"] += time.perf_counter() - t
+            frames_done += 1
+            if progress is not None and frames_done % PROGRESS_EVERY == 0:
+                progress(frames_done, frames_total)
+
+    def next_result():
+        while True:
+            try:
+                return worker.outbox.get(timeout=1)
+            except queue.Empty:
+                if not worker.is_alive():
+                    raise RuntimeError("inference process exited")
+
+    def next_landmarks():
+        lms, seconds = next_result()
+        free_slots.release()
+        stage_seconds["infer"] += seconds
+        return lms
+
+    def emit(frame, lms):
+        t = time.perf_counter()
+        image = _annotate(frame, lms, check_func, width, height)
+        stage_seconds["annotate"] += time.perf_counter() - t
+        _put(annotated, image, stop)
+
+    decoder = threading.Thread(target=decode, name="video-decode", daemon=True)
+    encoder = threading.Thread(target=encode, name="video-encode", daemon=True)
+    decoder.start()
+    encoder.start()
+    finished = False
+    reusable = False
+    try:
+        last_index, last_lms = 0, None
+        waiting = []  # (index, frame) between two sampled frames, when interpolating
+        while True:
+            item = decoded.get()
+            if item is None:
+                break
+            index, frame, sampled = item
+            if sampled:
+                lms = next_landmarks()
+                for waiting_index, waiting_frame in waiting:
+                    emit(waiting_frame, _blend(last_lms, lms, (waiting_index - last_index) / (index - last_index)))
+                waiting.clear()
+                emit(frame, lms)
+                last_index, last_lms = index, lms
+            elif interpolate:
+                waiting.append((index, frame))
+            else:
+                emit(frame, last_lms)
+        for _, waiting_frame in waiting:
+            emit(waiting_frame, last_lms)
+        finished = _put(annotated, None, stop)
+        if finished:
+            encoder.join()
+            # Every frame sent has been answered; wait for the worker to let go of the slots
+            worker.inbox.put(("end",))
+            reusable = next_result() is None
+    finally:
+        stop.set()
+        decoder.join()
+        encoder.join()
+        _checkin_inference(worker, reusable)
+        ring.release()
+        cap.release()
+        out.release()
+
+    total = time.perf_counter() - started
+    slowest = max(stage_seconds, key=stage_seconds.get)
+    print(f"Video pipeline: {frames_done} frames in {total:.2f}s, slowest stage {slowest} ({stage_seconds[slowest]:.2f}s)")
+    if timings is not None:
+        timings.update({stage: round(seconds, 3) for stage, seconds in stage_seconds.items()})
+        timings.update(total=round(total, 3), slowest=slowest)
+    if progress is not None:
+        progress(frames_done, max(frames_total, frames_done))
+    return frames_done > 0 and os.path.exists(output_video)
+
+
+def analyze_video_series(
+    input_video: str,
+    exercise: str,
+    options: AnalysisOptions = AnalysisOptions(),
+):
+    """Pose time series for `input_video` without drawing or encoding anything.
+
+    Only the frames picked by `options` are decoded and analysed; the others
+    are skipped with ``grab()``. Returns None if the video cannot be opened,
+    otherwise a dict with the sampled frame indices and, per sampled frame,
+    the angle (None without a pose), a feedback code (an index into
+    ``feedback_codes``, -1 without a pose) and a (frames, 33, 3) float32
+    array of x, y, visibility (NaN without a pose).
+    """
+    check_func = EXERCISE_CHECKS[exercise]
+    cap = cv2.VideoCapture(input_video)
+    if not cap.isOpened():
+        return None
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+    fps = _video_fps(cap)
+    stride = options.stride(fps)
+
+    frame_indices, angles, feedback, landmarks = [], [], [], []
+    feedback_codes = {}
+    missing = np.full((33, 3), np.nan, dtype=np.float32)
+    index = 0
+    with mp.solutions.pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose:
+        while True:
+            if index % stride:
+                if not cap.grab():
+                    break
+                index += 1
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            lms = _infer(pose, frame, options.max_side)
+            frame_indices.append(index)
+            if lms is None:
+                angles.append(None)
+                feedback.append(-1)
+                landmarks.append(missing)
+            else:
+                try:
+                    text, _, angle, _ = check_func([_Landmark(*row) for row in lms.tolist()])
+                    angles.append(round(float(angle), 2))
+                except Exception:
+                    text = ""
+                    angles.append(None)
+                feedback.append(feedback_codes.setdefault(text, len(feedback_codes)))
+                landmarks.append(lms[:, [0, 1, 3]])
+            index += 1
+    cap.release()
+
+    return {
+        "exercise": exercise,
+        "fps": fps,
+        "width": width,
+        "height": height,
+        "frame_count": index,
+        "frame": frame_indices,
+        "angle": angles,
+        "feedback": feedback,
+        "feedback_codes": list(feedback_codes),
+        "landmarks": np.stack(landmarks) if landmarks else np.empty((0, 33, 3), dtype=np.float32),
+    }
+
+
+def analyze_video_file(
+    input_video: str,
+    exercise: str,
+    output_video: str,
+    progress=None,
+    options: AnalysisOptions = AnalysisOptions(),
+    timings=None,
+    pipelined: bool = VIDEO_PIPELINE,
+) -> bool:
+    """Analyse a video, falling back to the original analyzer; True if a usable output was written.
+
+    Uses the staged pipeline if `pipelined` (VIDEO_PIPELINE by default), in
+    which case `timings` is filled with its per-stage timing (see
+    `analyze_video_pipelined`); otherwise it only gets the wall-clock ``total``.
+    """
+    ok = False
+    if pipelined:
+        try:
+            ok = analyze_video_pipelined(input_video, exercise, output_video, progress, options, timings)
+        except Exception as e:
+            print(f"Video pipeline failed, analysing serially: {e}")
+    if not ok:
+        started = time.perf_counter()
+        ok = analyze_video_safe(input_video, exercise, output_video, progress, options)
+        if timings is not None:
+            timings["total"] = round(time.perf_counter() - started, 3)
+    if not ok:
+        # Fallback to original implementation if something went wrong
+        run_analyze_video(input_video, exercise=exercise, output_video=output_video)
+    # Validate output exists and non-empty
+    return os.path.exists(output_video) and os.path.getsize(output_video) >= 1024
@@ -0,0 +1,159 @@
+"""In-process LRU cache of user profiles and recent history windows."""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Fields the worker itself writes: updates touching only these are its own write-through
+OWN_FIELD_PREFIXES = ("pref_", "applied_feedback")
+
+
+class UserCache:
+    """LRU cache of `UserProfile` objects and their recent history windows.
+
+    The cached profile is the object the processor mutates, so preference
+    updates are written through simply by applying them in memory before the
+    atomic Mongo write. Entries can be invalidated from another thread (the
+    change-stream watcher); a generation counter stops a read that raced with
+    an invalidation of the same user from re-inserting stale data. With a `ttl`, entries older
+    than that many seconds are treated as misses (the polling stand-in used
+    when change streams are unavailable).
+    """
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any, Dict[str, List[Dict[str, Any]]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._cleared_at = 0
+        self._invalidated_at: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def generation(self) -> int:
+        """Snapshot to pass to `put` for data read after this point."""
+        return self._generation
+
+    def get(self, user_id: str) -> Optional[Tuple[Any, Dict[str, List[Dict[str, Any]]]]]:
+        """Return (user, history) for a cached user, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[user_id]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, user_id: str, user: Any, history: Dict[str, List[Dict[str, Any]]], generation: int):
+        """Cache a user read at `generation`; dropped if an invalidation happened since."""
+        with self._lock:
+            if generation < self._cleared_at or generation < self._invalidated_at.get(user_id, 0):
+                return
+            self._entries[user_id] = (time.monotonic(), user, history)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_ids):
+        """Drop the given users."""
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+                self._invalidated_at[user_id] = self._generation
+            if len(self._invalidated_at) > self.max_size:
+                # Bound the bookkeeping: fall back to a cache-wide barrier
+                self._cleared_at = self._generation
+                self._invalidated_at.clear()
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._generation += 1
+            self._cleared_at = self._generation
+            self._invalidated_at.clear()
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class ChangeStreamInvalidator:
+    """Invalidates a `UserCache` from MongoDB change streams on a background thread.
+
+    Updates that only touch ``pref_*`` fields and ``applied_feedback`` are the
+    worker's own write-through and are ignored. Events without a user_id (deletes, or updates whose
+    document is gone) clear the whole cache since the affected user is unknown.
+    If the stream dies, the cache falls back to expiring entries after
+    `fallback_ttl` seconds.
+    """
+
+    def __init__(self, cache: UserCache, db, collection_names: List[str], fallback_ttl: float):
+        self.cache = cache
+        self.db = db
+        self.collection_names = collection_names
+        self.fallback_ttl = fallback_ttl
+        self._stream = None
+        self._thread: Optional[threading.Thread] = None
+
+    def supported(self) -> bool:
+        """Change streams need a replica set or sharded cluster."""
+        try:
+            hello = self.db.client.admin.command('hello')
+            return bool(hello.get('setName') or hello.get('msg') == 'isdbgrid')
+        except Exception as e:
+            logger.warning(f"⚠️ Could not check change stream support: {e}")
+            return False
+
+    def start(self):
+        pipeline = [{"$match": {"ns.coll": {"$in": self.collection_names}}}]
+        self._stream = self.db.watch(pipeline, full_document='updateLookup')
+        self._thread = threading.Thread(target=self._run, name="cache-invalidator", daemon=True)
+        self._thread.start()
+        logger.info(f"👀 Watching {', '.join(self.collection_names)} for cache invalidation")
+
+    def _run(self):
+        try:
+            for change in self._stream:
+                self._handle(change)
+        except Exception as e:
+            if self._stream is not None:
+                logger.error(f"❌ Cache invalidation stream failed, falling back to {self.fallback_ttl}s TTL: {e}")
+                self.cache.ttl = self.fallback_ttl
+        finally:
+            # Changes may have been missed: start over from MongoDB
+            self.cache.clear()
+
+    def _handle(self, change: Dict[str, Any]):
+        operation = change.get('operationType')
+        collection = change.get('ns', {}).get('coll')
+
+        if operation == 'update' and collection == 'users':
+            description = change.get('updateDescription', {})
+            fields = list(description.get('updatedFields', {})) + list(description.get('removedFields', []))
+            if fields and all(field.startswith(OWN_FIELD_PREFIXES) for field in fields):
+                return
+
+        user_id = (change.get('fullDocument') or {}).get('user_id')
+        if user_id is not None:
+            self.cache.invalidate([user_id])
+        else:
+            self.cache.clear()
+
+    def stop(self):
+        if self._stream is not None:
+            stream, self._stream = self._stream, None
+            stream.close()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
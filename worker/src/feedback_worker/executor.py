@@ -0,0 +1,55 @@
+"""Keyed concurrent executor for per-user ordered processing."""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Set
+
+logger = logging.getLogger(__name__)
+
+
+class KeyedExecutor:
+    """Runs coroutines concurrently across keys while preserving order within a key.
+
+    Work submitted under the same key (the Kafka message key, i.e. the user_id)
+    runs strictly in submission order; work under different keys runs in parallel,
+    with at most `concurrency` coroutines active at once.
+    """
+
+    def __init__(self, concurrency: int):
+        self.concurrency = max(1, concurrency)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._tails: Dict[str, asyncio.Task] = {}
+        self._pending: Set[asyncio.Task] = set()
+
+    def submit(self, key: str, work: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Schedule `work()` to run after all previously submitted work for `key`."""
+        previous = self._tails.get(key)
+        task = asyncio.create_task(self._run(previous, work))
+        self._tails[key] = task
+        self._pending.add(task)
+        task.add_done_callback(lambda t: self._on_done(key, t))
+        return task
+
+    async def _run(self, previous: asyncio.Task, work: Callable[[], Awaitable[Any]]) -> Any:
+        if previous is not None:
+            # Wait for the predecessor without inheriting its outcome
+            await asyncio.wait([previous])
+        async with self._semaphore:
+            return await work()
+
+    def _on_done(self, key: str, task: asyncio.Task):
+        self._pending.discard(task)
+        if self._tails.get(key) is task:
+            del self._tails[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"❌ Keyed task for {key} failed: {task.exception()}")
+
+    @property
+    def in_flight(self) -> int:
+        """Number of submitted tasks that have not completed yet."""
+        return len(self._pending)
+
+    async def join(self):
+        """Wait until all submitted work has completed (errors are left on the tasks)."""
+        while self._pending:
+            await asyncio.wait(list(self._pending))
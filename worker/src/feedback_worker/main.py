@@ -1,5 +1,6 @@
 """Main entry point for the feedback worker."""
 
+from .supervisor import WorkerSupervisor, worker_process_count
 from .worker import FeedbackWorker
 import asyncio
 import logging
@@ -14,6 +15,12 @@ logger = logging.getLogger(__name__)
 
 def main():
     """Main entry point for the feedback worker."""
+    processes = worker_process_count()
+    if processes > 1:
+        logger.info(f"🚀 Starting Feedback Worker supervisor with {processes} processes...")
+        WorkerSupervisor(processes).run()
+        return
+
     logger.info("🚀 Starting Feedback Worker...")
     
     worker = FeedbackWorker()
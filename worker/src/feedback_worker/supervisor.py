@@ -0,0 +1,124 @@
+"""Multi-process supervisor running one partition-pinned worker per core."""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional
+
+from kafka import KafkaConsumer
+
+logger = logging.getLogger(__name__)
+
+
+def worker_process_count() -> int:
+    """Number of consumer processes from WORKER_PROCESSES ("auto" = one per core)."""
+    value = os.getenv('WORKER_PROCESSES', '1').strip().lower()
+    if value == 'auto':
+        return os.cpu_count() or 1
+    return max(1, int(value))
+
+
+def run_worker_process(partitions: Optional[List[int]] = None):
+    """Run one FeedbackWorker until SIGTERM/SIGINT (entry point of child processes)."""
+    from .worker import FeedbackWorker
+
+    worker = FeedbackWorker(partitions=partitions)
+
+    async def serve():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, worker.stop)
+        await worker.run()
+
+    asyncio.run(serve())
+
+
+class WorkerSupervisor:
+    """Forks consumer processes in the same consumer group and pins each to a partition subset.
+
+    Every Kafka partition is owned by exactly one child for the supervisor's
+    lifetime, so per-user bandit state (users are keyed to partitions) never
+    needs cross-process coordination. Children that die are restarted on the
+    same partitions.
+    """
+
+    def __init__(self, processes: int):
+        self.processes = processes
+        self.kafka_servers = os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'kafka:9092')
+        self.topic = os.getenv('KAFKA_TOPIC', 'feedback')
+        self.discovery_timeout = float(os.getenv('WORKER_PARTITION_DISCOVERY_TIMEOUT', '30'))
+        self.restart_delay = float(os.getenv('WORKER_RESTART_DELAY', '5'))
+
+        self.children: Dict[int, multiprocessing.Process] = {}
+        self.assignments: List[Optional[List[int]]] = []
+        self.stopping = False
+
+    def _discover_partitions(self) -> Optional[List[int]]:
+        """Return the topic's partition ids, or None if the topic is not available yet."""
+        consumer = KafkaConsumer(bootstrap_servers=[self.kafka_servers])
+        try:
+            deadline = time.monotonic() + self.discovery_timeout
+            while True:
+                partitions = consumer.partitions_for_topic(self.topic)
+                if partitions or time.monotonic() >= deadline:
+                    return sorted(partitions) if partitions else None
+                time.sleep(1.0)
+        finally:
+            consumer.close()
+
+    def _plan_assignments(self) -> List[Optional[List[int]]]:
+        partitions = self._discover_partitions()
+        if not partitions:
+            # Topic not created yet: let the group coordinator balance partitions instead
+            logger.warning(f"⚠️ No partitions found for {self.topic}; children will subscribe and rebalance")
+            return [None] * self.processes
+
+        count = min(self.processes, len(partitions))
+        if count < self.processes:
+            logger.warning(f"⚠️ Only {len(partitions)} partitions for {self.processes} processes; starting {count}")
+        return [partitions[i::count] for i in range(count)]
+
+    def _spawn(self, index: int):
+        partitions = self.assignments[index]
+        process = multiprocessing.Process(
+            target=run_worker_process,
+            args=(partitions,),
+            name=f"feedback-worker-{index}",
+        )
+        process.start()
+        self.children[index] = process
+        logger.info(f"🚀 Started {process.name} (pid {process.pid}) on partitions {partitions if partitions is not None else 'auto'}")
+
+    def _request_stop(self, signum, frame):
+        logger.info(f"🛑 Supervisor received signal {signum}, stopping children")
+        self.stopping = True
+        for process in self.children.values():
+            if process.is_alive():
+                process.terminate()  # SIGTERM → graceful worker shutdown
+
+    def run(self):
+        """Start all children and keep them running until signalled."""
+        self.assignments = self._plan_assignments()
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        for index in range(len(self.assignments)):
+            self._spawn(index)
+
+        while not self.stopping:
+            wait([p.sentinel for p in self.children.values()], timeout=1.0)
+            for index, process in list(self.children.items()):
+                if process.is_alive() or self.stopping:
+                    continue
+                logger.error(f"💀 {process.name} exited with code {process.exitcode}; restarting in {self.restart_delay}s")
+                time.sleep(self.restart_delay)
+                if not self.stopping:
+                    self._spawn(index)
+
+        for process in self.children.values():
+            process.join()
+        logger.info("📝 All feedback worker processes stopped")
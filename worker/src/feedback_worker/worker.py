@@ -1,54 +1,147 @@
 """Kafka consumer and feedback processor."""
 
+import functools
 import json
 import logging
 import os
 import time
-from typing import Dict, Any, Optional
-from kafka import KafkaConsumer
-from kafka.errors import KafkaError
+from collections import OrderedDict, defaultdict
+from typing import Dict, Any, List, Optional, Set
+from kafka import KafkaAdminClient, KafkaConsumer, KafkaProducer, TopicPartition
+from kafka.admin import NewTopic
+from kafka.consumer.subscription_state import ConsumerRebalanceListener
+from kafka.errors import KafkaError, TopicAlreadyExistsError
 import asyncio
 
+from .executor import KeyedExecutor
+
 logger = logging.getLogger(__name__)
 
+# (feedback_id, attempt) pairs remembered as already re-published, so a rewound poll does not send them again
+ROUTED_MEMORY = 10000
+
+
+class _RebalanceListener(ConsumerRebalanceListener):
+    """Bridges kafka-python rebalance callbacks (run inside poll) to the worker's event loop."""
+
+    def __init__(self, worker: "FeedbackWorker", loop: asyncio.AbstractEventLoop):
+        self.worker = worker
+        self.loop = loop
+
+    def on_partitions_revoked(self, revoked):
+        # poll() runs in a worker thread, so the loop is free to run the flush
+        asyncio.run_coroutine_threadsafe(self.worker._on_partitions_revoked(revoked), self.loop).result()
+
+    def on_partitions_assigned(self, assigned):
+        logger.info(f"📥 Partitions assigned: {sorted(tp.partition for tp in assigned)}")
+
 
 class FeedbackWorker:
-    """Async feedback processor that consumes from Kafka and processes feedback."""
+    """Async feedback processor that consumes from Kafka and processes feedback.
+
+    With `partitions` the worker is pinned to that subset of the topic (used by
+    the multi-process supervisor); otherwise it subscribes and lets the consumer
+    group balance partitions, flushing state before partitions are revoked.
+
+    Offsets are committed manually once a poll's messages are durably applied
+    (at-least-once); the processor skips feedback it has already applied, so a
+    redelivered poll is harmless. Failed messages are re-published to a retry
+    topic with a due time and, after `retry_attempts` or straight away for
+    invalid feedback, to a dead-letter topic, so they never stall their partition.
+    """
     
-    def __init__(self):
+    def __init__(self, partitions: Optional[List[int]] = None):
         self.kafka_servers = os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'kafka:9092')
         self.topic = os.getenv('KAFKA_TOPIC', 'feedback')
+        self.retry_topic = os.getenv('KAFKA_RETRY_TOPIC', f'{self.topic}.retry')
+        self.dlq_topic = os.getenv('KAFKA_DLQ_TOPIC', f'{self.topic}.dlq')
         self.group_id = os.getenv('KAFKA_GROUP_ID', 'feedback-worker')
         self.poll_timeout = float(os.getenv('WORKER_POLL_TIMEOUT', '1.0'))
         self.max_poll_records = int(os.getenv('WORKER_MAX_POLL_RECORDS', '10'))
         self.retry_attempts = int(os.getenv('WORKER_RETRY_ATTEMPTS', '3'))
         self.retry_delay = float(os.getenv('WORKER_RETRY_DELAY', '5.0'))
+        self.batch_mode = os.getenv('WORKER_BATCH_MODE', '1') == '1'
+        self.concurrency = int(os.getenv('WORKER_CONCURRENCY', '8'))
+        self.coalesce_window = float(os.getenv('WORKER_COALESCE_WINDOW_MS', '200')) / 1000
+        self.coalesce_max_messages = int(os.getenv('WORKER_COALESCE_MAX_MESSAGES', '500'))
+        self.partitions = partitions
         
         self.consumer = None
+        self.producer = None
         self.processor = None
+        self.executor = None
         self.running = False
+        self._partition_users: Dict[TopicPartition, Set[str]] = defaultdict(set)
+        self._paused_until: Dict[TopicPartition, float] = {}  # retry partitions waiting for a due message
+        self._window: Optional[Dict[TopicPartition, List[Any]]] = None  # records buffered by _fill_window
+        self._routed: "OrderedDict[tuple, None]" = OrderedDict()
         
-        logger.info(f"🔧 Worker configured: {self.kafka_servers}/{self.topic}")
+        logger.info(f"🔧 Worker configured: {self.kafka_servers}/{self.topic} "
+                    f"(batch mode: {self.batch_mode}, concurrency: {self.concurrency})")
     
     def _create_consumer(self) -> KafkaConsumer:
         """Create and configure Kafka consumer."""
         try:
             consumer = KafkaConsumer(
-                self.topic,
                 bootstrap_servers=[self.kafka_servers],
                 group_id=self.group_id,
                 value_deserializer=lambda m: json.loads(m.decode('utf-8')),
                 auto_offset_reset='earliest',
-                enable_auto_commit=True,
+                enable_auto_commit=False,
                 consumer_timeout_ms=int(self.poll_timeout * 1000),
                 max_poll_records=self.max_poll_records
             )
-            logger.info(f"✅ Kafka consumer created for topic: {self.topic}")
+            if self.partitions is not None:
+                # Retry topic mirrors the main topic's partitioning (same key → same index)
+                retry_partitions = consumer.partitions_for_topic(self.retry_topic) or set()
+                assignment = [TopicPartition(self.topic, p) for p in self.partitions]
+                assignment += [TopicPartition(self.retry_topic, p) for p in self.partitions if p in retry_partitions]
+                consumer.assign(assignment)
+                logger.info(f"✅ Kafka consumer pinned to {self.topic} partitions {self.partitions}")
+            else:
+                consumer.subscribe([self.topic, self.retry_topic], listener=_RebalanceListener(self, asyncio.get_running_loop()))
+                logger.info(f"✅ Kafka consumer created for topics: {self.topic}, {self.retry_topic}")
             return consumer
         except Exception as e:
             logger.error(f"❌ Failed to create Kafka consumer: {e}")
             raise
     
+    def _create_producer(self) -> KafkaProducer:
+        """Create the producer used to re-publish failed messages."""
+        try:
+            producer = KafkaProducer(
+                bootstrap_servers=[self.kafka_servers],
+                value_serializer=lambda x: json.dumps(x).encode('utf-8'),
+                acks='all',
+                retries=3,
+            )
+            logger.info(f"✅ Kafka producer created for {self.retry_topic} / {self.dlq_topic}")
+            return producer
+        except Exception as e:
+            logger.error(f"❌ Failed to create Kafka producer: {e}")
+            raise
+
+    def _ensure_topics(self):
+        """Create the retry and dead-letter topics with the main topic's partition count."""
+        admin = None
+        try:
+            admin = KafkaAdminClient(bootstrap_servers=[self.kafka_servers])
+            described = admin.describe_topics([self.topic])
+            partitions = len(described[0]['partitions']) if described and described[0].get('partitions') else 1
+            replication = int(os.getenv('KAFKA_REPLICATION_FACTOR', '1'))
+            for name in (self.retry_topic, self.dlq_topic):
+                try:
+                    admin.create_topics([NewTopic(name=name, num_partitions=partitions, replication_factor=replication)])
+                    logger.info(f"✅ Created topic {name} with {partitions} partitions")
+                except TopicAlreadyExistsError:
+                    pass
+        except Exception as e:
+            # Brokers with auto-create still work; pinned workers then pick up retries after a restart
+            logger.warning(f"⚠️ Could not ensure {self.retry_topic}/{self.dlq_topic}: {e}")
+        finally:
+            if admin:
+                admin.close()
+
     async def run(self):
         """Main worker loop."""
         logger.info("🚀 Starting feedback worker...")
@@ -58,8 +151,11 @@ class FeedbackWorker:
         self.processor = FeedbackProcessor()
         await self.processor.initialize()
         
-        # Create consumer
+        # Create consumer and failure producer
+        await asyncio.to_thread(self._ensure_topics)
+        self.producer = self._create_producer()
         self.consumer = self._create_consumer()
+        self.executor = KeyedExecutor(self.concurrency)
         self.running = True
         
         try:
@@ -75,20 +171,41 @@ class FeedbackWorker:
             await self._cleanup()
     
     async def _poll_and_process(self):
-        """Poll for messages and process them."""
+        """Poll for messages, process them, route failures and commit offsets."""
         try:
-            # Poll for messages (blocking with timeout)
-            message_batch = self.consumer.poll(timeout_ms=int(self.poll_timeout * 1000))
+            self._resume_due_partitions()
+
+            # Poll for messages (blocking with timeout, off the event loop)
+            message_batch = await asyncio.to_thread(self.consumer.poll, timeout_ms=int(self.poll_timeout * 1000))
+            message_batch = self._hold_back_pending_retries(message_batch)
             
             if not message_batch:
                 # No messages, short sleep to prevent busy waiting
                 await asyncio.sleep(0.1)
                 return
+
+            if self.batch_mode and self.coalesce_window > 0:
+                message_batch = await self._fill_window(message_batch)
             
             # Process messages
-            for topic_partition, messages in message_batch.items():
-                for message in messages:
-                    await self._process_message(message.value)
+            records = [message for messages in message_batch.values() for message in messages]
+            if self.partitions is None:
+                # Remember which users each partition carries for rebalance cleanup
+                for topic_partition, messages in message_batch.items():
+                    self._partition_users[topic_partition].update(self._message_key(m) for m in messages)
+
+            try:
+                results = await self._process_records(records)
+                await self._route_failures(records, results)
+            except Exception as e:
+                # Nothing is committed: rewind so the whole poll is redelivered
+                logger.error(f"❌ Batch of {len(records)} messages failed, will be redelivered: {e}")
+                self._rewind(message_batch)
+                await asyncio.sleep(self.retry_delay)
+                return
+
+            await asyncio.to_thread(self.consumer.commit)
+            logger.debug(f"📌 Committed offsets after {len(records)} messages")
                     
         except KafkaError as e:
             logger.error(f"❌ Kafka error: {e}")
@@ -96,30 +213,182 @@ class FeedbackWorker:
         except Exception as e:
             logger.error(f"❌ Processing error: {e}")
             await asyncio.sleep(1.0)
-    
-    async def _process_message(self, message_data: Dict[str, Any]):
-        """Process a single feedback message with retry logic."""
+
+    async def _process_records(self, records) -> List[Dict[str, Any]]:
+        """Process polled records and return one result per record, in order.
+
+        Message-level failures come back as results with an ``error`` key; an
+        exception means the poll as a whole could not be applied.
+        """
+        if self.batch_mode:
+            return await self._process_batch([message.value for message in records])
+
+        # Ordered per user (the Kafka key), parallel across users
+        tasks = [
+            self.executor.submit(self._message_key(message), functools.partial(self._process_message, message.value))
+            for message in records
+        ]
+        await self.executor.join()
+        return [task.result() for task in tasks]
+
+    async def _fill_window(self, message_batch):
+        """Keep polling for up to the coalescing window so bursts land in one batch.
+
+        Stops early once `coalesce_max_messages` records are buffered. Records keep
+        their per-partition order, so per-user ordering is preserved when the batch
+        is coalesced by the processor.
+        """
+        deadline = time.monotonic() + self.coalesce_window
+        self._window = message_batch
+        try:
+            while sum(len(messages) for messages in message_batch.values()) < self.coalesce_max_messages:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                more = await asyncio.to_thread(self.consumer.poll, timeout_ms=max(1, int(remaining * 1000)))
+                for topic_partition, messages in self._hold_back_pending_retries(more).items():
+                    message_batch.setdefault(topic_partition, []).extend(messages)
+        finally:
+            self._window = None
+        return message_batch
+
+    def _hold_back_pending_retries(self, message_batch):
+        """Drop retry messages that are not due yet, pausing their partition until they are."""
+        now = time.time()
+        ready = {}
+        for topic_partition, messages in message_batch.items():
+            if topic_partition.topic == self.retry_topic:
+                for index, message in enumerate(messages):
+                    retry_at = message.value.get('retry_at', 0)
+                    if retry_at > now:
+                        # Rewind to the first pending message and park only this retry partition
+                        self.consumer.seek(topic_partition, message.offset)
+                        self.consumer.pause(topic_partition)
+                        self._paused_until[topic_partition] = retry_at
+                        messages = messages[:index]
+                        break
+            if messages:
+                ready[topic_partition] = messages
+        return ready
+
+    def _resume_due_partitions(self):
+        """Resume retry partitions whose first pending message is now due."""
+        now = time.time()
+        for topic_partition, retry_at in list(self._paused_until.items()):
+            if retry_at <= now:
+                self.consumer.resume(topic_partition)
+                del self._paused_until[topic_partition]
+
+    def _rewind(self, message_batch):
+        """Seek every partition of a failed poll back to its first message."""
+        for topic_partition, messages in message_batch.items():
+            self.consumer.seek(topic_partition, messages[0].offset)
+
+    async def _route_failures(self, records, results: List[Dict[str, Any]]):
+        """Re-publish failed messages to the retry topic, or to the DLQ when attempts run out.
+
+        Non-retriable failures (invalid payload, unknown item or user) go to the
+        DLQ straight away. Raises if any message could not be produced, so the
+        poll is rewound instead of committed; messages that did get through are
+        remembered and not sent again when the poll is redelivered.
+        """
+        sends = []
+        for message, result in zip(records, results):
+            if "error" not in result:
+                continue
+            payload = dict(message.value)
+            payload['attempt'] = payload.get('attempt', 0) + 1
+            payload['last_error'] = result['error']
+            route = (payload['id'], payload['attempt']) if payload.get('id') else None
+            if route is not None and route in self._routed:
+                continue
+            if not result.get('retriable', True):
+                topic = self.dlq_topic
+                logger.error(f"💀 Feedback {result['feedback_id']} dead-lettered, not retriable: {result['error']}")
+            elif payload['attempt'] >= self.retry_attempts:
+                topic = self.dlq_topic
+                logger.error(f"💀 Feedback {result['feedback_id']} dead-lettered after {payload['attempt']} attempts: {result['error']}")
+            else:
+                topic = self.retry_topic
+                payload['retry_at'] = time.time() + self.retry_delay * payload['attempt']
+                logger.warning(f"🔁 Feedback {result['feedback_id']} scheduled for retry {payload['attempt']}: {result['error']}")
+            sends.append((route, self.producer.send(topic, value=payload, key=message.key)))
+
+        if not sends:
+            return
+        # Retries must be durable before the originals' offsets are committed
+        await asyncio.to_thread(self.producer.flush)
+        failed = 0
+        for route, future in sends:
+            if not future.succeeded():
+                failed += 1
+            elif route is not None:
+                self._routed[route] = None
+        while len(self._routed) > ROUTED_MEMORY:
+            self._routed.popitem(last=False)
+        if failed:
+            raise KafkaError(f"{failed} of {len(sends)} failed messages could not be re-published")
+
+    @staticmethod
+    def _message_key(message) -> str:
+        """Ordering key of a record: the Kafka key (user_id), falling back to the payload."""
+        if message.key:
+            return message.key.decode('utf-8')
+        return message.value.get('feedback', {}).get('user_id', '')
+
+    async def _process_message(self, message_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Process a single feedback message; failures are returned for retry routing."""
         feedback_id = message_data.get('id', 'unknown')
-        
-        for attempt in range(self.retry_attempts):
-            try:
-                logger.info(f"📝 Processing feedback {feedback_id} (attempt {attempt + 1})")
-                
-                # Process the feedback
-                result = await self.processor.process_feedback(message_data)
-                
-                logger.info(f"✅ Feedback {feedback_id} processed successfully: {result}")
-                return
-                
-            except Exception as e:
-                logger.error(f"❌ Attempt {attempt + 1} failed for {feedback_id}: {e}")
-                
-                if attempt < self.retry_attempts - 1:
-                    await asyncio.sleep(self.retry_delay * (attempt + 1))  # Exponential backoff
-                else:
-                    logger.error(f"💀 Feedback {feedback_id} failed after {self.retry_attempts} attempts")
-                    # In production, you might want to send to a dead letter queue
+        attempt = message_data.get('attempt', 0) + 1
+
+        try:
+            logger.info(f"📝 Processing feedback {feedback_id} (attempt {attempt})")
+
+            # Process the feedback
+            result = await self.processor.process_feedback(message_data)
+
+            logger.info(f"✅ Feedback {feedback_id} processed successfully: {result}")
+            return result
+
+        except Exception as e:
+            logger.error(f"❌ Attempt {attempt} failed for {feedback_id}: {e}")
+            return self.processor._build_error(message_data, e)
     
+    async def _process_batch(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Process a poll's worth of feedback messages in one batch, ordered per user on the keyed executor."""
+        logger.info(f"📦 Processing batch of {len(messages)} messages")
+
+        results = await self.processor.process_feedback_batch(messages, self.executor)
+
+        failed = sum(1 for r in results if "error" in r)
+        logger.info(f"✅ Batch processed: {len(results) - failed} ok, {failed} failed")
+        return results
+
+    async def _on_partitions_revoked(self, revoked: List[TopicPartition]):
+        """Finish in-flight work and hand per-user state over before partitions move away.
+
+        Records still buffered by the coalescing window for a revoked partition
+        are dropped unprocessed: their offsets are not committed, so the new
+        owner reads them again.
+        """
+        if not revoked:
+            return
+        logger.info(f"📤 Partitions revoked: {sorted(tp.partition for tp in revoked)}")
+
+        if self.executor:
+            await self.executor.join()
+
+        released: Set[str] = set()
+        for topic_partition in revoked:
+            released |= self._partition_users.pop(topic_partition, set())
+            self._paused_until.pop(topic_partition, None)
+            if self._window is not None:
+                self._window.pop(topic_partition, None)
+        if self.processor and released:
+            # Persist bandits so the new owner continues from them instead of starting over
+            await self.processor.release_users(released)
+            logger.info(f"🧹 Released state for {len(released)} users")
+
     async def _cleanup(self):
         """Clean up resources."""
         self.running = False
@@ -131,6 +400,13 @@ class FeedbackWorker:
             except Exception as e:
                 logger.error(f"❌ Error closing consumer: {e}")
         
+        if self.producer:
+            try:
+                self.producer.close()
+                logger.info("📝 Kafka producer closed")
+            except Exception as e:
+                logger.error(f"❌ Error closing producer: {e}")
+        
         if self.processor:
             try:
                 await self.processor.cleanup()
@@ -1,7 +1,10 @@
 """MongoDB database helper functions for worker."""
 
 import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+
+from bbr_core.preferences import build_guarded_preference_pipeline
+
 from .models import UserProfile, SleepEntry, NutritionEntry, ActivityEntry, MeasurementEntry
 
 
@@ -31,4 +34,93 @@ def get_recent_entries(client, db_name: str, collection_name: str, user_id: str,
         return list(reversed(docs))  # Return in chronological order
         
     except Exception as e:
-        raise RuntimeError(f"Error getting recent entries for {user_id} from {collection_name}: {e}")
\ No newline at end of file
+        raise RuntimeError(f"Error getting recent entries for {user_id} from {collection_name}: {e}")
+
+
+def get_users_by_ids(client, db_name: str, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Get many users from MongoDB with a single `$in` query, keyed by user_id."""
+    try:
+        db = client[db_name]
+        collection = db['users']
+        cursor = collection.find({"user_id": {"$in": list(user_ids)}})
+        return {doc["user_id"]: doc for doc in cursor}
+    except Exception as e:
+        raise RuntimeError(f"Error getting users {list(user_ids)}: {e}")
+
+
+def get_recent_entries_batch(client, db_name: str, collection_name: str, user_ids: List[str], limit: int = 7) -> Dict[str, List[Dict[str, Any]]]:
+    """Get recent entries for many users from MongoDB in a single aggregation.
+
+    Returns a mapping of user_id to that user's most recent `limit` entries in
+    chronological order (users without entries map to an empty list).
+    """
+    try:
+        db = client[db_name]
+        collection = db[collection_name]
+
+        pipeline = [
+            {"$match": {"user_id": {"$in": list(user_ids)}}},
+            {"$group": {
+                "_id": "$user_id",
+                "docs": {"$topN": {"n": limit, "sortBy": {"date": -1}, "output": "$$ROOT"}},
+            }},
+        ]
+        entries = {user_id: [] for user_id in user_ids}
+        for group in collection.aggregate(pipeline):
+            # $topN yields newest first; callers expect chronological order
+            entries[group["_id"]] = list(reversed(group["docs"]))
+        return entries
+
+    except Exception as e:
+        raise RuntimeError(f"Error getting recent entries for {len(user_ids)} users from {collection_name}: {e}")
+
+def apply_preference_deltas(client, db_name: str, deltas_by_user: Dict[str, List[Tuple[Optional[str], List[Tuple[str, str, float]]]]]) -> int:
+    """Apply preference deltas for many users atomically with one unordered bulk_write.
+
+    ``deltas_by_user`` maps each user to (feedback_id, deltas) pairs. Every
+    feedback id is recorded on the user document in the same update and
+    feedback already recorded there is skipped, so replaying a batch after a
+    partial failure does not apply it twice. Returns the number of modified
+    user documents.
+    """
+    from pymongo import UpdateOne
+
+    operations = [
+        UpdateOne({"user_id": user_id}, build_guarded_preference_pipeline(deltas))
+        for user_id, deltas in deltas_by_user.items()
+        if deltas
+    ]
+    if not operations:
+        return 0
+    try:
+        result = client[db_name]['users'].bulk_write(operations, ordered=False)
+        return result.modified_count
+    except Exception as e:
+        raise RuntimeError(f"Error applying preference deltas for {len(operations)} users: {e}")
+
+def save_bandit_states(client, db_name: str, states: Dict[Tuple[str, str], bytes]) -> int:
+    """Upsert serialized bandits keyed by (user_id, domain) with one unordered bulk_write.
+
+    Returns the number of documents written.
+    """
+    from pymongo import UpdateOne
+
+    operations = [
+        UpdateOne({"user_id": user_id, "domain": domain}, {"$set": {"state": state}}, upsert=True)
+        for (user_id, domain), state in states.items()
+    ]
+    if not operations:
+        return 0
+    try:
+        result = client[db_name]['bandit_states'].bulk_write(operations, ordered=False)
+        return result.upserted_count + result.modified_count
+    except Exception as e:
+        raise RuntimeError(f"Error saving bandit states for {len(operations)} user/domain pairs: {e}")
+
+def load_bandit_states(client, db_name: str, user_ids: List[str]) -> Dict[Tuple[str, str], bytes]:
+    """Serialized bandits of many users, keyed by (user_id, domain), with one `$in` query."""
+    try:
+        cursor = client[db_name]['bandit_states'].find({"user_id": {"$in": list(user_ids)}})
+        return {(doc["user_id"], doc["domain"]): bytes(doc["state"]) for doc in cursor}
+    except Exception as e:
+        raise RuntimeError(f"Error loading bandit states for {len(user_ids)} users: {e}")
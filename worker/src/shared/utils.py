@@ -1,14 +1,11 @@
 """Utility functions for the Body-to-Behavior Recommender."""
 
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional
 from datetime import datetime
 import random
 import numpy as np
 
-
-def clamp01(x: float) -> float:
-    """Clamp a value between 0 and 1."""
-    return max(0.0, min(1.0, x))
+from bbr_core.utils import clamp01, mean_std  # noqa: F401  (shared implementations)
 
 
 def normalize01(x: float, lo: float, hi: float) -> float:
@@ -18,15 +15,6 @@ def normalize01(x: float, lo: float, hi: float) -> float:
     return clamp01((x - lo) / (hi - lo))
 
 
-def mean_std(values: List[float]) -> Tuple[float, float]:
-    """Calculate mean and standard deviation of values."""
-    if not values:
-        return 0.0, 1.0
-    mu = float(np.mean(values))
-    sigma = float(np.std(values)) or 1.0
-    return mu, sigma
-
-
 def get_today_iso(now_iso: Optional[str]) -> str:
     """Get today's date in ISO format."""
     if now_iso:
@@ -42,7 +42,7 @@ async def test_processor():
         
         # Test Thompson sampling
         print("3️⃣ Testing Thompson sampling...")
-        arm = processor._thompson_sample_contextual("test_user", "music", state)
+        arm = processor._thompson_sample_contextual_batch("test_user", "music", state, 1)[0]
         print(f"✅ Selected arm: {arm}")
         
         # Test reward calculation
@@ -61,7 +61,7 @@ async def test_processor():
         
         # Test bandit update
         print("5️⃣ Testing bandit update...")
-        processor._update_bandit("test_user", "music", arm, reward, state)
+        processor._update_bandit_batch("test_user", "music", [arm], [reward], state)
         print("✅ Bandit updated successfully")
         
         # Test complete feedback processing
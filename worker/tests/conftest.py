@@ -0,0 +1,58 @@
+"""Test configuration and fixtures."""
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+import shared.db
+from feedback_worker.processor import FeedbackProcessor
+from shared.models import TrackedUserProfile
+
+
+def make_user(user_id: str) -> TrackedUserProfile:
+    return TrackedUserProfile(
+        user_id=user_id,
+        age=30,
+        weight=70.0,
+        height=175.0,
+        bmi=22.9,
+        fitness_level="intermediate",
+        goals="weight_loss",
+        join_date="2024-01-01",
+        pref_music_genres={"lofi": 0.5},
+    )
+
+
+def make_message(feedback_id: str, user_id: str, domain: str = "music", item_id: str = "m1", thumbs: int = 1):
+    return {
+        "id": feedback_id,
+        "feedback": {"user_id": user_id, "domain": domain, "item_id": item_id, "thumbs": thumbs},
+    }
+
+
+def make_processor(monkeypatch) -> FeedbackProcessor:
+    """A processor without MongoDB: users are served from memory and writes are recorded in `writes`."""
+    processor = FeedbackProcessor()
+    processor.users = {user_id: make_user(user_id) for user_id in ("u1", "u2", "u3")}
+    processor.writes = []
+    empty_history = {"sleep": [], "nutrition": [], "activity": []}
+
+    async def load_users(user_ids):
+        return (
+            {user_id: processor.users[user_id] for user_id in user_ids if user_id in processor.users},
+            {user_id: dict(empty_history) for user_id in user_ids},
+        )
+
+    def apply_preference_deltas(client, db_name, deltas_by_user):
+        processor.writes.append(deltas_by_user)
+        return len(deltas_by_user)
+
+    processor._load_users = load_users
+    processor._restore_bandits = AsyncMock()
+    monkeypatch.setattr(shared.db, "apply_preference_deltas", apply_preference_deltas)
+    return processor
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    return make_processor(monkeypatch)
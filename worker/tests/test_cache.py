@@ -0,0 +1,179 @@
+"""Tests for the user cache and its change-stream invalidation rules."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from feedback_worker import cache as cache_module
+from feedback_worker.cache import ChangeStreamInvalidator, UserCache
+
+HISTORY = {"sleep": [], "nutrition": [], "activity": []}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+class TestUserCache:
+    """Test LRU eviction, TTL expiry and invalidation races."""
+
+    def test_get_returns_cached_entry(self):
+        cache = UserCache(max_size=2)
+        cache.put("u1", "user1", HISTORY, cache.generation)
+
+        assert cache.get("u1") == ("user1", HISTORY)
+        assert cache.get("u2") is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = UserCache(max_size=2)
+        cache.put("u1", "user1", HISTORY, cache.generation)
+        cache.put("u2", "user2", HISTORY, cache.generation)
+        cache.get("u1")  # u2 is now the least recently used
+        cache.put("u3", "user3", HISTORY, cache.generation)
+
+        assert len(cache) == 2
+        assert cache.get("u2") is None
+        assert cache.get("u1") is not None
+        assert cache.get("u3") is not None
+
+    def test_ttl_expires_entries(self, clock):
+        cache = UserCache(max_size=2, ttl=60)
+        cache.put("u1", "user1", HISTORY, cache.generation)
+
+        clock.now += 59
+        assert cache.get("u1") is not None
+        clock.now += 2
+        assert cache.get("u1") is None
+        assert len(cache) == 0
+
+    def test_no_ttl_never_expires(self, clock):
+        cache = UserCache(max_size=2)
+        cache.put("u1", "user1", HISTORY, cache.generation)
+
+        clock.now += 10 ** 6
+        assert cache.get("u1") is not None
+
+    def test_invalidate_drops_user(self):
+        cache = UserCache(max_size=2)
+        cache.put("u1", "user1", HISTORY, cache.generation)
+        cache.put("u2", "user2", HISTORY, cache.generation)
+        cache.invalidate(["u1"])
+
+        assert cache.get("u1") is None
+        assert cache.get("u2") is not None
+
+    def test_read_racing_an_invalidation_is_not_cached(self):
+        """Data read before an invalidation of the same user must not be re-inserted."""
+        cache = UserCache(max_size=2)
+        generation = cache.generation  # read starts
+        cache.invalidate(["u1"])  # the user changes meanwhile
+        cache.put("u1", "stale", HISTORY, generation)
+
+        assert cache.get("u1") is None
+
+        cache.put("u1", "fresh", HISTORY, cache.generation)
+        assert cache.get("u1") == ("fresh", HISTORY)
+
+    def test_invalidation_of_another_user_does_not_block_put(self):
+        cache = UserCache(max_size=2)
+        generation = cache.generation
+        cache.invalidate(["u2"])
+        cache.put("u1", "user1", HISTORY, generation)
+
+        assert cache.get("u1") is not None
+
+    def test_clear_blocks_reads_started_before_it(self):
+        cache = UserCache(max_size=2)
+        generation = cache.generation
+        cache.clear()
+        cache.put("u1", "stale", HISTORY, generation)
+
+        assert cache.get("u1") is None
+
+    def test_invalidation_bookkeeping_falls_back_to_barrier(self):
+        """Past max_size tracked invalidations, every earlier read is treated as stale."""
+        cache = UserCache(max_size=2)
+        generation = cache.generation
+        cache.invalidate(["a", "b", "c"])
+        cache.put("u1", "stale", HISTORY, generation)
+
+        assert cache.get("u1") is None
+        assert cache._invalidated_at == {}
+
+
+def update_event(fields, removed=(), user_id="u1", collection="users"):
+    return {
+        "operationType": "update",
+        "ns": {"coll": collection},
+        "updateDescription": {"updatedFields": dict.fromkeys(fields, 1), "removedFields": list(removed)},
+        "fullDocument": {"user_id": user_id} if user_id else None,
+    }
+
+
+class TestChangeStreamInvalidator:
+    """Test which change events invalidate the cache."""
+
+    @pytest.fixture
+    def cache(self):
+        return MagicMock(spec=UserCache)
+
+    @pytest.fixture
+    def invalidator(self, cache):
+        return ChangeStreamInvalidator(cache, MagicMock(), ["users", "sleep"], fallback_ttl=60)
+
+    def test_ignores_own_preference_writes(self, invalidator, cache):
+        invalidator._handle(update_event(["pref_music_genres.lofi", "pref_meal_cuisines.thai"]))
+        invalidator._handle(update_event(["pref_music_genres.lofi", "applied_feedback"]))
+
+        cache.invalidate.assert_not_called()
+        cache.clear.assert_not_called()
+
+    def test_other_user_fields_invalidate(self, invalidator, cache):
+        invalidator._handle(update_event(["pref_music_genres.lofi", "weight"]))
+
+        cache.invalidate.assert_called_once_with(["u1"])
+
+    def test_removed_fields_count(self, invalidator, cache):
+        invalidator._handle(update_event(["pref_music_genres.lofi"], removed=["equipment"]))
+
+        cache.invalidate.assert_called_once_with(["u1"])
+
+    def test_preference_updates_of_history_are_not_ignored(self, invalidator, cache):
+        """The pref_* rule only applies to the users collection."""
+        invalidator._handle(update_event(["pref_x"], collection="sleep"))
+
+        cache.invalidate.assert_called_once_with(["u1"])
+
+    def test_inserts_invalidate_their_user(self, invalidator, cache):
+        invalidator._handle({"operationType": "insert", "ns": {"coll": "sleep"}, "fullDocument": {"user_id": "u2"}})
+
+        cache.invalidate.assert_called_once_with(["u2"])
+
+    def test_unknown_user_clears_everything(self, invalidator, cache):
+        invalidator._handle({"operationType": "delete", "ns": {"coll": "users"}})
+
+        cache.invalidate.assert_not_called()
+        cache.clear.assert_called_once()
+
+    def test_stream_failure_falls_back_to_ttl(self, invalidator, cache):
+        def broken():
+            raise RuntimeError("stream closed")
+            yield
+
+        invalidator._stream = broken()
+        invalidator._run()
+
+        assert cache.ttl == 60
+        cache.clear.assert_called_once()
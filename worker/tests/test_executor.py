@@ -0,0 +1,94 @@
+"""Tests for the keyed executor."""
+
+import asyncio
+
+import pytest
+
+from feedback_worker.executor import KeyedExecutor
+
+
+def _recorder(log, name, delay=0.0):
+    async def work():
+        log.append(("start", name))
+        await asyncio.sleep(delay)
+        log.append(("end", name))
+        return name
+    return work
+
+
+class TestKeyedExecutor:
+    """Test per-key ordering and cross-key concurrency."""
+
+    @pytest.mark.asyncio
+    async def test_same_key_runs_in_submission_order(self):
+        """Work for one key never overlaps and keeps its order, even when earlier work is slower."""
+        executor = KeyedExecutor(concurrency=4)
+        log = []
+        tasks = [executor.submit("u1", _recorder(log, i, delay=0.01 * (3 - i))) for i in range(3)]
+        await executor.join()
+
+        assert [task.result() for task in tasks] == [0, 1, 2]
+        assert log == [("start", 0), ("end", 0), ("start", 1), ("end", 1), ("start", 2), ("end", 2)]
+
+    @pytest.mark.asyncio
+    async def test_different_keys_run_concurrently(self):
+        """Work for different keys overlaps."""
+        executor = KeyedExecutor(concurrency=4)
+        log = []
+        executor.submit("u1", _recorder(log, "a", delay=0.02))
+        executor.submit("u2", _recorder(log, "b", delay=0.02))
+        await executor.join()
+
+        assert log[:2] == [("start", "a"), ("start", "b")]
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        """At most `concurrency` coroutines are active at once."""
+        executor = KeyedExecutor(concurrency=2)
+        active = peak = 0
+
+        async def work():
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+        for i in range(6):
+            executor.submit(f"u{i}", work)
+        await executor.join()
+
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_failure_does_not_block_the_key(self):
+        """A failed task leaves its error on the task and later work for the key still runs."""
+        executor = KeyedExecutor(concurrency=1)
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        async def ok():
+            return "ok"
+
+        failed = executor.submit("u1", fail)
+        after = executor.submit("u1", ok)
+        await executor.join()
+
+        assert isinstance(failed.exception(), RuntimeError)
+        assert after.result() == "ok"
+
+    @pytest.mark.asyncio
+    async def test_join_waits_for_work_submitted_meanwhile(self):
+        """`join` also waits for tasks submitted by running work."""
+        executor = KeyedExecutor(concurrency=2)
+        log = []
+
+        async def spawn():
+            executor.submit("u2", _recorder(log, "child", delay=0.01))
+
+        executor.submit("u1", spawn)
+        await executor.join()
+
+        assert executor.in_flight == 0
+        assert log == [("start", "child"), ("end", "child")]
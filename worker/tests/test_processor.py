@@ -0,0 +1,128 @@
+"""Tests for batch feedback processing without Kafka or MongoDB."""
+
+import pytest
+
+import shared.db
+from feedback_worker.executor import KeyedExecutor
+
+from .conftest import make_message, make_processor
+
+
+class TestProcessFeedbackBatch:
+    """Test coalesced batch processing."""
+
+    @pytest.mark.asyncio
+    async def test_results_in_message_order(self, processor):
+        """Results line up with messages; unknown users get a non-retriable error entry."""
+        messages = [
+            make_message("f1", "u1"),
+            make_message("f2", "u2", domain="workout", item_id="w1"),
+            make_message("f3", "u1"),
+            make_message("f4", "nobody"),
+        ]
+        results = await processor.process_feedback_batch(messages)
+
+        assert [r["feedback_id"] for r in results] == ["f1", "f2", "f3", "f4"]
+        assert results[0]["coalesced"] == 2
+        assert "not found" in results[3]["error"]
+        assert results[3]["retriable"] is False
+
+    @pytest.mark.asyncio
+    async def test_invalid_payloads_are_not_retriable(self, processor):
+        messages = [
+            {"id": "f1", "feedback": {"user_id": "u1"}},
+            make_message("f2", "u1", item_id="no-such-track"),
+        ]
+        results = await processor.process_feedback_batch(messages)
+
+        assert [r["retriable"] for r in results] == [False, False]
+
+    @pytest.mark.asyncio
+    async def test_executor_matches_serial_processing(self, monkeypatch):
+        """Groups applied on the keyed executor produce the same deltas as the serial path."""
+        messages = [
+            make_message("f1", "u1"),
+            make_message("f2", "u2", thumbs=-1),
+            make_message("f3", "u1", domain="workout", item_id="w1"),
+            make_message("f4", "u3"),
+        ]
+        serial_processor = make_processor(monkeypatch)
+        serial = await serial_processor.process_feedback_batch(messages)
+
+        concurrent_processor = make_processor(monkeypatch)
+        executor = KeyedExecutor(concurrency=4)
+        concurrent = await concurrent_processor.process_feedback_batch(messages, executor)
+
+        assert executor.in_flight == 0
+        assert concurrent_processor.writes == serial_processor.writes
+        assert [r["reward"] for r in concurrent] == [r["reward"] for r in serial]
+        assert all("error" not in r for r in concurrent)
+
+
+class TestRedelivery:
+    """Test that replaying feedback after a failure does not apply it twice."""
+
+    @pytest.mark.asyncio
+    async def test_records_applied_ids(self, processor):
+        await processor.process_feedback_batch([make_message("f1", "u1"), make_message("f2", "u1", thumbs=0)])
+
+        assert [feedback_id for feedback_id, _ in processor.writes[0]["u1"]] == ["f1", "f2"]
+        assert processor.users["u1"].applied_feedback == ["f1", "f2"]
+
+    @pytest.mark.asyncio
+    async def test_applied_feedback_is_skipped(self, processor):
+        await processor.process_feedback_batch([make_message("f1", "u1")])
+        weights = dict(processor.users["u1"].pref_music_genres)
+        fits = []
+        processor.policy.update_batch = lambda *args: fits.append(args)
+
+        results = await processor.process_feedback_batch([make_message("f1", "u1"), make_message("f2", "u1")])
+
+        assert results[0]["duplicate"] is True
+        assert "duplicate" not in results[1]
+        assert len(fits) == 1 and len(fits[0][2]) == 1  # only f2 trains the bandit
+        assert [feedback_id for feedback_id, _ in processor.writes[-1]["u1"]] == ["f2"]
+        assert processor.users["u1"].pref_music_genres["lofi"] == min(1.0, weights["lofi"] + 0.3)
+
+    @pytest.mark.asyncio
+    async def test_failed_write_is_replayed_without_retraining(self, processor, monkeypatch):
+        """If the write fails the poll is redelivered: preferences are re-sent, the bandit is not refit."""
+        def fail(client, db_name, deltas_by_user):
+            raise RuntimeError("write failed")
+
+        recorder = shared.db.apply_preference_deltas
+        monkeypatch.setattr(shared.db, "apply_preference_deltas", fail)
+        with pytest.raises(RuntimeError):
+            await processor.process_feedback_batch([make_message("f1", "u1")])
+        assert processor.users["u1"].applied_feedback == []
+
+        fits = []
+        processor.policy.update_batch = lambda *args: fits.append(args)
+        monkeypatch.setattr(shared.db, "apply_preference_deltas", recorder)
+        results = await processor.process_feedback_batch([make_message("f1", "u1")])
+
+        assert "duplicate" not in results[0]
+        assert fits == []
+        assert [feedback_id for feedback_id, _ in processor.writes[-1]["u1"]] == ["f1"]
+
+
+class TestComputeUserState:
+    """Test parsing of history windows into state."""
+
+    def test_uses_latest_nutrition_not_after_today_and_skips_bad_entries(self, processor, monkeypatch):
+        def nutrition(date, calories):
+            return {"user_id": "u1", "date": date, "calories_consumed": calories, "protein_g": 100.0,
+                    "carbs_g": 200.0, "fat_g": 60.0, "fiber_g": 25.0, "sugar_g": 40.0, "sodium_mg": 2000.0}
+
+        seen = {}
+        monkeypatch.setattr(processor, "_compute_state_entries",
+                            lambda user, sleep, todays, activity: seen.setdefault("nutrition", todays))
+        history = {
+            "sleep": [],
+            "nutrition": [nutrition("2000-01-01", 1800), nutrition("2000-01-02", 2100), {"date": "2000-01-03"},
+                          nutrition("2999-01-01", 900)],
+            "activity": [],
+        }
+        processor._compute_user_state(processor.users["u1"], history)
+
+        assert seen["nutrition"].calories_consumed == 2100
@@ -0,0 +1,214 @@
+"""Tests for the Kafka worker's offset, retry and rebalance handling, with Kafka mocked out."""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from kafka import TopicPartition
+from kafka.errors import KafkaError
+
+from feedback_worker.executor import KeyedExecutor
+from feedback_worker.worker import FeedbackWorker
+
+
+def record(offset, feedback_id, user_id="u1", attempt=None):
+    value = {"id": feedback_id, "feedback": {"user_id": user_id}}
+    if attempt is not None:
+        value["attempt"] = attempt
+    return SimpleNamespace(offset=offset, key=user_id.encode(), value=value)
+
+
+def sent_future(ok=True):
+    future = MagicMock()
+    future.succeeded.return_value = ok
+    return future
+
+
+@pytest.fixture
+def worker():
+    worker = FeedbackWorker()
+    worker.consumer = MagicMock()
+    worker.producer = MagicMock()
+    worker.processor = MagicMock()
+    worker.processor.release_users = AsyncMock()
+    worker.executor = KeyedExecutor(worker.concurrency)
+    worker.retry_attempts = 3
+    worker.retry_delay = 0.0
+    worker.producer.send.return_value = sent_future()
+    return worker
+
+
+def sent(worker):
+    """(topic, payload) of every message the worker produced."""
+    return [(call.args[0], call.kwargs["value"]) for call in worker.producer.send.call_args_list]
+
+
+class TestRouteFailures:
+    """Test where failed messages are re-published."""
+
+    @pytest.mark.asyncio
+    async def test_successes_are_not_sent(self, worker):
+        await worker._route_failures([record(0, "f1")], [{"feedback_id": "f1"}])
+
+        worker.producer.send.assert_not_called()
+        worker.producer.flush.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_retriable_error_goes_to_retry_topic(self, worker):
+        await worker._route_failures([record(0, "f1")], [{"feedback_id": "f1", "error": "timeout", "retriable": True}])
+
+        [(topic, payload)] = sent(worker)
+        assert topic == worker.retry_topic
+        assert payload["attempt"] == 1
+        assert payload["last_error"] == "timeout"
+        assert "retry_at" in payload
+        worker.producer.flush.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_out_of_attempts_goes_to_dlq(self, worker):
+        await worker._route_failures([record(0, "f1", attempt=2)], [{"feedback_id": "f1", "error": "timeout"}])
+
+        [(topic, payload)] = sent(worker)
+        assert topic == worker.dlq_topic
+        assert payload["attempt"] == 3
+
+    @pytest.mark.asyncio
+    async def test_non_retriable_error_goes_straight_to_dlq(self, worker):
+        await worker._route_failures([record(0, "f1")], [{"feedback_id": "f1", "error": "User u1 not found", "retriable": False}])
+
+        [(topic, payload)] = sent(worker)
+        assert topic == worker.dlq_topic
+        assert payload["attempt"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_send_raises_and_is_resent(self, worker):
+        records = [record(0, "f1"), record(1, "f2")]
+        results = [{"feedback_id": "f1", "error": "x"}, {"feedback_id": "f2", "error": "x"}]
+        worker.producer.send.side_effect = [sent_future(), sent_future(ok=False)]
+        with pytest.raises(KafkaError):
+            await worker._route_failures(records, results)
+
+        # After the rewind only the message that did not get through is sent again
+        worker.producer.send.side_effect = None
+        worker.producer.send.reset_mock()
+        await worker._route_failures(records, results)
+
+        assert [payload["id"] for _, payload in sent(worker)] == ["f2"]
+
+
+class TestPollAndProcess:
+    """Test that offsets are committed only after a poll is fully handled."""
+
+    @pytest.fixture
+    def polled(self, worker):
+        partition = TopicPartition("feedback", 0)
+        batch = {partition: [record(5, "f1"), record(6, "f2")]}
+        worker.batch_mode = False
+        worker.coalesce_window = 0
+        worker.consumer.poll.return_value = batch
+        worker.processor.process_feedback = AsyncMock(side_effect=lambda value: {"feedback_id": value["id"]})
+        return partition
+
+    @pytest.mark.asyncio
+    async def test_commits_after_processing(self, worker, polled):
+        await worker._poll_and_process()
+
+        assert worker.processor.process_feedback.await_count == 2
+        worker.consumer.commit.assert_called_once()
+        worker.consumer.seek.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_rewinds_without_commit_when_routing_fails(self, worker, polled):
+        worker.processor.process_feedback.side_effect = RuntimeError("boom")
+        worker.processor._build_error = lambda value, e: {"feedback_id": value["id"], "error": str(e)}
+        worker.producer.send.return_value = sent_future(ok=False)
+
+        await worker._poll_and_process()
+
+        worker.consumer.commit.assert_not_called()
+        worker.consumer.seek.assert_called_once_with(polled, 5)
+
+    @pytest.mark.asyncio
+    async def test_rewinds_without_commit_when_the_batch_fails(self, worker, polled):
+        worker.batch_mode = True
+        worker.processor.process_feedback_batch = AsyncMock(side_effect=RuntimeError("write failed"))
+
+        await worker._poll_and_process()
+
+        worker.consumer.commit.assert_not_called()
+        worker.consumer.seek.assert_called_once_with(polled, 5)
+
+
+class TestPartitionsRevoked:
+    """Test the hand-over of per-user state on rebalance."""
+
+    @pytest.mark.asyncio
+    async def test_releases_users_of_revoked_partitions_only(self, worker):
+        kept, revoked = TopicPartition("feedback", 0), TopicPartition("feedback", 1)
+        worker._partition_users[kept] = {"u1"}
+        worker._partition_users[revoked] = {"u2", "u3"}
+        worker._paused_until[TopicPartition("feedback.retry", 1)] = 1.0
+
+        await worker._on_partitions_revoked([revoked, TopicPartition("feedback.retry", 1)])
+
+        worker.processor.release_users.assert_awaited_once_with({"u2", "u3"})
+        assert dict(worker._partition_users) == {kept: {"u1"}}
+        assert worker._paused_until == {}
+
+    @pytest.mark.asyncio
+    async def test_waits_for_in_flight_work_first(self, worker):
+        order = []
+
+        async def work():
+            order.append("work")
+
+        worker.processor.release_users.side_effect = lambda users: order.append("release")
+        worker._partition_users[TopicPartition("feedback", 0)] = {"u1"}
+        worker.executor.submit("u1", work)
+
+        await worker._on_partitions_revoked([TopicPartition("feedback", 0)])
+
+        assert order == ["work", "release"]
+
+    @pytest.mark.asyncio
+    async def test_drops_buffered_records_of_revoked_partitions(self, worker):
+        kept, revoked = TopicPartition("feedback", 0), TopicPartition("feedback", 1)
+        worker._window = {kept: ["a"], revoked: ["b"]}
+
+        await worker._on_partitions_revoked([revoked])
+
+        assert worker._window == {kept: ["a"]}
+
+
+class TestReleaseUsers:
+    """Test that released users' bandits are persisted before being dropped."""
+
+    @pytest.mark.asyncio
+    async def test_saves_bandits_then_releases(self, processor, monkeypatch):
+        import shared.db
+
+        saved = {}
+        monkeypatch.setattr(shared.db, "save_bandit_states", lambda client, db, states: saved.update(states))
+        processor.policy.get("u1", "music")
+        processor.policy.get("u2", "meal")
+        processor.cache = MagicMock()
+
+        await processor.release_users(["u1"])
+
+        assert list(saved) == [("u1", "music")]
+        assert list(processor.policy.bandits) == [("u2", "meal")]
+        processor.cache.invalidate.assert_called_once_with({"u1"})
+
+    @pytest.mark.asyncio
+    async def test_releases_even_if_saving_fails(self, processor, monkeypatch):
+        import shared.db
+
+        def fail(client, db, states):
+            raise RuntimeError("mongo down")
+
+        monkeypatch.setattr(shared.db, "save_bandit_states", fail)
+        processor.policy.get("u1", "music")
+
+        await processor.release_users(["u1"])
+
+        assert processor.policy.bandits == {}